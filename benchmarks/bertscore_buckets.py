@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+    Benchmarks length-bucketed BertScore (`BertScore(backend="native")`)
+    against `bert_score`'s default batching (what the jury backend uses)
+    on mixed-length synthetic data: short answers mixed with long passages.
+
+    Both use the same loaded model, so only the batching differs.
+
+    Usage:
+        python benchmarks/bertscore_buckets.py --nsamples 2000
+        python benchmarks/bertscore_buckets.py --model distilbert-base-uncased --max-tokens 4096
+        python benchmarks/bertscore_buckets.py --model /path/to/local/model --num-layers 2
+"""
+
+import argparse
+import random
+import time
+from typing import Callable, List, Tuple
+
+import numpy as np
+
+from evalem._base.kernels import padding_ratio
+from evalem.nlp.metrics import BertScore
+
+_WORDS = (
+    "the a an denver broncos super bowl 50 1889 paris eiffel tower normandy"
+    + " france river university of notre dame computational complexity theory"
+    + " is in and was built by team won game"
+).split()
+
+
+def mixed_lengths(nsamples: int, seed: int = 42) -> Tuple[List[str], List[str]]:
+    """
+    Pairs where each side is either a short answer (1-5 words)
+    or a long passage (100-300 words).
+    """
+    rng = random.Random(seed)
+
+    def text():
+        n = rng.randint(100, 300) if rng.random() < 0.2 else rng.randint(1, 5)
+        return " ".join(rng.choices(_WORDS, k=n))
+
+    return [text() for _ in range(nsamples)], [text() for _ in range(nsamples)]
+
+
+def bert_score_padding_ratio(engine, texts: List[str], batch_size: int) -> float:
+    # bert_score sorts unique sentences by word count and uses fixed-size batches
+    sentences = sorted(set(texts), key=lambda x: len(x.split(" ")), reverse=True)
+    lengths = [len(ids) for ids in engine.encode(sentences)]
+    batches = [
+        np.arange(start, min(start + batch_size, len(sentences)))
+        for start in range(0, len(sentences), batch_size)
+    ]
+    return padding_ratio(lengths, batches)
+
+
+def timeit(fn: Callable) -> Tuple[float, object]:
+    start = time.perf_counter()
+    res = fn()
+    return time.perf_counter() - start, res
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--nsamples", type=int, default=1000)
+    parser.add_argument("--model", type=str, default="distilbert-base-uncased")
+    parser.add_argument("--num-layers", type=int, default=None)
+    parser.add_argument("--device", type=str, default="cpu")
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--max-tokens", type=int, default=8192)
+    args = parser.parse_args()
+
+    predictions, references = mixed_lengths(args.nsamples)
+    metric = BertScore(
+        model_type=args.model,
+        num_layers=args.num_layers,
+        device=args.device,
+        backend="native",
+        max_tokens=args.max_tokens,
+    )
+    engine = metric._engine(args.model, args.device)
+    print(f"items={len(predictions)} model={args.model}")
+
+    elapsed, (_, _, F) = timeit(
+        lambda: engine.scorer.score(
+            predictions,
+            references,
+            batch_size=args.batch_size,
+        ),
+    )
+    ratio = bert_score_padding_ratio(engine, predictions + references, args.batch_size)
+    print(
+        f"bert_score batch_size={args.batch_size}: {elapsed:.3f}s"
+        + f" f1={float(F.mean()):.4f} padding_ratio={ratio:.3f}",
+    )
+
+    elapsed, result = timeit(lambda: metric(predictions, references))
+    print(
+        f"bucketed max_tokens={args.max_tokens}: {elapsed:.3f}s"
+        + f" f1={result.score:.4f} padding_ratio={result.extra['padding_ratio']:.3f}",
+    )
+
+
+if __name__ == "__main__":
+    main()
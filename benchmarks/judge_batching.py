@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+    Throughput (items/s) of `LLMAsJudgeMetric` versus the number of
+    (prediction, reference) pairs per prompt (`pairs_per_prompt`), against
+    the local stub endpoint of the tests (`tests/metrics/stub_openai.py`).
+
+    The stub emulates the latency of a model: a fixed cost per request
+    (prompt processing, network) plus a cost per judged pair (generation).
+
+    Usage (from the repository root):
+        PYTHONPATH=. python benchmarks/judge_batching.py --nsamples 500
+        PYTHONPATH=. python benchmarks/judge_batching.py --request-latency 0.2 --pair-latency 0.01
+"""
+
+import argparse
+import random
+import time
+from typing import List, Tuple
+
+from evalem.nlp.metrics import LLMAsJudgeMetric
+from tests.metrics.stub_openai import StubOpenAIServer, batch_items
+
+_WORDS = (
+    "the a an denver broncos super bowl 50 1889 paris eiffel tower normandy".split()
+)
+
+
+def qa_pairs(nsamples: int, seed: int = 42) -> Tuple[List[str], List[str]]:
+    """
+    Short answers, half of them correct.
+    """
+    rng = random.Random(seed)
+    references = [
+        " ".join(rng.choices(_WORDS, k=rng.randint(1, 4))) for _ in range(nsamples)
+    ]
+    predictions = [
+        ref if rng.random() < 0.5 else f"{ref} {rng.choice(_WORDS)}"
+        for ref in references
+    ]
+    return predictions, references
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--nsamples", type=int, default=500)
+    parser.add_argument(
+        "--pairs-per-prompt",
+        type=int,
+        nargs="+",
+        default=[1, 2, 4, 8, 16, 32],
+    )
+    parser.add_argument("--request-latency", type=float, default=0.1)
+    parser.add_argument("--pair-latency", type=float, default=0.005)
+    parser.add_argument("--max-concurrency", type=int, default=16)
+    args = parser.parse_args()
+
+    def delay(prompt: str) -> float:
+        npairs = max(len(batch_items(prompt)), 1)
+        return args.request_latency + args.pair_latency * npairs
+
+    predictions, references = qa_pairs(args.nsamples)
+    print(f"items={len(predictions)}")
+    baseline = None
+    for pairs_per_prompt in args.pairs_per_prompt:
+        with StubOpenAIServer(delay=delay) as server:
+            metric = LLMAsJudgeMetric(
+                model="stub",
+                api_base=server.api_base,
+                pairs_per_prompt=pairs_per_prompt,
+                max_concurrency=args.max_concurrency,
+            )
+            start = time.perf_counter()
+            result = metric(predictions, references)
+            elapsed = time.perf_counter() - start
+        baseline = result.score if baseline is None else baseline
+        print(
+            f"pairs_per_prompt={pairs_per_prompt}: {elapsed:.3f}s"
+            + f" ({len(predictions) / elapsed:.1f} items/s)"
+            + f" requests={server.requests} score={result.score:.4f}"
+            + f" same_score={result.score == baseline}",
+        )
+
+
+if __name__ == "__main__":
+    main()
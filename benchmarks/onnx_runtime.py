@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+    CPU throughput of `BertScore` and `BartScore` on torch vs ONNX Runtime
+    (fp32 and dynamically quantized int8), and the score differences of
+    the ONNX runs against torch.
+
+    The first ONNX run of a model exports it (cached in `--onnx-dir`),
+    so the export isn't part of the timings.
+
+    Usage:
+        python benchmarks/onnx_runtime.py --nsamples 500
+        python benchmarks/onnx_runtime.py --bert distilbert-base-uncased --bart bartscore-large-cnn
+        python benchmarks/onnx_runtime.py --bert /path/to/local/bert --num-layers 12 --bart ""
+"""
+
+import argparse
+import random
+import time
+from typing import List, Tuple
+
+import numpy as np
+
+from evalem.nlp.metrics import BartScore, BertScore
+
+_WORDS = (
+    "the a an denver broncos super bowl 50 1889 paris eiffel tower normandy"
+    + " france river university of notre dame computational complexity theory"
+    + " is in and was built by team won game"
+).split()
+
+_RUNTIMES = (
+    ("torch", dict(runtime="torch")),
+    ("onnx", dict(runtime="onnx")),
+    ("onnx-int8", dict(runtime="onnx", quantize=True)),
+)
+
+
+def texts(nsamples: int, seed: int = 42) -> Tuple[List[str], List[str]]:
+    rng = random.Random(seed)
+
+    def text():
+        return " ".join(rng.choices(_WORDS, k=rng.randint(5, 60)))
+
+    return [text() for _ in range(nsamples)], [text() for _ in range(nsamples)]
+
+
+def run(name: str, build, predictions: List[str], references: List[str]) -> None:
+    baseline = None
+    for runtime, kwargs in _RUNTIMES:
+        metric = build(**kwargs)
+        # loads (and exports) the model
+        metric(predictions[:2], references[:2])
+        start = time.perf_counter()
+        result = metric(predictions, references)
+        elapsed = time.perf_counter() - start
+        scores = np.asarray(
+            result.extra["bertscore"]["f1"]
+            if "bertscore" in result.extra
+            else result.score,
+        )
+        baseline = scores if baseline is None else baseline
+        print(
+            f"{name} {runtime}: {elapsed:.3f}s ({len(predictions) / elapsed:.1f} items/s)"
+            + f" score={float(np.mean(scores)):.5f}"
+            + f" max_abs_diff={float(np.abs(scores - baseline).max()):.2e}",
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--nsamples", type=int, default=500)
+    parser.add_argument("--bert", type=str, default="distilbert-base-uncased")
+    parser.add_argument("--num-layers", type=int, default=None)
+    parser.add_argument("--bart", type=str, default="bartscore-large-cnn")
+    parser.add_argument("--onnx-dir", type=str, default=None)
+    args = parser.parse_args()
+
+    predictions, references = texts(args.nsamples)
+    print(f"items={len(predictions)}")
+    if args.bert:
+        run(
+            "BertScore",
+            lambda **kwargs: BertScore(
+                model_type=args.bert,
+                num_layers=args.num_layers,
+                backend="native",
+                per_instance_score=True,
+                onnx_dir=args.onnx_dir,
+                **kwargs,
+            ),
+            predictions,
+            references,
+        )
+    if args.bart:
+        run(
+            "BartScore",
+            lambda **kwargs: BartScore(
+                model_checkpoint=args.bart,
+                onnx_dir=args.onnx_dir,
+                **kwargs,
+            ),
+            predictions,
+            references,
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+    Benchmarks native SQuAD F1/EM (`evalem.nlp.metrics.qa`) against the
+    Jury-based F1/EM path on SQuAD-shaped data (single prediction, multiple
+    references per item, as returned by `evalem.nlp.misc.datasets.get_squad_v2`).
+
+    Usage:
+        python benchmarks/squad_qa.py --nsamples 20000
+        python benchmarks/squad_qa.py --squad  # uses the actual squad_v2 references
+"""
+
+import argparse
+import random
+import time
+from typing import Callable, List, Tuple
+
+from evalem._base.evaluators import Evaluator
+from evalem._base.metrics import F1Metric
+from evalem.nlp.metrics import ExactMatchMetric, SquadExactMatchMetric, SquadF1Metric
+
+_WORDS = (
+    "the a an denver broncos super bowl 50 1889 paris eiffel tower normandy"
+    + " france river university of notre dame computational complexity theory"
+).split()
+
+
+def synthetic_squad(nsamples: int, seed: int = 42) -> List[List[str]]:
+    """
+    SQuAD-like references: 1-5 short answers per item, frequently repeated.
+    """
+    rng = random.Random(seed)
+    references = []
+    for _ in range(nsamples):
+        answer = " ".join(rng.choices(_WORDS, k=rng.randint(1, 5)))
+        refs = [answer] * rng.randint(1, 3)
+        refs += [" ".join(rng.choices(_WORDS, k=rng.randint(1, 4)))] * rng.randint(0, 2)
+        references.append(refs)
+    return references
+
+
+def make_predictions(references: List[List[str]], seed: int = 42) -> List[str]:
+    """
+    Perturbs one of the references (drops/adds words, changes case/punctuation).
+    """
+    rng = random.Random(seed)
+    predictions = []
+    for refs in references:
+        tokens = rng.choice(refs).split()
+        if tokens and rng.random() < 0.3:
+            tokens.pop(rng.randrange(len(tokens)))
+        if rng.random() < 0.3:
+            tokens.insert(0, rng.choice(["The", "a", "in", "about"]))
+        text = " ".join(tokens)
+        predictions.append(text.capitalize() + "." if rng.random() < 0.2 else text)
+    return predictions
+
+
+def timeit(fn: Callable) -> Tuple[float, object]:
+    start = time.perf_counter()
+    res = fn()
+    return time.perf_counter() - start, res
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--nsamples", type=int, default=10000)
+    parser.add_argument("--squad", action="store_true", help="Use squad_v2 references")
+    args = parser.parse_args()
+
+    if args.squad:
+        from evalem.nlp.misc.datasets import get_squad_v2
+
+        references = list(get_squad_v2(nsamples=args.nsamples)["references"])
+    else:
+        references = synthetic_squad(args.nsamples)
+    predictions = make_predictions(references)
+    print(f"items={len(references)}")
+
+    native = Evaluator(metrics=[SquadF1Metric(), SquadExactMatchMetric()])
+    elapsed, results = timeit(lambda: native(predictions, references))
+    names = "+".join(r.metric_name for r in results)
+    print(f"native {names}: {elapsed:.3f}s {[round(r.score, 4) for r in results]}")
+
+    # exact_match comes from HF evaluate and may need network access to load
+    try:
+        jury = Evaluator(
+            metrics=[F1Metric(backend="jury"), ExactMatchMetric(backend="jury")],
+        )
+    except Exception as err:
+        print(f"jury exact_match unavailable ({err}), benchmarking f1 only")
+        jury = Evaluator(metrics=[F1Metric(backend="jury")])
+    elapsed, results = timeit(lambda: jury(predictions, references))
+    names = "+".join(r.metric_name for r in results)
+    print(f"jury {names}: {elapsed:.3f}s {[round(r.score, 4) for r in results]}")
+
+
+if __name__ == "__main__":
+    main()
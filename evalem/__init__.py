@@ -1,5 +1,7 @@
 __version__ = "0.0.5-alpha"
 
+from importlib import import_module
+
 from ._base.evaluators import Evaluator  # noqa
 from ._base.pipelines import (  # noqa
     EvaluationPipeline,
@@ -7,10 +9,25 @@ from ._base.pipelines import (  # noqa
     SimpleEvaluationPipeline,
 )
 from ._base.structures import MetricResult  # noqa
-from .nlp.models import (  # noqa
-    QuestionAnsweringHFPipelineWrapper,
-    TextClassificationHFPipelineWrapper,
-)
+
+# Lazily loaded attributes (PEP 562): name -> module.
+# Model wrappers are only imported when they're accessed.
+_LAZY_ATTRIBUTES = {
+    "QuestionAnsweringHFPipelineWrapper": ".nlp.models",
+    "TextClassificationHFPipelineWrapper": ".nlp.models",
+}
+
+
+def __getattr__(name: str):
+    if name not in _LAZY_ATTRIBUTES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(_LAZY_ATTRIBUTES[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_ATTRIBUTES))
 
 
 class BaseMetrics:
@@ -29,6 +46,7 @@ class BaseMetrics:
 
 class BaseStructures:
     from ._base.structures import (
+        EvaluationBatch,
         EvaluationDTO,
         PredictionDTO,
         PredictionInstance,
@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+"""
+    Persistent, memory-mapped store of per-token embeddings of texts
+    (eg: contextual embeddings for BertScore), so that a fixed set of
+    references is only encoded once across evaluations/processes.
+
+    Layout of a store directory (one per namespace, eg: model + layer):
+
+        <path>/<namespace hash>/
+            <segment>.emb.npy     (n_tokens x dim) embeddings of all the texts
+            <segment>.idf.npy     (n_tokens,) token weights
+            <segment>.index.json  text key -> (offset, length) rows
+
+    Segments are immutable and written atomically (temporary file + rename),
+    index last, so concurrent readers only ever see complete segments.
+    Concurrent writers create separate segments. Segments are evicted
+    (least recently used first) when the store exceeds its size limit;
+    a reader that loses a segment to eviction sees it as a cache miss.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Tuple, Union
+
+import numpy as np
+
+_INDEX_SUFFIX = ".index.json"
+
+Embedding = Tuple[np.ndarray, np.ndarray]
+
+
+def text_key(text: str) -> str:
+    """
+    Stable hash of a text used as its key in the store.
+    """
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def _segment_paths(directory: Path, name: str) -> Tuple[Path, Path, Path]:
+    return (
+        directory / f"{name}.emb.npy",
+        directory / f"{name}.idf.npy",
+        directory / f"{name}{_INDEX_SUFFIX}",
+    )
+
+
+class _Segment:
+    def __init__(self, directory: Path, name: str) -> None:
+        self.directory = directory
+        self.name = name
+        with open(self.index_path) as f:
+            index = json.load(f)
+        self.rows = dict(zip(index["keys"], zip(index["offsets"], index["lengths"])))
+        self._arrays = None
+
+    @property
+    def index_path(self) -> Path:
+        return self.paths[-1]
+
+    @property
+    def paths(self) -> Tuple[Path, Path, Path]:
+        return _segment_paths(self.directory, self.name)
+
+    @property
+    def arrays(self) -> Tuple[np.ndarray, np.ndarray]:
+        # memory-mapped lazily (stays valid even if the files are evicted)
+        if self._arrays is None:
+            emb_path, idf_path, _ = self.paths
+            self._arrays = (
+                np.load(emb_path, mmap_mode="r"),
+                np.load(idf_path, mmap_mode="r"),
+            )
+        return self._arrays
+
+    def get(self, key: str) -> Embedding:
+        offset, length = self.rows[key]
+        embeddings, idf = self.arrays
+        return embeddings[offset : offset + length], idf[offset : offset + length]
+
+    def nbytes(self) -> int:
+        return sum(path.stat().st_size for path in self.paths if path.exists())
+
+
+class EmbeddingStore:
+    """
+    On-disk memory-mapped embedding store.
+
+    Args:
+        ```path```: ```Union[str, Path]```
+            Root directory of the store (shared by all namespaces)
+        ```namespace```: ```str```
+            What produced the embeddings (eg: model type + layer).
+            Embeddings of different namespaces never mix.
+        ```max_bytes```: ```Optional[int]```
+            Size limit of the namespace on disk.
+            Least recently used segments are evicted beyond it.
+            If None, nothing is evicted.
+        ```dtype```: ```str```
+            Storage dtype of the embeddings ("float32" or "float16").
+
+    Usage:
+        .. code-block: python
+
+            from evalem._base.embeddings import EmbeddingStore, text_key
+
+            store = EmbeddingStore("~/.cache/evalem/embeddings", namespace="bert-base-uncased_L9")
+            store.put_many({text_key("hello"): (embeddings, idf)})
+            hits = store.get_many([text_key("hello"), text_key("world")])
+    """
+
+    def __init__(
+        self,
+        path: Union[str, Path],
+        namespace: str,
+        max_bytes: Optional[int] = None,
+        dtype: str = "float32",
+    ) -> None:
+        self.namespace = namespace
+        self.directory = Path(path).expanduser() / text_key(namespace)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        label = self.directory / "namespace.txt"
+        if not label.exists():
+            label.write_text(namespace)
+        self.max_bytes = max_bytes
+        self.dtype = np.dtype(dtype)
+        self._segments: Dict[str, _Segment] = {}
+        self._lock = threading.Lock()
+
+    def refresh(self) -> None:
+        """
+        Picks up segments written (or evicted) by other writers/processes.
+        """
+        with self._lock:
+            names = {
+                path.name[: -len(_INDEX_SUFFIX)]
+                for path in self.directory.glob(f"*{_INDEX_SUFFIX}")
+            }
+            for name in set(self._segments) - names:
+                del self._segments[name]
+            for name in names - set(self._segments):
+                try:
+                    self._segments[name] = _Segment(self.directory, name)
+                except (FileNotFoundError, json.JSONDecodeError):
+                    # evicted while loading
+                    continue
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Embedding]:
+        """
+        Returns the (embeddings, idf) of the keys found in the store.
+        Returned arrays are read-only memory-mapped views.
+        """
+        self.refresh()
+        with self._lock:
+            segments = list(self._segments.values())
+        res, used = {}, set()
+        for key in keys:
+            if key in res:
+                continue
+            for segment in segments:
+                if key not in segment.rows:
+                    continue
+                try:
+                    res[key] = segment.get(key)
+                except (FileNotFoundError, ValueError):
+                    # evicted by another process: it's a miss
+                    break
+                used.add(segment)
+                break
+        for segment in used:
+            self._touch(segment)
+        return res
+
+    def put_many(self, items: Dict[str, Embedding]) -> None:
+        """
+        Writes the embeddings as a new immutable segment,
+        then evicts old segments if the store is over its size limit.
+        """
+        self.refresh()
+        items = {k: v for k, v in items.items() if k not in self}
+        if not items:
+            return
+        keys, offsets, lengths = [], [], []
+        offset = 0
+        for key, (embeddings, _) in items.items():
+            keys.append(key)
+            offsets.append(offset)
+            lengths.append(len(embeddings))
+            offset += len(embeddings)
+        embeddings = np.concatenate(
+            [np.asarray(e, dtype=self.dtype) for e, _ in items.values()],
+        )
+        idf = np.concatenate(
+            [np.asarray(w, dtype=np.float32) for _, w in items.values()],
+        )
+
+        name = f"{time.time_ns():x}-{uuid.uuid4().hex[:8]}"
+        emb_path, idf_path, index_path = _segment_paths(self.directory, name)
+        self._write_atomic(emb_path, lambda f: np.save(f, embeddings))
+        self._write_atomic(idf_path, lambda f: np.save(f, idf))
+        index = dict(keys=keys, offsets=offsets, lengths=lengths)
+        # index is written last: it's what makes the segment visible
+        self._write_atomic(index_path, lambda f: f.write(json.dumps(index).encode()))
+        self.refresh()
+        self.evict()
+
+    def evict(self) -> None:
+        """
+        Removes least recently used segments until the store fits `max_bytes`.
+        """
+        if self.max_bytes is None:
+            return
+        self.refresh()
+        with self._lock:
+            segments = list(self._segments.values())
+        sizes = {segment.name: segment.nbytes() for segment in segments}
+        total = sum(sizes.values())
+        for segment in sorted(segments, key=self._last_used):
+            if total <= self.max_bytes:
+                break
+            self._remove(segment)
+            total -= sizes[segment.name]
+
+    def clear(self) -> None:
+        self.refresh()
+        with self._lock:
+            segments = list(self._segments.values())
+        for segment in segments:
+            self._remove(segment)
+
+    @property
+    def nbytes(self) -> int:
+        self.refresh()
+        with self._lock:
+            return sum(segment.nbytes() for segment in self._segments.values())
+
+    def _remove(self, segment: _Segment) -> None:
+        # index first, so that new readers don't see a partial segment
+        for path in reversed(segment.paths):
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+        with self._lock:
+            self._segments.pop(segment.name, None)
+
+    @staticmethod
+    def _last_used(segment: _Segment) -> float:
+        try:
+            return segment.index_path.stat().st_mtime
+        except FileNotFoundError:
+            return 0.0
+
+    @staticmethod
+    def _touch(segment: _Segment) -> None:
+        try:
+            os.utime(segment.index_path)
+        except FileNotFoundError:
+            pass
+
+    def _write_atomic(self, path: Path, write) -> None:
+        tmp = path.with_name(f".{path.name}.{uuid.uuid4().hex[:8]}.tmp")
+        with open(tmp, "wb") as f:
+            write(f)
+        os.replace(tmp, path)
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            return any(key in segment.rows for segment in self._segments.values())
+
+    def __len__(self) -> int:
+        self.refresh()
+        with self._lock:
+            return len(
+                set().union(*(segment.rows for segment in self._segments.values())),
+            )
+
+
+def main():
+    pass
+
+
+if __name__ == "__main__":
+    main()
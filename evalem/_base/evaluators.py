@@ -1,14 +1,23 @@
 #!/usr/bin/env python3
 from __future__ import annotations
 
-from typing import Iterable, Mapping, Optional, Type, Union
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import ExitStack
+from pickle import PicklingError, dumps
+from typing import Dict, Iterable, Iterator, List, Mapping, Optional, Tuple, Type, Union
+
+from loguru import logger
 
 from .abc import AbstractBase
-from .metrics import AccuracyMetric, Metric
+from .metrics import AccuracyMetric, JuryBasedMetric, Metric, compute_fused
+from .registry import get_backend_registry
 from .structures import (
+    EvaluationInputs,
     EvaluationOutput,
     EvaluationPredictionInstance,
     EvaluationReferenceInstance,
+    MetricResult,
 )
 
 
@@ -30,6 +39,24 @@ class Evaluator(AbstractBase):
         ```metrics```: ```Optional[Iterable[Type[Metric]]]```
             An iterable (list/set/tuple) of metric objects.
             - If None, default `Evaluator.DEFAULT_METRIC_CLS` is used
+        ```debug```: ```bool```
+            If enabled, debugging logs are printed
+        ```executor```: ```str```
+            How the metrics are run:
+            - "serial" (default): one after another
+            - "thread": concurrently in a thread pool
+            - "process": concurrently in a process pool
+            - "auto": each metric in a thread or process pool based on
+              its `Metric.execution_hint`
+            In concurrent modes, result order is preserved and an error in a
+            metric is captured in its result (`extra["error"]`) instead of
+            failing the whole evaluation.
+        ```max_workers```: ```Optional[int]```
+            Maximum number of workers per pool for concurrent executors.
+        ```fuse_jury```: ```bool```
+            If True (default), the jury-based metrics that use jury backend
+            are computed with a single `Jury(metrics=[...])` call
+            (see `metrics.compute_fused(...)`) instead of one call per metric.
 
     Direct usage:
             .. code-block: python
@@ -85,10 +112,15 @@ class Evaluator(AbstractBase):
     # default is single accuracy metric
     DEFAULT_METRIC_CLS = AccuracyMetric
 
+    EXECUTORS = ("serial", "thread", "process", "auto")
+
     def __init__(
         self,
         metrics: Optional[Iterable[Type[Metric]]] = None,
         debug: bool = False,
+        executor: str = "serial",
+        max_workers: Optional[int] = None,
+        fuse_jury: bool = True,
     ) -> None:
         super().__init__(debug)
 
@@ -96,6 +128,14 @@ class Evaluator(AbstractBase):
         self._type_check_metrics(metrics)
         self.metrics = metrics
 
+        if executor not in Evaluator.EXECUTORS:
+            raise ValueError(
+                f"Invalid executor={executor}. Expected one of {Evaluator.EXECUTORS}",
+            )
+        self.executor = executor
+        self.max_workers = max_workers
+        self.fuse_jury = fuse_jury
+
     @staticmethod
     def _type_check_metrics(
         metrics: Union[Type[Metric], Iterable[Type[Metric]]],
@@ -128,6 +168,14 @@ class Evaluator(AbstractBase):
         self.metrics.append(metric)
         return self
 
+    def warm_up(self) -> Evaluator:
+        """
+        Loads the backends of all the metrics upfront.
+        See `evalem._base.registry.BackendRegistry`.
+        """
+        get_backend_registry().warm_up(*self.metrics)
+        return self
+
     def evaluate(
         self,
         predictions: EvaluationPredictionInstance,
@@ -142,6 +190,7 @@ class Evaluator(AbstractBase):
                 Could be:
                     - Single prediction `List[PredictionDTO]`
                     - Multiple prediction `List[List[PredictionDTO]]`
+                    - Columnar `EvaluationBatch`
                 Each prediction corresponds is one-to-one mapped to corresponding
                 item in the `references` list.
                 See  `evalem.structures` module to understand in detail.
@@ -150,19 +199,219 @@ class Evaluator(AbstractBase):
                 Could be:
                     - Single reference `List[ReferenceDTO]`
                     - Multiple reference `List[List[ReferenceDTO]]`
+                    - Columnar `EvaluationBatch`
                 Each reference corresponds is one-to-one mapped to corresponding
                 item in the `predictions` list.
                 See  `evalem.structures` module to understand in detail.
 
         Returns:
             Mapping (dict) of metric name to corresponding metric output
+
+        Note:
+            The inputs are normalized once (see `EvaluationInputs`) and the
+            normalized batches are shared by all the metrics, so any
+            conversion/flattening is cached across metrics.
         """
-        return list(
-            map(
-                lambda m: m(predictions=predictions, references=references, **kwargs),
-                self.metrics,
-            ),
-        )
+        inputs = EvaluationInputs.from_instances(predictions, references)
+        if self.debug:
+            logger.debug(
+                f"Evaluating {len(inputs)} items in {inputs.mode.name} mode.",
+            )
+        results = self._evaluate_fused(inputs, **kwargs) if self.fuse_jury else {}
+        metrics = [m for idx, m in enumerate(self.metrics) if idx not in results]
+        if self.executor != "serial":
+            computed = self._evaluate_concurrently(inputs, metrics, **kwargs)
+        else:
+            computed = list(
+                map(
+                    lambda m: m(
+                        predictions=inputs.predictions,
+                        references=inputs.references,
+                        **kwargs,
+                    ),
+                    metrics,
+                ),
+            )
+        computed = iter(computed)
+        return [
+            results[idx] if idx in results else next(computed)
+            for idx in range(len(self.metrics))
+        ]
+
+    def _evaluate_fused(
+        self,
+        inputs: EvaluationInputs,
+        **kwargs,
+    ) -> Dict[int, MetricResult]:
+        """
+        Computes all the fusable jury-based metrics with a single jury call.
+        Returns the results keyed by the index of the metric.
+        If the fused call fails, the metrics are computed individually.
+        """
+        indices = [
+            idx
+            for idx, metric in enumerate(self.metrics)
+            if isinstance(metric, JuryBasedMetric) and metric.fusable(inputs, **kwargs)
+        ]
+        if len(indices) < 2:
+            return {}
+        metrics = [self.metrics[idx] for idx in indices]
+        try:
+            results = compute_fused(
+                metrics,
+                inputs.predictions,
+                inputs.references,
+                **kwargs,
+            )
+        except Exception as err:
+            logger.warning(
+                f"Fused jury evaluation failed with {err!r}."
+                + " Computing the metrics individually.",
+            )
+            return {}
+        if self.debug:
+            logger.debug(f"Computed {len(metrics)} jury metrics in a single call.")
+        return dict(zip(indices, results))
+
+    def _executor_kind(self, metric: Metric) -> str:
+        if self.executor == "auto":
+            return metric.execution_hint
+        return self.executor
+
+    def _evaluate_concurrently(
+        self,
+        inputs: EvaluationInputs,
+        metrics: List[Metric],
+        **kwargs,
+    ) -> List[MetricResult]:
+        """
+        Runs the metrics concurrently in thread/process pools.
+        Results are in the same order as `metrics`.
+        Thread workers share the normalized inputs (and their cache).
+        """
+        if not metrics:
+            return []
+        kinds = list(map(self._executor_kind, metrics))
+        for idx, (metric, kind) in enumerate(zip(metrics, kinds)):
+            if kind == "process" and not _is_picklable(metric):
+                logger.warning(
+                    f"{metric} can't be pickled. Running it in the current process.",
+                )
+                kinds[idx] = "inline"
+        n_workers = self.max_workers or len(metrics)
+        futures = []
+        with ExitStack() as stack:
+            pools = {}
+            if "thread" in kinds:
+                pools["thread"] = stack.enter_context(
+                    ThreadPoolExecutor(
+                        max_workers=min(n_workers, kinds.count("thread")),
+                    ),
+                )
+            if "process" in kinds:
+                pools["process"] = stack.enter_context(
+                    ProcessPoolExecutor(
+                        max_workers=min(n_workers, kinds.count("process")),
+                    ),
+                )
+            for metric, kind in zip(metrics, kinds):
+                if kind == "inline":
+                    futures.append(None)
+                    continue
+                futures.append(
+                    pools[kind].submit(
+                        _run_metric,
+                        metric,
+                        inputs.predictions,
+                        inputs.references,
+                        kwargs,
+                    ),
+                )
+
+            results = []
+            for metric, kind, future in zip(metrics, kinds, futures):
+                if future is None:
+                    results.append(_run_metric_safe(metric, inputs, kwargs))
+                    continue
+                try:
+                    result = future.result()
+                except (PicklingError, BrokenProcessPool) as err:
+                    if kind != "process":
+                        results.append(_error_result(metric, inputs, err))
+                        continue
+                    # eg: unpicklable inputs, or a crashed worker
+                    logger.warning(
+                        f"Couldn't run {metric} in a process ({err!r})."
+                        + " Running in the current process.",
+                    )
+                    result = _run_metric_safe(metric, inputs, kwargs)
+                except Exception as err:
+                    result = _error_result(metric, inputs, err)
+                results.append(result)
+        return results
+
+    def evaluate_stream(
+        self,
+        chunks: Iterable[
+            Tuple[EvaluationPredictionInstance, EvaluationReferenceInstance]
+        ],
+        **kwargs,
+    ) -> List[MetricResult]:
+        """
+        Evaluates the metrics over an iterable of (predictions, references)
+        chunks, eg: from a generator reading a dataset bigger than memory.
+        See `iter_chunks(...)` to split in-memory data.
+
+        Metrics that support streaming (see `Metric.init_state(...)`) only
+        keep their sufficient statistics, so memory is bounded by the chunk size.
+        Other metrics fall back to collecting all the chunks and computing
+        once at the end.
+
+        Args:
+            ```chunks```: ```Iterable[Tuple[EvaluationPredictionInstance, EvaluationReferenceInstance]]```
+                Chunks of (predictions, references) in any of the supported formats
+
+        Returns:
+            List of `MetricResult`, one per metric (same order as `self.metrics`)
+        """
+        streaming = [metric.supports_streaming for metric in self.metrics]
+        if not all(streaming):
+            names = [m.__classname__ for m, s in zip(self.metrics, streaming) if not s]
+            logger.warning(
+                f"{names} don't support streaming. All the chunks will be kept in memory.",
+            )
+        states = [
+            m.init_state() if s else None for m, s in zip(self.metrics, streaming)
+        ]
+        predictions, references = [], []
+        n_chunks = 0
+        for chunk_predictions, chunk_references in chunks:
+            inputs = EvaluationInputs.from_instances(
+                chunk_predictions,
+                chunk_references,
+            )
+            for idx, metric in enumerate(self.metrics):
+                if streaming[idx]:
+                    states[idx] = metric.update(
+                        states[idx],
+                        inputs.predictions,
+                        inputs.references,
+                        **kwargs,
+                    )
+            if not all(streaming):
+                predictions.extend(inputs.predictions.to_dtos())
+                references.extend(inputs.references.to_dtos())
+            n_chunks += 1
+        if self.debug:
+            logger.debug(f"Evaluated {n_chunks} chunks.")
+
+        results = []
+        for metric, state in zip(self.metrics, states):
+            if state is not None:
+                results.append(metric.finalize(state))
+            else:
+                results.append(metric(predictions, references, **kwargs))
+        return results
 
     def __call__(
         self,
@@ -178,6 +427,7 @@ class Evaluator(AbstractBase):
                 Could be:
                     - Single prediction `List[PredictionDTO]`
                     - Multiple prediction `List[List[PredictionDTO]]`
+                    - Columnar `EvaluationBatch`
                 Each prediction corresponds is one-to-one mapped to corresponding
                 item in the `references` list.
                 See  `evalem.structures` module to understand in detail.
@@ -186,6 +436,7 @@ class Evaluator(AbstractBase):
                 Could be:
                     - Single reference `List[ReferenceDTO]`
                     - Multiple reference `List[List[ReferenceDTO]]`
+                    - Columnar `EvaluationBatch`
                 Each reference corresponds is one-to-one mapped to corresponding
                 item in the `predictions` list.
                 See  `evalem.structures` module to understand in detail.
@@ -200,6 +451,71 @@ class Evaluator(AbstractBase):
         return f"{super().__repr__()} || {metric_str}"
 
 
+def _run_metric(
+    metric: Metric,
+    predictions: EvaluationPredictionInstance,
+    references: EvaluationReferenceInstance,
+    kwargs: dict,
+) -> MetricResult:
+    return metric(predictions=predictions, references=references, **kwargs)
+
+
+def _is_picklable(metric: Metric) -> bool:
+    try:
+        dumps(metric)
+    except Exception:
+        return False
+    return True
+
+
+def _error_result(
+    metric: Metric,
+    inputs: EvaluationInputs,
+    err: Exception,
+) -> MetricResult:
+    logger.error(f"{metric} failed with {err!r}")
+    return MetricResult.from_dict(
+        dict(
+            metric_name=metric.__classname__,
+            score=None,
+            total_items=len(inputs),
+            error=repr(err),
+        ),
+    )
+
+
+def _run_metric_safe(
+    metric: Metric,
+    inputs: EvaluationInputs,
+    kwargs: dict,
+) -> MetricResult:
+    try:
+        return _run_metric(metric, inputs.predictions, inputs.references, kwargs)
+    except Exception as err:
+        return _error_result(metric, inputs, err)
+
+
+def iter_chunks(
+    predictions: EvaluationPredictionInstance,
+    references: EvaluationReferenceInstance,
+    chunk_size: int = 10000,
+) -> Iterator[Tuple[EvaluationPredictionInstance, EvaluationReferenceInstance]]:
+    """
+    Splits predictions and references into aligned chunks of `chunk_size` items
+    for `Evaluator.evaluate_stream(...)`.
+    """
+    if len(predictions) != len(references):
+        raise ValueError(
+            "Mismatched length of predictions and references."
+            + f" {len(predictions)} != {len(references)}",
+        )
+    for start in range(0, len(predictions), chunk_size):
+        yield (
+            predictions[start : start + chunk_size],
+            references[start : start + chunk_size],
+        )
+
+
 def main():
     pass
 
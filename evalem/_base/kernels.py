@@ -0,0 +1,684 @@
+#!/usr/bin/env python3
+"""
+    This module contains vectorized numpy kernels used by the native
+    metric backend (see `evalem._base.metrics.set_default_backend`).
+
+    The kernels work on label-encoded (integer) arrays so that all the
+    string handling happens only once per unique string.
+"""
+
+from __future__ import annotations
+
+import re
+import string
+from dataclasses import dataclass
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Hashable,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+import numpy as np
+
+_PUNCTUATION = re.compile(r"[%s]" % re.escape(string.punctuation))
+
+
+def normalize_text(text: str, uncased: bool = True) -> str:
+    """
+    Same normalization used by Jury for the token-based metrics:
+    punctuation is replaced by whitespace, whitespaces are collapsed
+    and the text is lower-cased.
+    """
+    text = _PUNCTUATION.sub(" ", text)
+    normalized_text = " ".join(text.split())
+    if uncased:
+        normalized_text = normalized_text.lower()
+    return normalized_text
+
+
+def factorize(values: Iterable[Hashable]) -> Tuple[np.ndarray, List[Hashable]]:
+    """
+    Label-encodes values to integer codes in order of first appearance.
+
+    Returns:
+        Tuple of (codes, uniques) such that `uniques[codes[i]] == values[i]`
+    """
+    table: Dict[Hashable, int] = {}
+    codes = np.fromiter(
+        (table.setdefault(v, len(table)) for v in values),
+        dtype=np.int64,
+    )
+    return codes, list(table)
+
+
+def ragged_arange(lengths: np.ndarray) -> np.ndarray:
+    """
+    Concatenation of `arange(l)` for every `l` in `lengths`.
+    Eg: [2, 0, 3] -> [0, 1, 0, 1, 2]
+    """
+    lengths = np.asarray(lengths, dtype=np.int64)
+    ends = np.cumsum(lengths)
+    return np.arange(ends[-1] if len(ends) else 0) - np.repeat(ends - lengths, lengths)
+
+
+def ragged_gather(
+    flat: np.ndarray,
+    offsets: np.ndarray,
+    rows: np.ndarray,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Gathers the ragged rows `flat[offsets[r]:offsets[r + 1]]` for each `r` in `rows`.
+
+    Returns:
+        Tuple of (row position for each gathered element, gathered elements)
+    """
+    lengths = (offsets[1:] - offsets[:-1])[rows]
+    positions = np.repeat(offsets[:-1][rows], lengths) + ragged_arange(lengths)
+    return np.repeat(np.arange(len(rows)), lengths), flat[positions]
+
+
+@dataclass(frozen=True)
+class RaggedPairs:
+    """
+    Index-based cartesian pairing of predictions and references per item.
+
+    Item `i` owns pairs `pair_offsets[i]:pair_offsets[i + 1]`, and pair `k`
+    compares prediction `pred_index[k]` with reference `ref_index[k]`
+    (both indexing into the flat value pools). Nothing is copied.
+    """
+
+    item_index: np.ndarray
+    pred_index: np.ndarray
+    ref_index: np.ndarray
+    pair_offsets: np.ndarray
+
+    @classmethod
+    def from_offsets(
+        cls,
+        pred_offsets: np.ndarray,
+        ref_offsets: np.ndarray,
+    ) -> RaggedPairs:
+        pred_lengths = np.diff(pred_offsets)
+        ref_lengths = np.diff(ref_offsets)
+        n_pairs = pred_lengths * ref_lengths
+        item_index = np.repeat(np.arange(len(n_pairs)), n_pairs)
+        local = ragged_arange(n_pairs)
+        # avoid division by zero for items without any pair
+        denom = np.maximum(ref_lengths, 1)[item_index]
+        return cls(
+            item_index=item_index,
+            pred_index=pred_offsets[:-1][item_index] + local // denom,
+            ref_index=ref_offsets[:-1][item_index] + local % denom,
+            pair_offsets=np.concatenate(([0], np.cumsum(n_pairs))).astype(np.int64),
+        )
+
+    @property
+    def n_items(self) -> int:
+        return len(self.pair_offsets) - 1
+
+    def reduce(self, scores: np.ndarray, reduce_fn: str = "max") -> np.ndarray:
+        """
+        Reduces pair-wise scores to per-item scores.
+        NaN scores are ignored. Items without any valid pair are NaN.
+
+        Args:
+            ```scores```: ```np.ndarray```
+                Score for each pair
+            ```reduce_fn```: ```str```
+                One of "max", "min" or "mean"
+        """
+        scores = np.asarray(scores, dtype=np.float64)
+        valid = ~np.isnan(scores)
+        res = np.full(self.n_items, np.nan)
+        if reduce_fn == "mean":
+            counts = np.bincount(self.item_index[valid], minlength=self.n_items)
+            sums = np.bincount(
+                self.item_index[valid],
+                weights=scores[valid],
+                minlength=self.n_items,
+            )
+            np.divide(sums, counts, out=res, where=counts > 0)
+            return res
+        ufunc = {"max": np.fmax, "min": np.fmin}.get(reduce_fn)
+        if ufunc is None:
+            raise ValueError(f"Invalid reduce_fn={reduce_fn}. Expected max/min/mean")
+        ufunc.at(res, self.item_index, scores)
+        return res
+
+
+@dataclass(frozen=True)
+class TokenOverlap:
+    """
+    Bag-of-token overlap statistics for each (prediction, reference) pair.
+    """
+
+    # size of multiset intersection
+    common: np.ndarray
+    pred_length: np.ndarray
+    ref_length: np.ndarray
+
+    def precision(self) -> np.ndarray:
+        res = np.zeros(len(self.common))
+        np.divide(self.common, self.pred_length, out=res, where=self.pred_length > 0)
+        return res
+
+    def recall(self) -> np.ndarray:
+        res = np.zeros(len(self.common))
+        np.divide(self.common, self.ref_length, out=res, where=self.ref_length > 0)
+        return res
+
+    def accuracy(self) -> np.ndarray:
+        """
+        Overlap over the longer of the two.
+        Pairs that are both empty are NaN (ignored)
+        """
+        denom = np.maximum(self.pred_length, self.ref_length)
+        res = np.full(len(self.common), np.nan)
+        np.divide(self.common, denom, out=res, where=denom > 0)
+        return res
+
+    def f1(self) -> np.ndarray:
+        precision, recall = self.precision(), self.recall()
+        res = np.zeros(len(self.common))
+        num = 2 * recall * precision
+        np.divide(num, recall + precision, out=res, where=(recall + precision) > 0)
+        return res
+
+
+def _pair_codes(
+    codes: np.ndarray,
+    n: int,
+    pred_index: Optional[np.ndarray] = None,
+    ref_index: Optional[np.ndarray] = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Splits codes of concatenated (predictions + references) and
+    gathers them for each pair if pair indices are given.
+    """
+    pcodes, rcodes = codes[:n], codes[n:]
+    if pred_index is not None:
+        pcodes, rcodes = pcodes[pred_index], rcodes[ref_index]
+    return pcodes, rcodes
+
+
+def jury_tokenize(text: str) -> List[str]:
+    return normalize_text(text).split()
+
+
+def token_overlap(
+    predictions: Sequence[str],
+    references: Sequence[str],
+    tokenize: Callable[[str], Sequence[str]] = jury_tokenize,
+    pred_index: Optional[np.ndarray] = None,
+    ref_index: Optional[np.ndarray] = None,
+) -> TokenOverlap:
+    """
+    Computes the multiset token overlap between aligned predictions and
+    references. By default, tokens are the ones from Jury's `normalize_text(...)`.
+
+    Each unique string is normalized/tokenized only once and each unique
+    (prediction, reference) pair is intersected only once.
+
+    Args:
+        ```predictions```: ```Sequence[str]```
+            Predicted texts
+        ```references```: ```Sequence[str]```
+            Reference texts aligned with predictions
+        ```tokenize```: ```Callable[[str], Sequence[str]]```
+            Tokenizer applied to each unique text
+        ```pred_index```: ```Optional[np.ndarray]```
+            If provided, pairs are `(predictions[pred_index[k]], references[ref_index[k]])`
+            instead of aligned items. So, predictions/references can be flat
+            value pools (see `RaggedPairs`) and nothing is repeated.
+        ```ref_index```: ```Optional[np.ndarray]```
+            See `pred_index`
+    """
+    n = len(predictions)
+    codes, uniques = factorize(list(predictions) + list(references))
+    pcodes, rcodes = _pair_codes(codes, n, pred_index, ref_index)
+
+    vocab: Dict[str, int] = {}
+    tokens = [[vocab.setdefault(t, len(vocab)) for t in tokenize(u)] for u in uniques]
+    lengths = np.fromiter(map(len, tokens), dtype=np.int64, count=len(tokens))
+    flat = np.fromiter(
+        (t for toks in tokens for t in toks),
+        dtype=np.int64,
+        count=int(lengths.sum()),
+    )
+    offsets = np.concatenate(([0], np.cumsum(lengths))).astype(np.int64)
+
+    n_uniques = max(len(uniques), 1)
+    upairs, inverse = np.unique(pcodes * n_uniques + rcodes, return_inverse=True)
+    up, ur = upairs // n_uniques, upairs % n_uniques
+
+    # count (pair, token) occurrences on both sides and intersect
+    n_vocab = max(len(vocab), 1)
+    prow, ptok = ragged_gather(flat, offsets, up)
+    rrow, rtok = ragged_gather(flat, offsets, ur)
+    pkeys, pcounts = np.unique(prow * n_vocab + ptok, return_counts=True)
+    rkeys, rcounts = np.unique(rrow * n_vocab + rtok, return_counts=True)
+    shared, pidx, ridx = np.intersect1d(
+        pkeys,
+        rkeys,
+        assume_unique=True,
+        return_indices=True,
+    )
+    common = np.bincount(
+        shared // n_vocab,
+        weights=np.minimum(pcounts[pidx], rcounts[ridx]),
+        minlength=len(upairs),
+    ).astype(np.int64)
+
+    return TokenOverlap(
+        common=common[inverse.ravel()],
+        pred_length=lengths[pcodes],
+        ref_length=lengths[rcodes],
+    )
+
+
+# Above this many labels, confusion matrices are kept sparse (CSR)
+# instead of a dense `labels x labels` array.
+SPARSE_LABEL_THRESHOLD = 2048
+
+
+def use_sparse(n_labels: int, sparse_threshold: Optional[int] = None) -> bool:
+    """
+    Whether a confusion matrix over `n_labels` labels should be sparse.
+    If `sparse_threshold` is None, `SPARSE_LABEL_THRESHOLD` is used.
+    """
+    if sparse_threshold is None:
+        sparse_threshold = SPARSE_LABEL_THRESHOLD
+    return n_labels > sparse_threshold
+
+
+def _count_matrix(
+    rows: np.ndarray,
+    cols: np.ndarray,
+    n_labels: int,
+    weights: Optional[np.ndarray] = None,
+    sparse: bool = False,
+):
+    """
+    Counts (row, col) occurrences into a `n_labels x n_labels` matrix,
+    either dense (single `np.bincount`) or sparse CSR (duplicates summed).
+    """
+    if not sparse:
+        counts = np.bincount(
+            rows * n_labels + cols,
+            weights=weights,
+            minlength=n_labels * n_labels,
+        )
+        return counts.astype(np.int64).reshape(n_labels, n_labels)
+
+    from scipy import sparse as sp
+
+    if weights is None:
+        weights = np.ones(len(rows), dtype=np.int64)
+    return sp.coo_matrix(
+        (weights.astype(np.int64), (rows, cols)),
+        shape=(n_labels, n_labels),
+    ).tocsr()
+
+
+class ConfusionAccumulator:
+    """
+    Incrementally accumulates a confusion matrix from batches of labels.
+
+    Labels are encoded as they are first seen, so the label space
+    doesn't need to be known upfront. Pending codes are compacted into a
+    sparse count matrix every `chunk_size` items, which keeps memory bounded
+    by the number of non-zero cells instead of `labels x labels`.
+
+    Usage:
+        .. code-block: python
+
+            acc = ConfusionAccumulator()
+            for refs, preds in chunks:
+                acc.update(refs, preds)
+            stats = acc.finalize()
+    """
+
+    def __init__(
+        self,
+        sparse_threshold: Optional[int] = None,
+        chunk_size: int = 1_000_000,
+    ) -> None:
+        """
+        Args:
+            ```sparse_threshold```: ```Optional[int]```
+                Number of labels above which the final matrix is sparse.
+                If None, `SPARSE_LABEL_THRESHOLD` is used.
+            ```chunk_size```: ```int```
+                Number of pending items after which the counts are compacted.
+        """
+        self.sparse_threshold = sparse_threshold
+        self.chunk_size = chunk_size
+        self._table: Dict[Hashable, int] = {}
+        self._pending: List[Tuple[np.ndarray, np.ndarray, Optional[np.ndarray]]] = []
+        self._n_pending = 0
+        self._counts = None
+
+    @property
+    def n_labels(self) -> int:
+        return len(self._table)
+
+    def _encode(self, values: Iterable[Hashable]) -> np.ndarray:
+        table = self._table
+        return np.fromiter(
+            (table.setdefault(v, len(table)) for v in values),
+            dtype=np.int64,
+        )
+
+    def _add(
+        self,
+        rows: np.ndarray,
+        cols: np.ndarray,
+        weights: Optional[np.ndarray] = None,
+    ) -> None:
+        self._pending.append((rows, cols, weights))
+        self._n_pending += len(rows)
+        if self._n_pending >= self.chunk_size:
+            self._compact()
+
+    def update(
+        self,
+        references: Sequence[Hashable],
+        predictions: Sequence[Hashable],
+    ) -> ConfusionAccumulator:
+        if len(references) != len(predictions):
+            raise ValueError(
+                "Mismatched length of references and predictions."
+                + f" {len(references)} != {len(predictions)}",
+            )
+        self._add(self._encode(references), self._encode(predictions))
+        return self
+
+    def merge(self, other: ConfusionAccumulator) -> ConfusionAccumulator:
+        """
+        Adds the counts of another accumulator (eg: from another chunk/worker).
+        """
+        rows, cols, weights = other._triplets()
+        remap = self._encode(other._table)
+        self._add(remap[rows], remap[cols], weights)
+        return self
+
+    def _triplets(self) -> Tuple[np.ndarray, np.ndarray, Optional[np.ndarray]]:
+        """
+        All the counts as (row codes, col codes, weights).
+        Weights are None when every entry counts as one.
+        """
+        parts = list(self._pending)
+        if self._counts is not None:
+            coo = self._counts.tocoo()
+            parts.append((coo.row.astype(np.int64), coo.col.astype(np.int64), coo.data))
+        if not parts:
+            empty = np.zeros(0, dtype=np.int64)
+            return empty, empty, None
+        rows = np.concatenate([p[0] for p in parts])
+        cols = np.concatenate([p[1] for p in parts])
+        weights = None
+        if any(p[2] is not None for p in parts):
+            weights = np.concatenate(
+                [
+                    p[2] if p[2] is not None else np.ones(len(p[0]), dtype=np.int64)
+                    for p in parts
+                ],
+            )
+        return rows, cols, weights
+
+    def _compact(self) -> None:
+        rows, cols, weights = self._triplets()
+        self._counts = _count_matrix(rows, cols, self.n_labels, weights, sparse=True)
+        self._pending, self._n_pending = [], 0
+
+    def finalize(self) -> ClassificationStats:
+        """
+        Builds the final stats with sorted labels.
+        The matrix is sparse only when there are more than `sparse_threshold` labels.
+        """
+        uniques = list(self._table)
+        try:
+            labels = sorted(uniques)
+        except TypeError:
+            # non-comparable labels (eg: mixed types) keep their first appearance order
+            labels = uniques
+        position = {label: idx for idx, label in enumerate(labels)}
+        order = np.array([position[u] for u in uniques], dtype=np.int64)
+
+        rows, cols, weights = self._triplets()
+        matrix = _count_matrix(
+            order[rows],
+            order[cols],
+            len(labels),
+            weights,
+            sparse=use_sparse(len(labels), self.sparse_threshold),
+        )
+        return ClassificationStats(matrix=matrix, labels=labels)
+
+
+@dataclass(frozen=True)
+class ClassificationStats:
+    """
+    Confusion matrix over label-encoded classes and all the classification
+    metrics derived from it.
+
+    Rows of the `matrix` are references (true labels) and
+    columns are predictions, same as `sklearn.metrics.confusion_matrix`.
+    The matrix is either a dense `np.ndarray` or a `scipy.sparse` CSR matrix
+    for large label spaces. Metrics never densify it.
+    """
+
+    matrix: Any
+    labels: List[Hashable]
+
+    @classmethod
+    def from_labels(
+        cls,
+        references: Sequence[Hashable],
+        predictions: Sequence[Hashable],
+        sparse_threshold: Optional[int] = None,
+    ) -> ClassificationStats:
+        """
+        Builds the stats in a single pass: labels are encoded once and counted
+        with one `np.bincount` (or one COO to CSR conversion when sparse).
+        Labels are sorted.
+        """
+        return (
+            ConfusionAccumulator(sparse_threshold=sparse_threshold)
+            .update(references, predictions)
+            .finalize()
+        )
+
+    @property
+    def is_sparse(self) -> bool:
+        return not isinstance(self.matrix, np.ndarray)
+
+    def as_sparse(self, sparse: bool = True) -> ClassificationStats:
+        """
+        Returns the stats with the matrix converted to sparse CSR/dense as needed.
+        """
+        if sparse == self.is_sparse:
+            return self
+        if sparse:
+            from scipy import sparse as sp
+
+            matrix = sp.csr_matrix(self.matrix)
+        else:
+            matrix = self.matrix.toarray()
+        return ClassificationStats(matrix=matrix, labels=self.labels)
+
+    @property
+    def support(self) -> np.ndarray:
+        """Number of references for each class"""
+        return np.asarray(self.matrix.sum(axis=1)).ravel()
+
+    @property
+    def predicted(self) -> np.ndarray:
+        """Number of predictions for each class"""
+        return np.asarray(self.matrix.sum(axis=0)).ravel()
+
+    @property
+    def true_positives(self) -> np.ndarray:
+        return np.asarray(self.matrix.diagonal())
+
+    @property
+    def total(self) -> int:
+        return int(self.support.sum())
+
+    @property
+    def accuracy(self) -> float:
+        return float(self.true_positives.sum() / self.total) if self.total else 0.0
+
+    @staticmethod
+    def _safe_divide(num: np.ndarray, denom: np.ndarray) -> np.ndarray:
+        res = np.zeros(len(num))
+        np.divide(num, denom, out=res, where=denom > 0)
+        return res
+
+    def _average(self, values: np.ndarray, average: Optional[str]):
+        if average is None:
+            return values
+        if average == "micro":
+            # for single-label classification, micro P/R/F1 is the accuracy
+            return self.accuracy
+        if average == "macro":
+            return float(values.mean()) if len(values) else 0.0
+        if average == "weighted":
+            support = self.support
+            return (
+                float((values * support).sum() / support.sum()) if self.total else 0.0
+            )
+        raise ValueError(
+            f"Invalid average={average}. Expected None/micro/macro/weighted",
+        )
+
+    def precision(self, average: Optional[str] = "micro"):
+        values = self._safe_divide(self.true_positives, self.predicted)
+        return self._average(values, average)
+
+    def recall(self, average: Optional[str] = "micro"):
+        values = self._safe_divide(self.true_positives, self.support)
+        return self._average(values, average)
+
+    def f1(self, average: Optional[str] = "micro"):
+        precision, recall = self.precision(None), self.recall(None)
+        values = self._safe_divide(2 * precision * recall, precision + recall)
+        return self._average(values, average)
+
+    def report(self) -> dict:
+        """
+        Classification report with micro/macro/weighted averages
+        and per-class metrics.
+        """
+        res = dict(accuracy=self.accuracy)
+        for average in ("micro", "macro", "weighted"):
+            res[average] = dict(
+                precision=self.precision(average),
+                recall=self.recall(average),
+                f1=self.f1(average),
+            )
+        per_class = zip(
+            self.labels,
+            self.precision(None).tolist(),
+            self.recall(None).tolist(),
+            self.f1(None).tolist(),
+            self.support.tolist(),
+        )
+        res["per_class"] = {
+            label: dict(precision=p, recall=r, f1=f, support=n)
+            for label, p, r, f, n in per_class
+        }
+        return res
+
+
+def exact_match(
+    predictions: Sequence,
+    references: Sequence,
+    pred_index: Optional[np.ndarray] = None,
+    ref_index: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """
+    Element-wise equality of aligned predictions and references
+    computed over label-encoded values.
+    Pair indices work the same as in `token_overlap(...)`.
+    """
+    codes, _ = factorize(list(predictions) + list(references))
+    pcodes, rcodes = _pair_codes(codes, len(predictions), pred_index, ref_index)
+    return pcodes == rcodes
+
+
+def token_budget_batches(
+    lengths: Sequence[int],
+    max_tokens: int,
+    max_batch_size: Optional[int] = None,
+) -> List[np.ndarray]:
+    """
+    Length-bucketed batching for padded model inputs.
+    Sequences are sorted by length and grouped so that each padded batch
+    (`batch size x longest sequence`) fits in the `max_tokens` budget.
+    A sequence longer than the budget gets a batch of its own.
+
+    Args:
+        ```lengths```: ```Sequence[int]```
+            Length (number of tokens) of each sequence
+        ```max_tokens```: ```int```
+            Token budget (including padding) per batch
+        ```max_batch_size```: ```Optional[int]```
+            Optional cap on the number of sequences per batch
+
+    Returns:
+        List of index arrays (into `lengths`), one per batch
+    """
+    if max_tokens < 1:
+        raise ValueError(f"Invalid max_tokens={max_tokens}. Expected >= 1")
+    lengths = np.asarray(lengths, dtype=np.int64)
+    order = np.argsort(lengths, kind="stable")
+    batches, start = [], 0
+    for end in range(1, len(order) + 1):
+        # sorted, so the last sequence of the batch is the longest
+        size = end - start
+        fits = size * lengths[order[end - 1]] <= max_tokens and (
+            max_batch_size is None or size <= max_batch_size
+        )
+        if not fits and size > 1:
+            batches.append(order[start : end - 1])
+            start = end - 1
+    if start < len(order):
+        batches.append(order[start:])
+    return batches
+
+
+def padding_ratio(lengths: Sequence[int], batches: Iterable[np.ndarray]) -> float:
+    """
+    Fraction of the padded slots (`batch size x longest sequence`)
+    over all the batches that are padding.
+    """
+    lengths = np.asarray(lengths, dtype=np.int64)
+    slots = tokens = 0
+    for batch in batches:
+        if len(batch):
+            slots += len(batch) * int(lengths[batch].max())
+            tokens += int(lengths[batch].sum())
+    return 1.0 - tokens / slots if slots else 0.0
+
+
+def sequential_mean(values: np.ndarray) -> float:
+    """
+    Left-to-right mean (same rounding as python's `sum(values) / len(values)`).
+    """
+    values = np.asarray(values, dtype=np.float64)
+    return float(np.cumsum(values)[-1] / len(values)) if len(values) else np.nan
+
+
+def main():
+    pass
+
+
+if __name__ == "__main__":
+    main()
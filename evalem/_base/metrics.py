@@ -3,25 +3,79 @@
 from __future__ import annotations
 
 from abc import abstractmethod
-from typing import Iterable, List, Tuple
+from typing import TYPE_CHECKING, Any, Iterable, List, Optional, Sequence, Tuple, Union
 
-from jury import Jury
-from sklearn.metrics import confusion_matrix
+import numpy as np
+from loguru import logger
 
-from ..misc.utils import format_to_jury
 from .abc import AbstractBase
+from .kernels import (
+    ClassificationStats,
+    ConfusionAccumulator,
+    TokenOverlap,
+    exact_match,
+    normalize_text,
+    sequential_mean,
+    token_overlap,
+    use_sparse,
+)
+from .registry import get_backend_registry
+from .states import MeanState
 from .structures import (
+    EvaluationBatch,
+    EvaluationInputs,
     EvaluationPredictionInstance,
     EvaluationReferenceInstance,
     MetricResult,
     MultiplePredictionInstance,
     MultipleReferenceInstance,
-    PredictionInstance,
     SequenceType,
     SinglePredictionInstance,
     SingleReferenceInstance,
+    prediction_instance_types,
 )
 
+if TYPE_CHECKING:
+    from jury import Jury
+
+
+# Backends to compute the metrics:
+#   - "jury": uses `jury.Jury` scorer
+#   - "native": uses vectorized numpy kernels from `evalem._base.kernels`
+#     (only for metrics that have a native implementation, others use jury)
+BACKENDS = ("jury", "native")
+_DEFAULT_BACKEND = "jury"
+
+
+def _validate_backend(backend: str) -> str:
+    backend = str(backend).lower()
+    if backend not in BACKENDS:
+        raise ValueError(f"Invalid backend={backend}. Expected one of {BACKENDS}")
+    return backend
+
+
+def set_default_backend(backend: str) -> None:
+    """
+    Globally sets the backend for all the metrics that aren't
+    explicitly constructed with a `backend`.
+    Only the metrics whose native results match jury's exactly follow
+    the global "native" backend. Others (`RougeMetric`: plain mean instead
+    of jury's bootstrap mid) are native only with `backend="native"`.
+
+    Usage:
+        .. code-block: python
+
+            from evalem._base.metrics import set_default_backend
+
+            set_default_backend("native")
+    """
+    global _DEFAULT_BACKEND
+    _DEFAULT_BACKEND = _validate_backend(backend)
+
+
+def get_default_backend() -> str:
+    return _DEFAULT_BACKEND
+
 
 class Metric(AbstractBase):
     """
@@ -41,6 +95,24 @@ class Metric(AbstractBase):
         super().__init__(debug=debug)
         self.device = device
 
+    @property
+    def execution_hint(self) -> str:
+        """
+        Preferred executor when metrics run concurrently
+        (see `Evaluator(executor="auto")`):
+            - "thread": numpy/torch/IO-bound metrics (release the GIL)
+            - "process": pure-python metrics (GIL-bound)
+        """
+        return "thread"
+
+    def warm_up(self) -> Metric:
+        """
+        Loads the backend of the metric (if any) upfront, so that
+        the first `compute(...)` doesn't pay for it.
+        See `evalem._base.registry.BackendRegistry`.
+        """
+        return self
+
     @abstractmethod
     def compute(
         self,
@@ -56,6 +128,7 @@ class Metric(AbstractBase):
                 Could be:
                     - Single prediction `List[PredictionDTO]`
                     - Multiple prediction `List[List[PredictionDTO]]`
+                    - Columnar `EvaluationBatch`
                 Each prediction corresponds is one-to-one mapped to corresponding
                 item in the `references` list.
                 See  `evalem.structures` module to understand in detail.
@@ -64,6 +137,7 @@ class Metric(AbstractBase):
                 Could be:
                     - Single reference `List[ReferenceDTO]`
                     - Multiple reference `List[List[ReferenceDTO]]`
+                    - Columnar `EvaluationBatch`
                 Each reference corresponds is one-to-one mapped to corresponding
                 item in the `predictions` list.
                 See  `evalem.structures` module to understand in detail.
@@ -87,6 +161,7 @@ class Metric(AbstractBase):
                 Could be:
                     - Single prediction `List[PredictionDTO]`
                     - Multiple prediction `List[List[PredictionDTO]]`
+                    - Columnar `EvaluationBatch`
                 Each prediction corresponds is one-to-one mapped to corresponding
                 item in the `references` list.
                 See  `evalem.structures` module to understand in detail.
@@ -95,6 +170,7 @@ class Metric(AbstractBase):
                 Could be:
                     - Single reference `List[ReferenceDTO]`
                     - Multiple reference `List[List[ReferenceDTO]]`
+                    - Columnar `EvaluationBatch`
                 Each reference corresponds is one-to-one mapped to corresponding
                 item in the `predictions` list.
                 See  `evalem.structures` module to understand in detail.
@@ -108,9 +184,65 @@ class Metric(AbstractBase):
             **kwargs,
         )
 
+    # Streaming API:
+    # Metrics that can be computed from compact sufficient statistics
+    # implement `init_state`, `update`, `merge` and `finalize`, so that
+    # the data can be evaluated chunk by chunk (with bounded memory) and
+    # states computed on different shards can be combined:
+    #
+    #   state = metric.init_state()
+    #   for predictions, references in chunks:
+    #       state = metric.update(state, predictions, references)
+    #   result = metric.finalize(state)
+
+    @property
+    def supports_streaming(self) -> bool:
+        try:
+            self.init_state()
+        except NotImplementedError:
+            return False
+        return True
+
+    def init_state(self) -> Any:
+        """
+        Returns an empty state of the metric's sufficient statistics.
+        """
+        raise NotImplementedError(
+            f"{self.__classname__} doesn't support streaming evaluation.",
+        )
+
+    def update(
+        self,
+        state: Any,
+        predictions: EvaluationPredictionInstance,
+        references: EvaluationReferenceInstance,
+        **kwargs,
+    ) -> Any:
+        """
+        Accumulates a chunk of predictions/references into the state.
+        The state might be updated in-place. Always use the returned state.
+        """
+        raise NotImplementedError(
+            f"{self.__classname__} doesn't support streaming evaluation.",
+        )
+
+    def merge(self, a: Any, b: Any) -> Any:
+        """
+        Combines two states (eg: from different chunks/shards).
+        """
+        return a.merge(b)
+
+    def finalize(self, state: Any) -> MetricResult:
+        """
+        Computes the final `MetricResult` from the accumulated state.
+        """
+        raise NotImplementedError(
+            f"{self.__classname__} doesn't support streaming evaluation.",
+        )
+
     @staticmethod
     def _is_single_prediction_multi_reference(predictions, references) -> bool:
-        return isinstance(predictions, PredictionInstance) and isinstance(
+        return isinstance(predictions, prediction_instance_types()) and isinstance(
             references,
             SequenceType,
         )
@@ -119,7 +251,7 @@ class Metric(AbstractBase):
     def _is_multi_prediction_single_reference(predictions, references) -> bool:
         return isinstance(predictions, SequenceType) and isinstance(
             references,
-            PredictionInstance,
+            prediction_instance_types(),
         )
 
     @staticmethod
@@ -184,7 +316,16 @@ class Metric(AbstractBase):
 
         Returns:
             Tuple of flattened lists (predictions, references)
+            If any of the input is `EvaluationBatch`, flattened batches are returned.
         """
+        if isinstance(predictions, EvaluationBatch) or isinstance(
+            references,
+            EvaluationBatch,
+        ):
+            return self._flatten_batches(
+                EvaluationBatch.from_instances(predictions),
+                EvaluationBatch.from_instances(references),
+            )
         predictions, references = self._flatten_multi_prediction_single_reference(
             predictions,
             references,
@@ -195,6 +336,30 @@ class Metric(AbstractBase):
         )
         return predictions, references
 
+    @staticmethod
+    def _flatten_batches(
+        predictions: EvaluationBatch,
+        references: EvaluationBatch,
+    ) -> Tuple[EvaluationBatch, EvaluationBatch]:
+        """
+        Columnar counterpart of `_flatten_instances(...)`.
+        See `evalem._base.structures.EvaluationInputs.flattened`
+        """
+        inputs = EvaluationInputs.from_instances(predictions, references).flattened
+        return inputs.predictions, inputs.references
+
+    @staticmethod
+    def _normalize_inputs(
+        predictions: EvaluationPredictionInstance,
+        references: EvaluationReferenceInstance,
+    ) -> EvaluationInputs:
+        """
+        Normalizes predictions and references into `EvaluationInputs`.
+        When called with batches already normalized by `Evaluator.evaluate(...)`,
+        the shared cached object is returned.
+        """
+        return EvaluationInputs.from_instances(predictions, references)
+
 
 class BasicMetric(Metric):
     """
@@ -248,21 +413,107 @@ class JuryBasedMetric(Metric):
             result = scorer(predictions=predictions, references=references)
     """
 
+    # jury metrics that have a native (numpy) implementation
+    _native_metrics = ("accuracy", "precision", "recall", "f1", "exact_match")
+    # whether the native results match jury's exactly; if not, the global
+    # default backend doesn't apply (native only with `backend="native"`)
+    _exact_native = True
+
     def __init__(
         self,
-        metrics: List[str],
+        metrics: Union[str, List[str]],
         device: str = "cpu",
+        backend: Optional[str] = None,
         debug: bool = False,
     ) -> None:
         """
         Args:
             ```metrics```: ```Union[str, List[str]]```
                 What metrics to compute?
+            ```backend```: ```Optional[str]```
+                Either "jury" or "native".
+                If None, `get_default_backend()` is used at compute time.
             ```debug```: ```bool```
                 Debug mode flag
         """
         super().__init__(device=device, debug=debug)
-        self.scorer = Jury(metrics=metrics)
+        self.backend = _validate_backend(backend) if backend else None
+        self._jury_metrics = metrics
+        # only set for custom scorers, others live in the backend registry
+        self._scorer = None
+        self._custom_scorer = False
+
+    @property
+    def scorer(self):
+        # built on first use and shared (through the process-wide backend
+        # registry) by all the metrics with the same `backend_key`,
+        # so metrics that are native or computed via `compute_fused(...)`
+        # never load their own scorer
+        if self._custom_scorer:
+            return self._scorer
+        return get_backend_registry().get(self.backend_key, self._build_scorer)
+
+    @scorer.setter
+    def scorer(self, scorer) -> None:
+        self._scorer = scorer
+        self._custom_scorer = True
+
+    @property
+    def backend_key(self) -> tuple:
+        """
+        Config that identifies the scorer in the backend registry.
+        Metrics with the same key share the same scorer.
+        """
+        return ("jury", tuple(self.metric_names))
+
+    def _build_scorer(self):
+        return _load_jury(tuple(self.metric_names))
+
+    def warm_up(self) -> JuryBasedMetric:
+        if not self._use_native():
+            self.scorer
+        return self
+
+    @property
+    def execution_hint(self) -> str:
+        # jury's implementations are pure python
+        return "thread" if self._use_native() else "process"
+
+    @property
+    def metric_names(self) -> List[str]:
+        metrics = self._jury_metrics
+        return [metrics] if isinstance(metrics, str) else list(metrics or [])
+
+    def _use_native(self, **kwargs) -> bool:
+        backend = self.backend or (
+            get_default_backend() if self._exact_native else "jury"
+        )
+        if backend != "native":
+            return False
+        names = self.metric_names
+        if not names or any(name not in self._native_metrics for name in names):
+            return False
+        if kwargs.get("reduce_fn", None) not in (None, "max", "min", "mean") or (
+            set(kwargs) - {"reduce_fn"}
+        ):
+            logger.warning(
+                f"{self.__classname__} native backend doesn't support {kwargs}."
+                + " Falling back to jury.",
+            )
+            return False
+        return True
+
+    def fusable(self, inputs: EvaluationInputs, **kwargs) -> bool:
+        """
+        Whether the metric can be computed along with other jury-based
+        metrics in a single jury call (see `compute_fused(...)`).
+        Only the metrics that go through their default jury scorer can be fused.
+        """
+        return (
+            bool(self.metric_names)
+            and not self._custom_scorer
+            and not self._use_native(**kwargs)
+        )
 
     def compute(
         self,
@@ -270,14 +521,19 @@ class JuryBasedMetric(Metric):
         references: EvaluationReferenceInstance,
         **kwargs,
     ) -> MetricResult:
-        predictions = format_to_jury(predictions)
-        references = format_to_jury(references)
-
-        results = self.scorer(
-            predictions=predictions,
-            references=references,
-            **kwargs,
-        )
+        inputs = self._normalize_inputs(predictions, references)
+        if self._use_native(**kwargs):
+            results = self._compute_native(inputs, kwargs.get("reduce_fn") or "max")
+        else:
+            predictions, references = inputs.to_jury()
+            results = self.scorer(
+                predictions=predictions,
+                references=references,
+                **kwargs,
+            )
+        return self._to_result(results)
+
+    def _to_result(self, results: dict) -> MetricResult:
         res = dict()
         for k, v in results.items():
             # for single metrics, just flatten the dict that has "score" key
@@ -287,71 +543,381 @@ class JuryBasedMetric(Metric):
         res["metric_name"] = self.__classname__
         return MetricResult.from_dict(res)
 
+    def _check_streaming(self) -> None:
+        names = self.metric_names
+        if not names or any(name not in self._native_metrics for name in names):
+            raise NotImplementedError(
+                f"{self.__classname__} doesn't support streaming for {names}.",
+            )
+
+    def _state_names(self) -> List[str]:
+        names = self.metric_names
+        # for single prediction/reference, f1 is derived from mean precision/recall
+        if "f1" in names:
+            names = names + ["precision", "recall"]
+        return list(dict.fromkeys(names))
+
+    def init_state(self) -> MeanState:
+        """
+        Streaming state: sums of per-item scores computed with the native
+        kernels (regardless of the backend).
+        """
+        self._check_streaming()
+        return MeanState()
+
+    def update(
+        self,
+        state: MeanState,
+        predictions: EvaluationPredictionInstance,
+        references: EvaluationReferenceInstance,
+        **kwargs,
+    ) -> MeanState:
+        inputs = self._normalize_inputs(predictions, references)
+        stats = self._token_stats(inputs)
+        reduce_fn = kwargs.get("reduce_fn", None) or "max"
+        sums, counts = {}, {}
+        if stats.empty_items < len(inputs):
+            for name in self._state_names():
+                sums[name], counts[name] = stats.sums(name, reduce_fn)
+        return state.merge(
+            MeanState(
+                sums=sums,
+                counts=counts,
+                total_items=len(inputs),
+                empty_items=stats.empty_items,
+                single=stats.single,
+            ),
+        )
+
+    def finalize(self, state: MeanState) -> MetricResult:
+        results = dict(total_items=state.total_items, empty_items=state.empty_items)
+        if state.empty_items < state.total_items:
+            for name in self.metric_names:
+                if name == "f1" and state.single:
+                    score = _harmonic_mean(
+                        state.mean("precision") or 0.0,
+                        state.mean("recall") or 0.0,
+                    )
+                else:
+                    score = state.mean(name)
+                results[name] = score if name == "exact_match" else dict(score=score)
+        return self._to_result(results)
+
+    def _compute_native(self, inputs: EvaluationInputs, reduce_fn: str = "max") -> dict:
+        """
+        Computes the metrics with the same semantics (and output format) as jury.
+        Token statistics are memoized on the inputs, so all the native metrics
+        of an evaluator share a single pass over the data.
+        """
+        stats = self._token_stats(inputs)
+        results = dict(total_items=len(inputs), empty_items=stats.empty_items)
+        if stats.empty_items == len(inputs):
+            return results
+        for name in self.metric_names:
+            if name == "exact_match":
+                results[name] = stats.exact_match(reduce_fn)
+            else:
+                results[name] = dict(score=stats.score(name, reduce_fn))
+        return results
+
+    @staticmethod
+    def _token_stats(inputs: EvaluationInputs) -> _TokenStats:
+        return inputs.memoize("native.token_overlap", lambda: _TokenStats(inputs))
+
+
+def _load_jury(metrics: Tuple[str, ...]) -> Jury:
+    # jury (and its dependencies) are only imported when needed
+    from jury import Jury
+
+    return Jury(metrics=list(metrics))
+
+
+def _jury_scorer(metrics: Tuple[str, ...]) -> Jury:
+    """
+    Jury scorer for the given metrics, shared through the backend registry.
+    """
+    return get_backend_registry().get(("jury", metrics), lambda: _load_jury(metrics))
+
+
+def compute_fused(
+    metrics: Sequence[JuryBasedMetric],
+    predictions: EvaluationPredictionInstance,
+    references: EvaluationReferenceInstance,
+    **kwargs,
+) -> List[MetricResult]:
+    """
+    Computes several jury-based metrics with a single `Jury(metrics=[...])`
+    call: the inputs are converted to jury's format and its preprocessing
+    (empty-item removal) runs once, and the output is split back into one
+    `MetricResult` per metric (in the same order as `metrics`).
+    The metrics should be `fusable(...)` for the inputs.
+
+    Usage:
+        .. code-block: python
+
+            from evalem._base.metrics import compute_fused
+
+            f1, recall = compute_fused(
+                [F1Metric(), RecallMetric()],
+                predictions=predictions,
+                references=references,
+            )
+    """
+    inputs = EvaluationInputs.from_instances(predictions, references)
+    names = list(dict.fromkeys(name for m in metrics for name in m.metric_names))
+    scorer = _jury_scorer(tuple(names))
+    predictions, references = inputs.to_jury()
+    results = scorer(predictions=predictions, references=references, **kwargs)
+
+    # jury keys the output of each metric by its resulting name
+    keys = dict(zip(names, (metric.resulting_name for metric in scorer.metrics)))
+    outputs = []
+    for metric in metrics:
+        res = dict(
+            total_items=results["total_items"],
+            empty_items=results["empty_items"],
+        )
+        for name in metric.metric_names:
+            if keys[name] in results:
+                res[keys[name]] = results[keys[name]]
+        outputs.append(metric._to_result(res))
+    return outputs
+
+
+def _confusion_stats(inputs: EvaluationInputs) -> ClassificationStats:
+    """
+    Confusion matrix (and everything derived from it) for the flattened inputs,
+    memoized so that all the classification metrics share a single pass.
+    """
+
+    def _compute():
+        predictions, references = inputs._jury
+        return ClassificationStats.from_labels(references, predictions)
+
+    inputs = inputs.flattened
+    return inputs.memoize("native.confusion", _compute)
+
+
+def _classification_stats(inputs: EvaluationInputs) -> Optional[ClassificationStats]:
+    """
+    Returns the confusion stats if the inputs look like a classification task,
+    i.e. one value per item and every label is a non-empty single token that
+    stays unique after jury's normalization. In that case token-based metrics
+    reduce to plain label matching. Otherwise, returns None.
+    """
+    for batch in (inputs.predictions, inputs.references):
+        if batch.nested and not bool((batch.lengths == 1).all()):
+            return None
+    stats = _confusion_stats(inputs)
+    normalized = set()
+    for label in stats.labels:
+        if not isinstance(label, str):
+            return None
+        tokens = normalize_text(label).split()
+        if len(tokens) != 1 or tokens[0] in normalized:
+            return None
+        normalized.add(tokens[0])
+    return stats
+
+
+class _TokenStats:
+    """
+    Jury-equivalent token-overlap statistics for the native backend.
+
+    Mirrors jury's behaviour:
+        - items with empty prediction or reference are removed
+        - if predictions/references have a single value per item,
+          scores are averaged over items (f1 is the harmonic mean
+          of averaged precision and recall)
+        - otherwise, every (prediction, reference) pair is scored over
+          the index-based ragged layout of the inputs (nothing flattened),
+          reduced per item (max, min or mean) and averaged over items
+    """
+
+    def __init__(self, inputs: EvaluationInputs) -> None:
+        self.classification = _classification_stats(inputs)
+        if self.classification is not None:
+            self.single, self.empty_items = True, 0
+        else:
+            self._init_pairs(inputs)
+        self._overlap = None
+
+    def _init_pairs(self, inputs: EvaluationInputs) -> None:
+        valid = inputs.non_empty
+        self.empty_items = int((~valid).sum())
+        self.valid = valid
+        self.single = all(
+            not batch.nested or bool((batch.lengths[valid] == 1).all())
+            for batch in (inputs.predictions, inputs.references)
+        )
+        # pairs of the empty items are masked out instead of copying the rest
+        self.pairs = inputs.pairs
+        self.mask = valid[self.pairs.item_index]
+        self.pools = inputs.pools
+        self.pred_index = self.pairs.pred_index[self.mask]
+        self.ref_index = self.pairs.ref_index[self.mask]
+
+    @property
+    def overlap(self) -> TokenOverlap:
+        if self._overlap is None:
+            self._overlap = token_overlap(
+                *self.pools,
+                pred_index=self.pred_index,
+                ref_index=self.ref_index,
+            )
+        return self._overlap
+
+    def _pair_scores(self, name: str) -> np.ndarray:
+        if name == "exact_match":
+            return exact_match(
+                *self.pools,
+                pred_index=self.pred_index,
+                ref_index=self.ref_index,
+            ).astype(np.float64)
+        return getattr(self.overlap, name)()
+
+    def item_scores(self, name: str, reduce_fn: str = "max") -> np.ndarray:
+        """
+        Per-item scores of the non-empty items (NaN for items that can't be scored).
+        Pair scores are reduced per item over the pairs of non-empty items.
+        """
+        scores = self._pair_scores(name)
+        if self.single:
+            return scores
+        res = np.full(len(self.mask), np.nan)
+        res[self.mask] = scores
+        return self.pairs.reduce(res, reduce_fn)[self.valid]
+
+    def sums(self, name: str, reduce_fn: str = "max") -> Tuple[float, int]:
+        """
+        Sum and count of the per-item scores (for the streaming states).
+        """
+        if self.classification is not None:
+            # every per-item score is a label match
+            stats = self.classification
+            return float(stats.true_positives.sum()), stats.total
+        scores = self.item_scores(name, reduce_fn)
+        scores = scores[~np.isnan(scores)]
+        return float(scores.sum()), len(scores)
+
+    def score(self, name: str, reduce_fn: str = "max") -> float:
+        if self.classification is not None:
+            # every label is a single token: precision, recall and accuracy
+            # are all the fraction of matching items
+            accuracy = self.classification.accuracy
+            if name != "f1":
+                return accuracy
+            return _harmonic_mean(accuracy, accuracy)
+        overlap = self.overlap
+        if name == "f1" and self.single:
+            return _harmonic_mean(
+                sequential_mean(overlap.precision()),
+                sequential_mean(overlap.recall()),
+            )
+
+        scores = self.item_scores(name, reduce_fn)
+        if self.single:
+            return sequential_mean(scores[~np.isnan(scores)])
+        return float(np.nanmean(scores))
+
+    def exact_match(self, reduce_fn: str = "max") -> float:
+        if self.classification is not None:
+            return self.classification.accuracy
+        scores = self.item_scores("exact_match", reduce_fn)
+        return float(np.mean(scores))
+
+
+def _harmonic_mean(precision: float, recall: float) -> float:
+    # same (float) formula as jury's f1
+    if recall + precision == 0:
+        return 0.0
+    return (2 * recall * precision) / (recall + precision)
+
 
 class PrecisionMetric(JuryBasedMetric, BasicMetric):
-    def __init__(self) -> None:
-        super().__init__(metrics="precision")
+    def __init__(self, backend: Optional[str] = None) -> None:
+        super().__init__(metrics="precision", backend=backend)
 
 
 class RecallMetric(JuryBasedMetric, BasicMetric):
-    def __init__(self) -> None:
-        super().__init__(metrics="recall")
+    def __init__(self, backend: Optional[str] = None) -> None:
+        super().__init__(metrics="recall", backend=backend)
 
 
 class F1Metric(JuryBasedMetric, BasicMetric):
-    def __init__(self) -> None:
-        super().__init__(metrics="f1")
+    def __init__(self, backend: Optional[str] = None) -> None:
+        super().__init__(metrics="f1", backend=backend)
 
 
 class AccuracyMetric(JuryBasedMetric, BasicMetric):
-    def __init__(self) -> None:
-        super().__init__(metrics="accuracy")
+    def __init__(self, backend: Optional[str] = None) -> None:
+        super().__init__(metrics="accuracy", backend=backend)
 
 
 class ConfusionMatrix(BasicMetric):
     """
     This computes confusion matrix for the classification task.
+
+    For large label spaces, the matrix in `extra["confusion_matrix"]`
+    is a `scipy.sparse` CSR matrix instead of a dense `np.ndarray`.
     """
 
+    def __init__(
+        self,
+        sparse_threshold: Optional[int] = None,
+        device: str = "cpu",
+        debug: bool = False,
+    ) -> None:
+        """
+        Args:
+            ```sparse_threshold```: ```Optional[int]```
+                Number of labels above which the confusion matrix is sparse.
+                If None, `evalem._base.kernels.SPARSE_LABEL_THRESHOLD` is used.
+        """
+        super().__init__(device=device, debug=debug)
+        self.sparse_threshold = sparse_threshold
+
     def compute(
         self,
         predictions: EvaluationPredictionInstance,
         references: EvaluationReferenceInstance,
         **kwargs,
     ) -> MetricResult:
-        # converts all the structure into list of string
-        predictions, references = format_to_jury(predictions), format_to_jury(
-            references,
-        )
+        # single pass over the flattened labels, shared with native metrics
+        stats = _confusion_stats(self._normalize_inputs(predictions, references))
+        return self._to_result(stats)
 
-        predictions, references = self._flatten_instances(predictions, references)
+    def init_state(self) -> ConfusionAccumulator:
+        return ConfusionAccumulator(sparse_threshold=self.sparse_threshold)
 
-        labels = self.__get_labels(predictions, references)
+    def update(
+        self,
+        state: ConfusionAccumulator,
+        predictions: EvaluationPredictionInstance,
+        references: EvaluationReferenceInstance,
+        **kwargs,
+    ) -> ConfusionAccumulator:
+        inputs = self._normalize_inputs(predictions, references).flattened
+        predictions, references = inputs._jury
+        return state.update(references, predictions)
+
+    def finalize(self, state: ConfusionAccumulator) -> MetricResult:
+        return self._to_result(state.finalize())
+
+    def _to_result(self, stats: ClassificationStats) -> MetricResult:
+        stats = stats.as_sparse(use_sparse(len(stats.labels), self.sparse_threshold))
         return MetricResult.from_dict(
             dict(
                 metric_name="ConfusionMatrix",
-                confusion_matrix=confusion_matrix(
-                    references,
-                    predictions,
-                    labels=labels,
-                ),
-                labels=labels,
+                confusion_matrix=stats.matrix,
+                labels=stats.labels,
+                report=stats.report(),
                 flattened=True,
-                total_items=len(predictions),
+                total_items=stats.total,
                 empty_items=0,
             ),
         )
 
-    def __get_labels(
-        self,
-        predictions: SinglePredictionInstance,
-        references: SinglePredictionInstance,
-    ):
-        """
-        Get unique list of labels across predictions + references.
-        """
-        return sorted(set(predictions).union(references))
-
 
 def main():
     pass
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+    Process-wide pool of metric backends (jury scorers, models, etc.).
+
+    Backends are expensive to construct (eg: loading a BERT/BART checkpoint),
+    so metrics don't build them in their constructors. They're created on
+    first use through `get_backend_registry().get(key, factory)` and shared
+    by every metric with the same backend config (`key`).
+    So, two `BertScore(model_type=...)` objects share one loaded model.
+"""
+
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, List, Optional
+
+
+class BackendRegistry:
+    """
+    A thread-safe LRU pool of backends keyed by their config.
+
+    Args:
+        ```maxsize```: ```Optional[int]```
+            Maximum number of backends kept alive.
+            Least recently used backends are evicted first.
+            If None, backends are never evicted.
+
+    Usage:
+        .. code-block: python
+
+            from evalem._base.registry import get_backend_registry
+
+            registry = get_backend_registry()
+
+            # built once, shared afterwards
+            scorer = registry.get(("jury", ("bleu",)), lambda: Jury(metrics=["bleu"]))
+
+            # load the backends of some metrics upfront
+            registry.warm_up(BertScore(), BleuMetric())
+
+            registry.maxsize = 2
+            registry.clear()
+    """
+
+    def __init__(self, maxsize: Optional[int] = 8) -> None:
+        self._backends = OrderedDict()
+        self._maxsize = maxsize
+        self._lock = threading.RLock()
+        # one lock per key being built, so that a backend is never
+        # loaded twice while other keys can still be built concurrently
+        self._build_locks = {}
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def maxsize(self) -> Optional[int]:
+        return self._maxsize
+
+    @maxsize.setter
+    def maxsize(self, maxsize: Optional[int]) -> None:
+        if maxsize is not None and maxsize < 0:
+            raise ValueError(f"Invalid maxsize={maxsize}. Expected >= 0 or None")
+        with self._lock:
+            self._maxsize = maxsize
+            self._evict()
+
+    def get(self, key: Hashable, factory: Callable[[], Any]) -> Any:
+        """
+        Returns the backend for `key`, building it with `factory()` on a miss.
+        """
+        with self._lock:
+            if key in self._backends:
+                self._backends.move_to_end(key)
+                self.hits += 1
+                return self._backends[key]
+            build_lock = self._build_locks.setdefault(key, threading.Lock())
+
+        with build_lock:
+            with self._lock:
+                # built by another thread while we were waiting
+                if key in self._backends:
+                    self._backends.move_to_end(key)
+                    self.hits += 1
+                    return self._backends[key]
+            backend = factory()
+            with self._lock:
+                self.misses += 1
+                self._backends[key] = backend
+                self._build_locks.pop(key, None)
+                self._evict()
+        return backend
+
+    def warm_up(self, *metrics) -> List[Any]:
+        """
+        Builds (and loads) the backends of the given metrics upfront,
+        so that the first `compute(...)` doesn't pay for it.
+        See `Metric.warm_up()`.
+        """
+        return [metric.warm_up() for metric in metrics]
+
+    def evict(self, key: Hashable) -> bool:
+        with self._lock:
+            return self._backends.pop(key, None) is not None
+
+    def clear(self) -> None:
+        with self._lock:
+            self._backends.clear()
+
+    def keys(self) -> List[Hashable]:
+        with self._lock:
+            return list(self._backends)
+
+    def _evict(self) -> None:
+        if self._maxsize is None:
+            return
+        while len(self._backends) > self._maxsize:
+            self._backends.popitem(last=False)
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            return key in self._backends
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._backends)
+
+
+_REGISTRY = BackendRegistry()
+
+
+def get_backend_registry() -> BackendRegistry:
+    """
+    Returns the process-wide backend registry.
+    """
+    return _REGISTRY
+
+
+def main():
+    pass
+
+
+if __name__ == "__main__":
+    main()
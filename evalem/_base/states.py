@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+    Mergeable states (sufficient statistics) for the streaming metric API.
+    See `evalem._base.metrics.Metric.init_state(...)`.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field, replace
+from typing import Dict, Optional
+
+import numpy as np
+
+
+@dataclass(frozen=True)
+class MeanState:
+    """
+    Running sums of per-item scores, so that the mean of any score can be
+    computed after seeing the data in chunks.
+
+    Args:
+        ```sums```: ```Dict[str, float]```
+            Sum of the per-item scores for each score name
+        ```counts```: ```Dict[str, int]```
+            Number of scored items for each score name
+        ```total_items```: ```int```
+            Number of items seen
+        ```empty_items```: ```int```
+            Number of items skipped (eg: empty predictions/references)
+        ```single```: ```bool```
+            True if every item seen so far had a single prediction and reference
+    """
+
+    sums: Dict[str, float] = field(default_factory=dict)
+    counts: Dict[str, int] = field(default_factory=dict)
+    total_items: int = 0
+    empty_items: int = 0
+    single: bool = True
+
+    @classmethod
+    def from_scores(
+        cls,
+        scores: Dict[str, np.ndarray],
+        total_items: int,
+        empty_items: int = 0,
+        single: bool = True,
+    ) -> MeanState:
+        """
+        Builds the state from per-item scores. NaN scores are ignored.
+        """
+        sums, counts = {}, {}
+        for name, values in scores.items():
+            values = np.asarray(values, dtype=np.float64)
+            values = values[~np.isnan(values)]
+            sums[name], counts[name] = float(values.sum()), len(values)
+        return cls(
+            sums=sums,
+            counts=counts,
+            total_items=total_items,
+            empty_items=empty_items,
+            single=single,
+        )
+
+    def merge(self, other: MeanState) -> MeanState:
+        sums, counts = dict(self.sums), dict(self.counts)
+        for name, value in other.sums.items():
+            sums[name] = sums.get(name, 0.0) + value
+            counts[name] = counts.get(name, 0) + other.counts.get(name, 0)
+        return replace(
+            self,
+            sums=sums,
+            counts=counts,
+            total_items=self.total_items + other.total_items,
+            empty_items=self.empty_items + other.empty_items,
+            single=self.single and other.single,
+        )
+
+    def mean(self, name: str) -> Optional[float]:
+        count = self.counts.get(name, 0)
+        return self.sums[name] / count if count else None
+
+
+def main():
+    pass
+
+
+if __name__ == "__main__":
+    main()
@@ -2,13 +2,32 @@
 
 from __future__ import annotations
 
+import sys
+import threading
 from copy import deepcopy
-from dataclasses import asdict, dataclass
+from dataclasses import asdict, dataclass, field
+from enum import Enum
+from functools import cached_property
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Set, Tuple, Type, Union
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    Type,
+    Union,
+)
 
 import numpy as np
-import torch
+
+from .kernels import RaggedPairs
+
+if TYPE_CHECKING:
+    import torch
 
 
 @dataclass(frozen=True)
@@ -79,7 +98,491 @@ class MetricResult:
         )
 
 
-ImageTensor = Union[np.ndarray, torch.Tensor]
+def _object_array(items: Iterable[Any]) -> np.ndarray:
+    """
+    Builds a 1D object array without letting numpy broadcast
+    nested items (eg: tensors, lists) into extra dimensions.
+    """
+    items = list(items)
+    arr = np.empty(len(items), dtype=object)
+    arr[:] = items
+    return arr
+
+
+@dataclass(frozen=True, eq=False)
+class EvaluationBatch:
+    """
+    A columnar representation of a batch of predictions or references.
+
+    Instead of one frozen DTO per item, all the values are kept in a flat pool
+    backed by numpy arrays. Item `i` owns the slice
+    `values[offsets[i]:offsets[i + 1]]` of the pool, so multiple
+    predictions/references per item are represented by a ragged layout
+    without any copies.
+
+    The DTO lists are still available as a thin view over the batch:
+    indexing/iterating materializes `dto_cls` objects on the fly.
+
+    Args:
+        ```values```: ```np.ndarray```
+            Flat object array of values (text, label, etc.)
+        ```offsets```: ```np.ndarray```
+            int64 array of size `n_items + 1` indexing into `values`
+        ```scores```: ```Optional[np.ndarray]```
+            float64 array parallel to `values`. NaN represents missing score.
+        ```starts```: ```Optional[np.ndarray]```
+            int64 array parallel to `values` for span start (eg: QA).
+            -1 represents missing index.
+        ```ends```: ```Optional[np.ndarray]```
+            int64 array parallel to `values` for span end (eg: QA).
+            -1 represents missing index.
+        ```columns```: ```Optional[Dict[str, np.ndarray]]```
+            Extra object columns parallel to `values` (eg: context, question)
+        ```nested```: ```bool```
+            If enabled, each item is a list of values
+            (multiple predictions/references per item)
+        ```dto_cls```: ```Type[EvaluationDTO]```
+            DTO type used to materialize the view
+
+    Usage:
+        .. code-block: python
+
+            from evalem._base.structures import EvaluationBatch
+
+            # single reference
+            batch = EvaluationBatch.from_instances(["Reference 1", "Reference 2"])
+
+            # multiple references
+            batch = EvaluationBatch.from_instances([["Ref 1.1", "Ref 1.2"], ["Ref 2"]])
+            batch.lengths  # array([2, 1])
+            batch[0]  # [EvaluationDTO(value="Ref 1.1"), EvaluationDTO(value="Ref 1.2")]
+            batch.to_list()  # [["Ref 1.1", "Ref 1.2"], ["Ref 2"]]
+    """
+
+    values: np.ndarray
+    offsets: np.ndarray
+    scores: Optional[np.ndarray] = None
+    starts: Optional[np.ndarray] = None
+    ends: Optional[np.ndarray] = None
+    columns: Optional[Dict[str, np.ndarray]] = None
+    nested: bool = False
+    dto_cls: Type[EvaluationDTO] = EvaluationDTO
+
+    # per-batch memo (eg: the normalized `EvaluationInputs` it belongs to)
+    _cache: Dict[str, Any] = field(
+        default_factory=dict,
+        init=False,
+        repr=False,
+        compare=False,
+    )
+
+    @classmethod
+    def from_instances(
+        cls,
+        instances: Any,
+        dto_cls: Optional[Type[EvaluationDTO]] = None,
+    ) -> EvaluationBatch:
+        """
+        Converts any of the supported prediction/reference formats
+        (str, dict, DTO, or list/list-of-list of them) into a batch.
+        """
+        if isinstance(instances, EvaluationBatch):
+            return instances
+        if isinstance(instances, (EvaluationDTO, dict, str)):
+            instances = [instances]
+        instances = list(instances)
+
+        nested = any(isinstance(item, (list, tuple, set)) for item in instances)
+        flat, lengths = [], []
+        for item in instances:
+            if not nested:
+                flat.append(item)
+                continue
+            item = list(item) if isinstance(item, (list, tuple, set)) else [item]
+            lengths.append(len(item))
+            flat.extend(item)
+
+        values, scores, starts, ends = [], [], [], []
+        columns: Dict[str, list] = {}
+        for idx, item in enumerate(flat):
+            if isinstance(item, EvaluationDTO):
+                dto_cls = dto_cls or type(item)
+            elif isinstance(item, dict):
+                item = EvaluationDTO.from_dict(item)
+            else:
+                values.append(item)
+                continue
+            values.append(item.value)
+            for name, val in vars(item).items():
+                if name == "value" or val is None:
+                    continue
+                if name == "score":
+                    scores.append((idx, val))
+                elif name == "start":
+                    starts.append((idx, val))
+                elif name == "end":
+                    ends.append((idx, val))
+                else:
+                    columns.setdefault(name, []).append((idx, val))
+
+        n = len(values)
+
+        def _fill(pairs, fill_value, dtype):
+            if not pairs:
+                return None
+            arr = np.full(n, fill_value, dtype=dtype)
+            idx, vals = zip(*pairs)
+            arr[list(idx)] = vals
+            return arr
+
+        def _fill_object(pairs):
+            arr = _object_array([None] * n)
+            for idx, val in pairs:
+                arr[idx] = val
+            return arr
+
+        return cls(
+            values=_object_array(values),
+            offsets=np.concatenate(([0], np.cumsum(lengths))).astype(np.int64)
+            if nested
+            else np.arange(n + 1, dtype=np.int64),
+            scores=_fill(scores, np.nan, np.float64),
+            starts=_fill(starts, -1, np.int64),
+            ends=_fill(ends, -1, np.int64),
+            columns={k: _fill_object(v) for k, v in columns.items()} or None,
+            nested=nested,
+            dto_cls=dto_cls or EvaluationDTO,
+        )
+
+    @classmethod
+    def from_columns(
+        cls,
+        values: Iterable[Any],
+        scores: Optional[Iterable[Optional[float]]] = None,
+        starts: Optional[Iterable[Optional[int]]] = None,
+        ends: Optional[Iterable[Optional[int]]] = None,
+        columns: Optional[Dict[str, Iterable[Any]]] = None,
+        lengths: Optional[Iterable[int]] = None,
+        dto_cls: Type[EvaluationDTO] = EvaluationDTO,
+    ) -> EvaluationBatch:
+        """
+        Builds the batch directly from column-wise data.
+        If `lengths` is provided, values are grouped into nested items.
+        """
+
+        def _as_array(col, fill_value, dtype):
+            if col is None:
+                return None
+            return np.array(
+                [fill_value if v is None else v for v in col],
+                dtype=dtype,
+            )
+
+        values = _object_array(values)
+        offsets = (
+            np.concatenate(([0], np.cumsum(list(lengths))))
+            if lengths is not None
+            else np.arange(len(values) + 1)
+        )
+        return cls(
+            values=values,
+            offsets=offsets.astype(np.int64),
+            scores=_as_array(scores, np.nan, np.float64),
+            starts=_as_array(starts, -1, np.int64),
+            ends=_as_array(ends, -1, np.int64),
+            columns={k: _object_array(v) for k, v in (columns or {}).items()} or None,
+            nested=lengths is not None,
+            dto_cls=dto_cls,
+        )
+
+    @property
+    def lengths(self) -> np.ndarray:
+        """Number of values owned by each item."""
+        return np.diff(self.offsets)
+
+    @property
+    def item_index(self) -> np.ndarray:
+        """Item index for each value in the flat pool."""
+        return np.repeat(np.arange(len(self)), self.lengths)
+
+    def _dto(self, pos: int) -> EvaluationDTO:
+        kwargs = dict(value=self.values[pos])
+        if self.scores is not None and not np.isnan(self.scores[pos]):
+            kwargs["score"] = float(self.scores[pos])
+        if self.starts is not None and self.starts[pos] >= 0:
+            kwargs["start"] = int(self.starts[pos])
+        if self.ends is not None and self.ends[pos] >= 0:
+            kwargs["end"] = int(self.ends[pos])
+        for name, col in (self.columns or {}).items():
+            kwargs[name] = col[pos]
+        return self.dto_cls(**kwargs)
+
+    def _select(self, positions: np.ndarray, offsets: np.ndarray, nested: bool):
+        return EvaluationBatch(
+            values=self.values[positions],
+            offsets=offsets,
+            scores=None if self.scores is None else self.scores[positions],
+            starts=None if self.starts is None else self.starts[positions],
+            ends=None if self.ends is None else self.ends[positions],
+            columns=None
+            if self.columns is None
+            else {k: v[positions] for k, v in self.columns.items()},
+            nested=nested,
+            dto_cls=self.dto_cls,
+        )
+
+    def take(self, indices: Iterable[int]) -> EvaluationBatch:
+        """
+        Selects items (not values) by their index.
+        Items can be repeated.
+        """
+        indices = np.asarray(indices, dtype=np.int64)
+        lengths = self.lengths[indices]
+        offsets = np.concatenate(([0], np.cumsum(lengths))).astype(np.int64)
+        positions = np.repeat(self.offsets[:-1][indices] - offsets[:-1], lengths)
+        positions += np.arange(offsets[-1])
+        return self._select(positions, offsets, self.nested)
+
+    def repeat(self, counts: Iterable[int]) -> EvaluationBatch:
+        """
+        Repeats item `i` `counts[i]` times.
+        """
+        return self.take(np.repeat(np.arange(len(self)), counts))
+
+    def flatten(self) -> EvaluationBatch:
+        """
+        Every value in the pool becomes its own (non-nested) item.
+        """
+        positions = np.arange(len(self.values))
+        return self._select(
+            positions,
+            np.arange(len(positions) + 1, dtype=np.int64),
+            False,
+        )
+
+    def to_list(self, stringify: bool = True) -> Union[List[Any], List[List[Any]]]:
+        """
+        Converts the values to plain list (or list of list if nested).
+        This is the format consumed by Jury.
+        """
+        values = self.values.tolist()
+        if stringify:
+            values = [str(v) if isinstance(v, int) else v for v in values]
+        if not self.nested:
+            return values
+        offsets = self.offsets.tolist()
+        return [values[s:e] for s, e in zip(offsets[:-1], offsets[1:])]
+
+    def to_dtos(self) -> Union[List[EvaluationDTO], List[List[EvaluationDTO]]]:
+        return list(self)
+
+    def to_arrow(self):
+        """
+        Exports the batch as a `pyarrow.Table`.
+        Nested batches have list-typed columns.
+        """
+        import pyarrow as pa
+
+        cols = dict(value=self.values)
+        for name in ("scores", "starts", "ends"):
+            if getattr(self, name) is not None:
+                cols[name[:-1]] = getattr(self, name)
+        cols.update(self.columns or {})
+
+        arrays = {}
+        offsets = pa.array(self.offsets, type=pa.int32())
+        for name, col in cols.items():
+            arr = pa.array(col.tolist() if col.dtype == object else col)
+            arrays[name] = (
+                pa.ListArray.from_arrays(offsets, arr) if self.nested else arr
+            )
+        return pa.table(arrays)
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return self.take(np.arange(len(self))[idx])
+        if idx < 0:
+            idx += len(self)
+        if not 0 <= idx < len(self):
+            raise IndexError(f"Index {idx} out of range for batch of size {len(self)}")
+        if not self.nested:
+            return self._dto(self.offsets[idx])
+        return [self._dto(p) for p in range(self.offsets[idx], self.offsets[idx + 1])]
+
+    def __iter__(self):
+        return (self[idx] for idx in range(len(self)))
+
+
+class EvaluationMode(Enum):
+    """
+    Represents how predictions and references are paired per item.
+    """
+
+    # Single Reference, Single Prediction
+    SRSP = "srsp"
+    # Single Reference, Multiple Predictions
+    SRMP = "srmp"
+    # Multiple References, Single Prediction
+    MRSP = "mrsp"
+    # Multiple References, Multiple Predictions
+    MRMP = "mrmp"
+
+    @classmethod
+    def from_batches(
+        cls,
+        predictions: EvaluationBatch,
+        references: EvaluationBatch,
+    ) -> EvaluationMode:
+        if predictions.nested and references.nested:
+            return cls.MRMP
+        if predictions.nested:
+            return cls.SRMP
+        if references.nested:
+            return cls.MRSP
+        return cls.SRSP
+
+
+@dataclass(frozen=True, eq=False)
+class EvaluationInputs:
+    """
+    Normalized (predictions, references) pair shared by all the metrics
+    of a single evaluation call.
+
+    Normalization (conversion to `EvaluationBatch` + mode detection) happens
+    once in `from_instances(...)`. The derived views (flattened pairs,
+    jury-formatted lists, etc.) are computed lazily and cached, so every
+    metric consuming the same inputs re-uses them.
+
+    The inputs are bound to its predictions batch. So, any metric that gets
+    the same batches (eg: from `Evaluator.evaluate(...)`) resolves to the
+    same cached object instead of normalizing again.
+
+    `EvaluationInputs.normalization_count` tracks how many times the
+    normalization has run in the process.
+    """
+
+    predictions: EvaluationBatch
+    references: EvaluationBatch
+    mode: EvaluationMode
+
+    # arbitrary artifacts shared across metrics. See `memoize(...)`
+    cache: Dict[str, Any] = field(default_factory=dict, repr=False)
+
+    normalization_count = 0
+    _lock = threading.Lock()
+
+    @classmethod
+    def from_instances(cls, predictions: Any, references: Any) -> EvaluationInputs:
+        """
+        Normalizes raw predictions/references of any supported format.
+        If the inputs are already normalized batches, the cached object is returned.
+        """
+        if isinstance(predictions, EvaluationBatch):
+            inputs = predictions._cache.get("inputs")
+            if inputs is not None and inputs.references is references:
+                return inputs
+
+        with cls._lock:
+            EvaluationInputs.normalization_count += 1
+        return cls._bind(
+            EvaluationBatch.from_instances(predictions),
+            EvaluationBatch.from_instances(references),
+        )
+
+    @classmethod
+    def _bind(
+        cls,
+        predictions: EvaluationBatch,
+        references: EvaluationBatch,
+    ) -> EvaluationInputs:
+        inputs = cls(
+            predictions=predictions,
+            references=references,
+            mode=EvaluationMode.from_batches(predictions, references),
+        )
+        predictions._cache["inputs"] = inputs
+        return inputs
+
+    @cached_property
+    def flattened(self) -> EvaluationInputs:
+        """
+        Flattened single-prediction, single-reference pairs.
+        The flat side is repeated by the lengths of the nested side,
+        which only gathers the underlying arrays.
+        Multi-prediction, multi-reference inputs are kept as is.
+        """
+        preds, refs = self.predictions, self.references
+        if self.mode == EvaluationMode.SRMP:
+            return self._bind(preds.flatten(), refs.repeat(preds.lengths))
+        if self.mode == EvaluationMode.MRSP:
+            return self._bind(preds.repeat(refs.lengths), refs.flatten())
+        return self
+
+    @cached_property
+    def pairs(self) -> RaggedPairs:
+        """
+        Index-based (prediction, reference) pairing of every item into
+        the flat value pools (see `pools`). Nothing is repeated/copied,
+        pair-wise scores are reduced per item with `pairs.reduce(...)`.
+        """
+        return RaggedPairs.from_offsets(
+            self.predictions.offsets,
+            self.references.offsets,
+        )
+
+    @cached_property
+    def pools(self) -> Tuple[list, list]:
+        """
+        Flat (prediction values, reference values) indexed by `pairs`.
+        """
+        return (
+            self.predictions.flatten().to_list(),
+            self.references.flatten().to_list(),
+        )
+
+    @cached_property
+    def non_empty(self) -> np.ndarray:
+        """
+        Boolean mask of items where both prediction and reference are non-empty.
+        Jury skips the other items (counted as `empty_items`).
+        """
+        predictions, references = self._jury
+        return np.fromiter(
+            (bool(p) and bool(r) for p, r in zip(predictions, references)),
+            dtype=bool,
+            count=len(self),
+        )
+
+    @cached_property
+    def _jury(self) -> Tuple[list, list]:
+        return self.predictions.to_list(), self.references.to_list()
+
+    def to_jury(self) -> Tuple[list, list]:
+        """
+        Jury-formatted (predictions, references).
+        Returns shallow copies because Jury mutates the input lists
+        while removing empty items.
+        """
+        predictions, references = self._jury
+        return list(predictions), list(references)
+
+    def memoize(self, key: Any, fn):
+        """
+        Computes `fn()` once per inputs and caches it under `key`.
+        """
+        if key not in self.cache:
+            self.cache[key] = fn()
+        return self.cache[key]
+
+    def __len__(self) -> int:
+        return len(self.predictions)
+
+
+# torch is only needed for type-checking
+ImageTensor = Union[np.ndarray, "torch.Tensor"]
 
 # Represents type instance for any single downstream prediction
 PredictionInstance = Union[
@@ -90,6 +593,19 @@ PredictionInstance = Union[
     ClassificationDTO,
 ]
 
+
+def prediction_instance_types() -> Tuple[type, ...]:
+    """
+    Classes of `PredictionInstance`, for runtime (`isinstance`) checks.
+    `PredictionInstance` itself can't be used as its "torch.Tensor" is a
+    forward reference. `torch.Tensor` is included only if torch is already
+    imported (a tensor can't exist otherwise).
+    """
+    types = (str, PredictionDTO, dict, np.ndarray, ClassificationDTO)
+    tensor = getattr(sys.modules.get("torch"), "Tensor", None)
+    return types + (tensor,) if tensor is not None else types
+
+
 # Represents type instance for any single downstream reference/ground-truth
 ReferenceInstance = Union[str, ReferenceDTO]
 
@@ -98,11 +614,16 @@ MultiplePredictionInstance = List[List[PredictionInstance]]
 EvaluationPredictionInstance = Union[
     SinglePredictionInstance,
     MultiplePredictionInstance,
+    EvaluationBatch,
 ]
 
 SingleReferenceInstance = List[ReferenceInstance]
 MultipleReferenceInstance = List[List[ReferenceInstance]]
-EvaluationReferenceInstance = Union[SingleReferenceInstance, MultipleReferenceInstance]
+EvaluationReferenceInstance = Union[
+    SingleReferenceInstance,
+    MultipleReferenceInstance,
+    EvaluationBatch,
+]
 
 EvaluationOutput = Union[int, float, Dict[str, Union[str, int, float]]]
 MetricOutput = Union[int, float, Dict[str, Union[str, int, float]], MetricResult]
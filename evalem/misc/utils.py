@@ -1,19 +1,32 @@
 #!/usr/bin/env python3
 
+from __future__ import annotations
+
 from itertools import chain
-from typing import Any, Iterable, List, Union
+from typing import TYPE_CHECKING, Any, Iterable, List, Union
 
 import numpy as np
-import pandas as pd
 from loguru import logger
 
-from .._base.structures import EvaluationDTO, PredictionInstance, ReferenceInstance
+from .._base.structures import (
+    EvaluationBatch,
+    EvaluationDTO,
+    PredictionInstance,
+    ReferenceInstance,
+)
+
+if TYPE_CHECKING:
+    import pandas as pd
 
 
 def format_to_jury(
-    instances: Union[PredictionInstance, ReferenceInstance],
+    instances: Union[PredictionInstance, ReferenceInstance, EvaluationBatch],
     stringify: bool = True,
 ) -> Union[List[str], List[List[str]]]:
+    # columnar batch is already normalized
+    if isinstance(instances, EvaluationBatch):
+        return instances.to_list(stringify=stringify)
+
     if not instances:
         return []
 
@@ -89,6 +102,8 @@ def build_comparison_table(
         For the dataframe, the index is the metric name and other columns
         consist of pipeline name with score value.
     """
+    import pandas as pd
+
     results = map(lambda ep: ep(inputs=inputs, references=references), eval_pipes)
     comparison_map = {}
     dfs = []
@@ -1,20 +1,52 @@
 # flake8: noqa
-from .metrics import (
-    BartScore,
-    BertScore,
-    BleuMetric,
-    ExactMatchMetric,
-    LLMAsJudgeMetric,
-    MeteorMetric,
-    NLPMetric,
-    RougeMetric,
-    SacreBleuMetric,
-    SemanticMetric,
-)
-from .models import (
-    DefaultQAModelWrapper,
-    HFLMWrapper,
-    HFPipelineWrapper,
-    QuestionAnsweringHFPipelineWrapper,
-    TextClassificationHFPipelineWrapper,
-)
+"""
+NLP metrics and model wrappers.
+Everything is lazily loaded (PEP 562) on first access, so that
+`import evalem.nlp` doesn't import the heavy model dependencies.
+"""
+
+from importlib import import_module
+
+# name -> module
+_LAZY_ATTRIBUTES = {
+    **dict.fromkeys(
+        (
+            "BartScore",
+            "BertScore",
+            "BleuMetric",
+            "ExactMatchMetric",
+            "LLMAsJudgeMetric",
+            "MeteorMetric",
+            "NLPMetric",
+            "RougeMetric",
+            "SacreBleuMetric",
+            "SemanticMetric",
+            "SquadExactMatchMetric",
+            "SquadF1Metric",
+        ),
+        ".metrics",
+    ),
+    **dict.fromkeys(
+        (
+            "DefaultQAModelWrapper",
+            "HFJudgeWrapper",
+            "HFLMWrapper",
+            "HFPipelineWrapper",
+            "QuestionAnsweringHFPipelineWrapper",
+            "TextClassificationHFPipelineWrapper",
+        ),
+        ".models",
+    ),
+}
+
+
+def __getattr__(name: str):
+    if name not in _LAZY_ATTRIBUTES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(_LAZY_ATTRIBUTES[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_ATTRIBUTES))
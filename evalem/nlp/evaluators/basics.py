@@ -29,15 +29,18 @@ class QAEvaluator(NLPEvaluator):
 class TextClassificationEvaluator(NLPEvaluator):
     """
     An evaluator for text classification tasks.
+
+    All the metrics use the native backend so that they are derived from
+    a single confusion matrix computed in one pass over the labels.
     """
 
     def __init__(self) -> None:
         super().__init__(
             metrics=[
-                AccuracyMetric(),
-                F1Metric(),
-                PrecisionMetric(),
-                RecallMetric(),
+                AccuracyMetric(backend="native"),
+                F1Metric(backend="native"),
+                PrecisionMetric(backend="native"),
+                RecallMetric(backend="native"),
                 ConfusionMatrix(),
             ],
         )
@@ -3,6 +3,7 @@
 from ._base import NLPMetric
 from .basics import ExactMatchMetric
 from .llm import LLMAsJudgeMetric
+from .qa import SquadExactMatchMetric, SquadF1Metric
 from .semantics import (
     BartScore,
     BertScore,
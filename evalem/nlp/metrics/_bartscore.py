@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+    BARTScore engine used by `BartScore`.
+
+    Same scoring as the reference implementation
+    (https://github.com/neulab/BARTScore, which jury downloads at runtime):
+    the score of a (source, target) pair is the mean log-likelihood of the
+    target tokens given the source. The model runs either on torch or on
+    ONNX Runtime (`runtime="onnx"`, see `_onnx`).
+
+    Unlike the reference implementation (fixed-size batches in input order),
+    every unique text is tokenized once, and pairs are sorted by length and
+    scored in batches capped both in size and in padded tokens, so that
+    long inputs (up to `max_length`) don't blow up the memory.
+
+    This module imports torch/transformers, so it's only imported when needed.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Union
+
+import numpy as np
+import torch
+from transformers import AutoModelForSeq2SeqLM, AutoTokenizer
+
+from ..._base.kernels import padding_ratio, token_budget_batches
+from ._onnx import check_runtime, export_dir, load_ort_model
+
+# BARTScore checkpoints (same names as jury)
+CHECKPOINTS = {
+    "bartscore-large-cnn": "facebook/bart-large-cnn",
+}
+
+WEIGHTS = {
+    "parabank2": "https://drive.google.com/uc?export=download&id=1_7JfF7KOInb7ZrxKHIigTMR4ChVET01m&confirm=t",
+}
+
+
+@dataclass(frozen=True)
+class BartScoreOutput:
+    """
+    Pair-wise scores (in input order) and batching stats.
+    """
+
+    scores: np.ndarray
+    padding_ratio: float
+    n_batches: int
+
+
+class BartScoreEngine:
+    """
+    Holds a BART tokenizer/model and scores (source, target) pairs.
+
+    Args:
+        ```model_checkpoint```: ```str```
+            BARTScore checkpoint name (see `CHECKPOINTS`) or
+            any seq2seq model name/path
+        ```model_weights```: ```Optional[str]```
+            BARTScore weights name (see `WEIGHTS`) or path to a state dict,
+            loaded over the checkpoint.
+        ```device```: ```str```
+            Which device to run the model on?
+        ```max_length```: ```int```
+            Max number of tokens in a text (longer texts are truncated)
+        ```runtime```: ```str```
+            "torch" or "onnx"
+        ```quantize```: ```bool```
+            Use dynamic int8 quantization with the "onnx" runtime?
+        ```onnx_dir```: ```Optional[Union[str, Path]]```
+            Where exported models are cached. See `_onnx.default_onnx_dir()`.
+    """
+
+    def __init__(
+        self,
+        model_checkpoint: str = "bartscore-large-cnn",
+        model_weights: Optional[str] = None,
+        device: str = "cpu",
+        max_length: int = 1024,
+        runtime: str = "torch",
+        quantize: bool = False,
+        onnx_dir: Optional[Union[str, Path]] = None,
+    ) -> None:
+        self.runtime = check_runtime(runtime)
+        self.quantize = quantize and runtime == "onnx"
+        self.checkpoint = CHECKPOINTS.get(model_checkpoint.lower(), model_checkpoint)
+        self.model_weights = model_weights
+        self.device = device
+        self.max_length = max_length
+        self.tokenizer = AutoTokenizer.from_pretrained(self.checkpoint)
+        if self.runtime == "onnx":
+            self.model = load_ort_model(
+                "ORTModelForSeq2SeqLM",
+                export_dir(onnx_dir, "bartscore", self.checkpoint, model_weights),
+                self._save_source,
+                quantize=self.quantize,
+                device=device,
+                use_cache=False,
+            )
+        else:
+            self.model = self._load_torch_model().to(device)
+        self.pad_token_id = self.model.config.pad_token_id
+        self.decoder_start_token_id = self.model.config.decoder_start_token_id
+
+    def _load_torch_model(self):
+        model = AutoModelForSeq2SeqLM.from_pretrained(self.checkpoint)
+        if self.model_weights is not None:
+            if self.model_weights.lower() in WEIGHTS:
+                state = torch.hub.load_state_dict_from_url(
+                    WEIGHTS[self.model_weights.lower()],
+                    file_name=f"bartscore-{self.model_weights.lower()}.pth",
+                    map_location="cpu",
+                )
+            else:
+                state = torch.load(self.model_weights, map_location="cpu")
+            model.load_state_dict(state)
+        return model.eval()
+
+    def _save_source(self, path: Path) -> None:
+        self._load_torch_model().save_pretrained(path)
+        self.tokenizer.save_pretrained(path)
+
+    def _logits(
+        self,
+        input_ids: torch.Tensor,
+        attention_mask: torch.Tensor,
+        decoder_input_ids: torch.Tensor,
+    ) -> torch.Tensor:
+        if self.runtime == "onnx":
+            return torch.as_tensor(
+                self.model(
+                    input_ids=input_ids,
+                    attention_mask=attention_mask,
+                    decoder_input_ids=decoder_input_ids,
+                ).logits,
+            )
+        return self.model(
+            input_ids=input_ids.to(self.device),
+            attention_mask=attention_mask.to(self.device),
+            decoder_input_ids=decoder_input_ids.to(self.device),
+            use_cache=False,
+        ).logits
+
+    def encode(self, texts: Sequence[str]) -> List[List[int]]:
+        if not texts:
+            return []
+        return self.tokenizer(
+            list(texts),
+            max_length=self.max_length,
+            truncation=True,
+        )["input_ids"]
+
+    def _pad(self, ids: Sequence[List[int]]):
+        # same (right) padding as the tokenizer's `padding=True`
+        length = max(map(len, ids))
+        input_ids = torch.full((len(ids), length), self.pad_token_id, dtype=torch.long)
+        attention_mask = torch.zeros((len(ids), length), dtype=torch.long)
+        for row, seq in enumerate(ids):
+            input_ids[row, : len(seq)] = torch.tensor(seq, dtype=torch.long)
+            attention_mask[row, : len(seq)] = 1
+        return input_ids, attention_mask
+
+    @torch.no_grad()
+    def score_batch(
+        self,
+        source_ids: Sequence[List[int]],
+        target_ids: Sequence[List[int]],
+    ) -> np.ndarray:
+        """
+        Mean log-likelihood of each target given its source (token ids).
+        """
+        input_ids, attention_mask = self._pad(source_ids)
+        labels, target_mask = self._pad(target_ids)
+        # decoder inputs are the labels shifted right (as in `labels=...`)
+        decoder_input_ids = labels.new_full(labels.shape, self.pad_token_id)
+        decoder_input_ids[:, 1:] = labels[:, :-1]
+        decoder_input_ids[:, 0] = self.decoder_start_token_id
+        logits = self._logits(input_ids, attention_mask, decoder_input_ids)
+        # (fused) log-softmax + gather: logits are `batch x length x vocab`
+        token_scores = -torch.nn.functional.cross_entropy(
+            logits.float().flatten(0, 1),
+            labels.to(logits.device).flatten(),
+            reduction="none",
+        ).view(labels.shape)
+        mask = target_mask.to(token_scores)
+        return ((token_scores * mask).sum(dim=1) / mask.sum(dim=1)).cpu().numpy()
+
+    def score(
+        self,
+        sources: Sequence[str],
+        targets: Sequence[str],
+        batch_size: int = 4,
+        max_tokens: Optional[int] = None,
+    ) -> BartScoreOutput:
+        """
+        Scores aligned (source, target) pairs in length-sorted batches.
+
+        Args:
+            ```sources```: ```Sequence[str]```
+                Source text of each pair
+            ```targets```: ```Sequence[str]```
+                Target text of each pair
+            ```batch_size```: ```int```
+                Max number of pairs per batch
+            ```max_tokens```: ```Optional[int]```
+                Max padded (source + target) tokens per batch.
+                Caps the memory of batches of long texts.
+                If None, only `batch_size` applies.
+        """
+        texts: Dict[str, int] = {}
+        src_index = np.array(
+            [texts.setdefault(t, len(texts)) for t in sources],
+            dtype=np.int64,
+        )
+        tgt_index = np.array(
+            [texts.setdefault(t, len(texts)) for t in targets],
+            dtype=np.int64,
+        )
+        token_ids = self.encode(list(texts))
+        lengths = np.array([len(ids) for ids in token_ids], dtype=np.int64)
+        pair_lengths = lengths[src_index] + lengths[tgt_index]
+
+        batches = token_budget_batches(
+            pair_lengths,
+            max_tokens=max_tokens
+            or max(int(pair_lengths.max(initial=0)) * batch_size, 1),
+            max_batch_size=batch_size,
+        )
+        scores = np.zeros(len(src_index))
+        for batch in batches:
+            scores[batch] = self.score_batch(
+                [token_ids[idx] for idx in src_index[batch]],
+                [token_ids[idx] for idx in tgt_index[batch]],
+            )
+        return BartScoreOutput(
+            scores=scores,
+            padding_ratio=padding_ratio(pair_lengths, batches),
+            n_batches=len(batches),
+        )
+
+
+def main():
+    pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""
+    Length-bucketed BERTScore engine used by `BertScore(backend="native")`.
+
+    `bert_score` encodes sentences in fixed-size batches (sorted by word count)
+    and greedy-matches pairs in input order, so mixing short answers with long
+    passages wastes most of the compute on padding. Here:
+        - every unique text is tokenized and encoded once
+          (or read from a persistent `EmbeddingStore`, if given)
+        - texts are sorted by token length and encoded in token-budget batches
+        - pairs are sorted by length and matched in token-budget batches
+        - scores are scattered back to the original pair order
+
+    The model can also run on ONNX Runtime (`runtime="onnx"`, see `_onnx`).
+
+    This module imports torch/bert_score, so it's only imported when needed.
+"""
+
+from __future__ import annotations
+
+from collections import defaultdict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import torch
+from bert_score import BERTScorer
+from bert_score.utils import bert_encode, greedy_cos_idf, padding, sent_encode
+from torch.nn.utils.rnn import pad_sequence
+
+from ..._base.embeddings import EmbeddingStore, text_key
+from ..._base.kernels import padding_ratio, token_budget_batches
+from ._onnx import check_runtime, export_dir, load_ort_model
+
+
+@dataclass(frozen=True)
+class BertScoreOutput:
+    """
+    Pair-wise precision/recall/f1 (in input order) and batching stats.
+    """
+
+    precision: np.ndarray
+    recall: np.ndarray
+    f1: np.ndarray
+    padding_ratio: float
+    n_batches: int
+    n_encoded: int = 0
+    n_cached: int = 0
+
+
+class BertScoreEngine:
+    """
+    Holds the model/tokenizer of a `bert_score.BERTScorer` and scores
+    (prediction, reference) pairs with length-bucketed batching.
+
+    Args:
+        ```model_type```: ```str```
+            Model name/path for `bert_score`
+        ```num_layers```: ```Optional[int]```
+            Layer to use. If None, `bert_score`'s default for the model.
+        ```device```: ```str```
+            Which device to run the model on?
+        ```runtime```: ```str```
+            "torch" or "onnx" (the truncated `bert_score` model is exported
+            to ONNX on first use and run with ONNX Runtime).
+        ```quantize```: ```bool```
+            Use dynamic int8 quantization with the "onnx" runtime?
+        ```onnx_dir```: ```Optional[Union[str, Path]]```
+            Where exported models are cached. See `_onnx.default_onnx_dir()`.
+    """
+
+    def __init__(
+        self,
+        model_type: str,
+        num_layers: Optional[int] = None,
+        device: str = "cpu",
+        runtime: str = "torch",
+        quantize: bool = False,
+        onnx_dir: Optional[Union[str, Path]] = None,
+    ) -> None:
+        self.runtime = check_runtime(runtime)
+        self.quantize = quantize and runtime == "onnx"
+        self.scorer = BERTScorer(
+            model_type=model_type,
+            num_layers=num_layers,
+            device=device,
+        )
+        self.model = self.scorer._model
+        self.tokenizer = self.scorer._tokenizer
+        self.device = self.scorer.device
+        if self.runtime == "onnx":
+            self.model = load_ort_model(
+                "ORTModelForFeatureExtraction",
+                export_dir(onnx_dir, "bert_score", self.scorer.hash),
+                self._save_truncated,
+                quantize=self.quantize,
+                device=self.device,
+            )
+            # the torch model isn't needed anymore
+            self.scorer._model = None
+        # bert_score's default (no idf) weights: special tokens are ignored
+        self.idf_dict = defaultdict(lambda: 1.0)
+        self.idf_dict[self.tokenizer.sep_token_id] = 0
+        self.idf_dict[self.tokenizer.cls_token_id] = 0
+
+    @property
+    def hashcode(self) -> str:
+        # quantized embeddings differ, so they're kept apart (eg: in caches)
+        return self.scorer.hash + ("_onnx-int8" if self.quantize else "")
+
+    def _save_truncated(self, path: Path) -> None:
+        # bert_score drops the layers above `num_layers`
+        model = self.scorer._model
+        layers = next(
+            module
+            for module in model.modules()
+            if isinstance(module, torch.nn.ModuleList)
+        )
+        for name in ("num_hidden_layers", "n_layers", "num_layers"):
+            if hasattr(model.config, name):
+                setattr(model.config, name, len(layers))
+        model.save_pretrained(path)
+        self.tokenizer.save_pretrained(path)
+
+    def _forward(
+        self,
+        input_ids: torch.Tensor,
+        attention_mask: torch.Tensor,
+    ) -> torch.Tensor:
+        if self.runtime == "onnx":
+            return torch.as_tensor(
+                self.model(
+                    input_ids=input_ids,
+                    attention_mask=attention_mask,
+                    token_type_ids=torch.zeros_like(input_ids),
+                ).last_hidden_state,
+            )
+        return bert_encode(
+            self.model,
+            input_ids.to(self.device),
+            attention_mask=attention_mask.to(self.device),
+        )
+
+    def encode(self, texts: Sequence[str]) -> List[List[int]]:
+        return [sent_encode(self.tokenizer, text) for text in texts]
+
+    def embed(
+        self,
+        token_ids: Sequence[List[int]],
+        max_tokens: int,
+    ) -> Tuple[List[Tuple[torch.Tensor, torch.Tensor]], List[np.ndarray]]:
+        """
+        Contextual embeddings (and idf weights) of each sequence,
+        computed in length-bucketed token-budget batches.
+        Returns the (embedding, idf) per sequence and the batches.
+        """
+        lengths = [len(ids) for ids in token_ids]
+        batches = token_budget_batches(lengths, max_tokens)
+        stats = [None] * len(token_ids)
+        for batch in batches:
+            ids = [token_ids[idx] for idx in batch]
+            padded, lens, mask = padding(ids, self.tokenizer.pad_token_id)
+            idf, _, _ = padding(
+                [[self.idf_dict[i] for i in seq] for seq in ids],
+                0,
+                dtype=torch.float,
+            )
+            embeddings = self._forward(padded, mask).cpu()
+            for pos, idx in enumerate(batch):
+                n = int(lens[pos])
+                stats[idx] = (embeddings[pos, :n], idf[pos, :n])
+        return stats, batches
+
+    def score(
+        self,
+        predictions: Sequence[str],
+        references: Sequence[str],
+        max_tokens: int = 8192,
+        store: Optional[EmbeddingStore] = None,
+        store_predictions: bool = False,
+    ) -> BertScoreOutput:
+        """
+        Scores aligned (prediction, reference) pairs.
+
+        Args:
+            ```predictions```: ```Sequence[str]```
+                Prediction text of each pair
+            ```references```: ```Sequence[str]```
+                Reference text of each pair
+            ```max_tokens```: ```int```
+                Token budget (including padding) per batch
+            ```store```: ```Optional[EmbeddingStore]```
+                Embeddings of all texts are read from the store before
+                encoding, and the new reference embeddings are written to it.
+            ```store_predictions```: ```bool```
+                Also write the new prediction embeddings to the store?
+        """
+        texts: Dict[str, int] = {}
+        pred_index = np.array(
+            [texts.setdefault(t, len(texts)) for t in predictions],
+            dtype=np.int64,
+        )
+        ref_index = np.array(
+            [texts.setdefault(t, len(texts)) for t in references],
+            dtype=np.int64,
+        )
+        texts = list(texts)
+        stats = [None] * len(texts)
+        keys = list(map(text_key, texts)) if store is not None else []
+        cached = store.get_many(keys) if store is not None else {}
+        for idx, key in enumerate(keys):
+            if key in cached:
+                embeddings, idf = cached[key]
+                stats[idx] = (
+                    torch.from_numpy(np.array(embeddings, dtype=np.float32)),
+                    torch.from_numpy(np.array(idf, dtype=np.float32)),
+                )
+
+        missing = [idx for idx, stat in enumerate(stats) if stat is None]
+        token_ids = self.encode([texts[idx] for idx in missing])
+        encoded, batches = self.embed(token_ids, max_tokens)
+        for idx, stat in zip(missing, encoded):
+            stats[idx] = stat
+        if store is not None and missing:
+            persist = set(ref_index.tolist())
+            if store_predictions:
+                persist.update(pred_index.tolist())
+            store.put_many(
+                {
+                    keys[idx]: (stats[idx][0].numpy(), stats[idx][1].numpy())
+                    for idx in missing
+                    if idx in persist
+                },
+            )
+
+        lengths = np.array([len(e) for e, _ in stats], dtype=np.int64)
+        # cost of matching a pair is roughly (reference + prediction) length
+        pair_lengths = lengths[pred_index] + lengths[ref_index]
+        scores = np.zeros((len(pred_index), 3))
+        with torch.no_grad():
+            for batch in token_budget_batches(pair_lengths, max_tokens):
+                P, R, F = greedy_cos_idf(
+                    *self._pad([stats[i] for i in ref_index[batch]]),
+                    *self._pad([stats[i] for i in pred_index[batch]]),
+                    False,
+                )
+                scores[batch] = torch.stack((P, R, F), dim=-1).cpu().numpy()
+
+        return BertScoreOutput(
+            precision=scores[:, 0],
+            recall=scores[:, 1],
+            f1=scores[:, 2],
+            padding_ratio=padding_ratio(list(map(len, token_ids)), batches),
+            n_batches=len(batches),
+            n_encoded=len(missing),
+            n_cached=len(texts) - len(missing),
+        )
+
+    def _pad(self, stats: List[Tuple[torch.Tensor, torch.Tensor]]):
+        # same padding as `bert_score.utils.bert_cos_score_idf`
+        embeddings, idf = zip(*stats)
+        lens = torch.tensor([e.size(0) for e in embeddings], dtype=torch.long)
+        mask = torch.arange(int(lens.max())).expand(len(lens), -1) < lens.unsqueeze(1)
+        return (
+            pad_sequence(embeddings, batch_first=True, padding_value=2.0).to(
+                self.device,
+            ),
+            mask.to(self.device),
+            pad_sequence(idf, batch_first=True).to(self.device),
+        )
+
+
+def main():
+    pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,693 @@
+#!/usr/bin/env python3
+"""
+    Asyncio request engine for `LLMAsJudgeMetric`.
+
+    Judgements are requested from an OpenAI-compatible chat completions
+    endpoint (openai, ollama, vLLM, ...), with:
+        - bounded concurrency (`max_concurrency` requests in flight)
+        - token-bucket rate limiting (`requests_per_second`)
+        - retries with jittered exponential backoff (honoring `Retry-After`)
+        - one pooled HTTP client (keep-alive connections) per run
+        - load balancing over a pool of replicas (least outstanding requests),
+        with health checks and failover
+        - an optional persistent response cache (see `_judge_cache`)
+
+    The request is the same as `outlines.generate.choice(model, ["0", "1"])`
+    makes: a JSON-schema constrained response `{"result": "0" | "1"}`.
+    Alternatively (`logprob(...)`), a single one-token completion is requested
+    with the top logprobs, and P("1") is read from them.
+    Several pairs can also be judged by one request (`choice_array(...)`),
+    constrained to `{"results": ["0" | "1", ...]}` with one verdict per pair.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import math
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, List, Optional, Sequence, Union
+
+from loguru import logger
+
+from ._judge_cache import JudgeCache, cache_key
+
+# HTTP status codes worth retrying
+_RETRY_STATUS = (408, 409, 429, 500, 502, 503, 504)
+
+CHOICES = ("0", "1")
+
+# system message of logprob judgements (the answer is the first token)
+LOGPROB_INSTRUCTION = 'Answer with a single character: "1" or "0".'
+
+# cache "try index" of logprob judgements
+LOGPROB_TRY_INDEX = -1
+
+
+def _choice_schema(choices: Sequence[str]) -> dict:
+    return {
+        "type": "json_schema",
+        "json_schema": {
+            "name": "default",
+            "strict": True,
+            "schema": {
+                "type": "object",
+                "properties": {"result": {"type": "string", "enum": list(choices)}},
+                "additionalProperties": False,
+                "required": ["result"],
+            },
+        },
+    }
+
+
+def _array_schema(choices: Sequence[str], n: int) -> dict:
+    return {
+        "type": "json_schema",
+        "json_schema": {
+            "name": "default",
+            "strict": True,
+            "schema": {
+                "type": "object",
+                "properties": {
+                    "results": {
+                        "type": "array",
+                        "items": {"type": "string", "enum": list(choices)},
+                        "minItems": n,
+                        "maxItems": n,
+                    },
+                },
+                "additionalProperties": False,
+                "required": ["results"],
+            },
+        },
+    }
+
+
+class JudgeRequestError(Exception):
+    def __init__(
+        self,
+        message: str,
+        retry_after: Optional[float] = None,
+        failover: bool = False,
+    ) -> None:
+        super().__init__(message)
+        self.retry_after = retry_after
+        # another (healthy) endpoint can take the retry right away
+        self.failover = failover
+
+
+class LogprobsUnavailable(Exception):
+    """
+    The endpoint didn't return (usable) logprobs.
+    """
+
+
+class TokenBucket:
+    """
+    Asyncio token-bucket rate limiter.
+
+    Args:
+        ```rate```: ```float```
+            Tokens (requests) added per second
+        ```burst```: ```Optional[int]```
+            Bucket capacity, ie: max requests allowed at once.
+            Defaults to `max(1, rate)`.
+    """
+
+    def __init__(self, rate: float, burst: Optional[int] = None) -> None:
+        if rate <= 0:
+            raise ValueError(f"Invalid rate={rate}. Expected > 0")
+        self.rate = rate
+        self.burst = burst or max(1, int(rate))
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(
+                    self.burst,
+                    self._tokens + (now - self._updated) * self.rate,
+                )
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+@dataclass
+class RequestStats:
+    """
+    Counters of a judge run.
+    """
+
+    requests: int = 0
+    retries: int = 0
+    failures: int = 0
+    cache_hits: int = 0
+    cache_misses: int = 0
+    logprob_judgements: int = 0
+    logprob_fallbacks: int = 0
+    invalid_arrays: int = 0
+    rejected_arrays: int = 0
+
+    def as_dict(self) -> dict:
+        return dict(
+            requests=self.requests,
+            retries=self.retries,
+            failures=self.failures,
+        )
+
+
+@dataclass
+class Endpoint:
+    """
+    State and counters of an endpoint of the pool (for a run).
+    """
+
+    url: str
+    outstanding: int = 0
+    requests: int = 0
+    errors: int = 0
+    responses: int = 0
+    latency: float = 0.0
+    max_latency: float = 0.0
+    healthy: bool = True
+    # when an unhealthy endpoint is checked again
+    check_at: float = 0.0
+    checking: bool = False
+
+    def as_dict(self) -> dict:
+        return dict(
+            url=self.url,
+            requests=self.requests,
+            errors=self.errors,
+            mean_latency=self.latency / self.responses if self.responses else None,
+            max_latency=self.max_latency if self.responses else None,
+            healthy=self.healthy,
+        )
+
+
+class AsyncJudgeEngine:
+    """
+    Sends judge prompts to an OpenAI-compatible endpoint concurrently.
+
+    With a pool of endpoints (replicas serving the same model), every request
+    goes to the healthy endpoint with the least outstanding requests.
+    Endpoints are checked (`GET /models`) at the start of a run. An endpoint
+    failing a request (connection error, 5xx) is taken out of the pool, the
+    request fails over to another endpoint without backoff, and the endpoint
+    is checked again every `health_check_interval` seconds until it's back.
+    Per-endpoint counters are in `endpoints` after a run.
+
+    Args:
+        ```model```: ```str```
+            Model name
+        ```api_base```: ```Union[str, Sequence[str]]```
+            Base URL of the api (with `/v1`), or of every endpoint of a pool
+        ```api_key```: ```Optional[str]```
+            API key, sent as bearer token
+        ```temperature```: ```float```
+            Sampling temperature
+        ```max_concurrency```: ```int```
+            Max number of requests in flight
+        ```requests_per_second```: ```Optional[float]```
+            Rate limit. If None, no rate limit.
+        ```burst```: ```Optional[int]```
+            Max requests allowed at once by the rate limiter
+        ```max_retries```: ```int```
+            Max number of retries of a failed request
+            (connection errors, 429/5xx, invalid responses).
+            A request failing all its retries, or rejected (other 4xx),
+            is scored as NaN.
+        ```backoff```: ```float```
+            Base delay (seconds) of the exponential backoff
+        ```max_backoff```: ```float```
+            Max delay (seconds) between retries
+        ```timeout```: ```float```
+            Timeout (seconds) of a request
+        ```cache```: ```Optional[JudgeCache]```
+            Persistent cache of the judgements.
+            Looked up before a request, filled after a successful one.
+            Evicted (`JudgeCache.evict()`) at the end of every run.
+        ```health_check_interval```: ```float```
+            Delay (seconds) between health checks of an unhealthy endpoint
+    """
+
+    def __init__(
+        self,
+        model: str,
+        api_base: Union[str, Sequence[str]],
+        api_key: Optional[str] = None,
+        temperature: float = 0.0,
+        max_concurrency: int = 16,
+        requests_per_second: Optional[float] = None,
+        burst: Optional[int] = None,
+        max_retries: int = 5,
+        backoff: float = 0.5,
+        max_backoff: float = 30.0,
+        timeout: float = 60.0,
+        cache: Optional[JudgeCache] = None,
+        health_check_interval: float = 10.0,
+    ) -> None:
+        if max_concurrency < 1:
+            raise ValueError(
+                f"Invalid max_concurrency={max_concurrency}. Expected >= 1",
+            )
+        urls = [api_base] if isinstance(api_base, str) else list(api_base)
+        if not urls:
+            raise ValueError("Empty api_base pool")
+        self.model = model
+        self.urls = [url.rstrip("/") for url in urls]
+        # cache keys: any replica of the pool gives the same judgements
+        self.api_base = ",".join(sorted(self.urls))
+        self.api_key = api_key
+        self.temperature = temperature
+        self.max_concurrency = max_concurrency
+        self.requests_per_second = requests_per_second
+        self.burst = burst
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+        self.cache = cache
+        self.health_check_interval = health_check_interval
+        self.stats = RequestStats()
+        self.endpoints = [Endpoint(url) for url in self.urls]
+        # per run (event loop) state, see `run(...)`
+        self._client = None
+        self._semaphore = None
+        self._bucket = None
+        self._logprobs_probe = None
+        self._health_checks = set()
+
+    def run(self, coroutine: Awaitable):
+        """
+        Runs a coroutine that makes requests (through `choice(...)`) to
+        completion, with a pooled HTTP client shared by all its requests.
+        Works from within a running event loop too (eg: notebooks).
+        `stats` are reset for every run.
+        """
+        self.stats = RequestStats()
+        self.endpoints = [Endpoint(url) for url in self.urls]
+        # unknown until the first logprobs response
+        self._logprobs_available: Optional[bool] = None
+
+        async def _main():
+            import httpx
+
+            limits = httpx.Limits(
+                max_connections=self.max_concurrency,
+                max_keepalive_connections=self.max_concurrency,
+            )
+            headers = (
+                {"Authorization": f"Bearer {self.api_key}"} if self.api_key else {}
+            )
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._logprobs_probe = asyncio.Lock()
+            self._bucket = (
+                TokenBucket(self.requests_per_second, self.burst)
+                if self.requests_per_second
+                else None
+            )
+            async with httpx.AsyncClient(
+                limits=limits,
+                timeout=self.timeout,
+                headers=headers,
+            ) as client:
+                self._client = client
+                try:
+                    if len(self.endpoints) > 1:
+                        await asyncio.gather(*map(self._check, self.endpoints))
+                    return await coroutine
+                finally:
+                    for task in self._health_checks:
+                        task.cancel()
+                    self._health_checks.clear()
+                    self._client = None
+                    if self.cache is not None:
+                        self.cache.evict()
+
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(_main())
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            return executor.submit(asyncio.run, _main()).result()
+
+    def _payload(self, prompt: str) -> dict:
+        return dict(
+            model=self.model,
+            messages=[{"role": "user", "content": prompt}],
+            temperature=self.temperature,
+            n=1,
+            response_format=_choice_schema(CHOICES),
+        )
+
+    def _logprob_payload(self, prompt: str) -> dict:
+        return dict(
+            model=self.model,
+            messages=[
+                {"role": "system", "content": LOGPROB_INSTRUCTION},
+                {"role": "user", "content": prompt},
+            ],
+            temperature=self.temperature,
+            n=1,
+            max_tokens=1,
+            logprobs=True,
+            top_logprobs=5,
+        )
+
+    @staticmethod
+    def _parse_logprobs(response: dict) -> float:
+        """
+        P("1") (normalized over "0" and "1") from the top logprobs
+        of the first generated token.
+        """
+        try:
+            top_logprobs = response["choices"][0]["logprobs"]["content"][0][
+                "top_logprobs"
+            ]
+        except (KeyError, IndexError, TypeError):
+            raise LogprobsUnavailable("No logprobs in the response")
+        probs = dict.fromkeys(CHOICES, 0.0)
+        for candidate in top_logprobs:
+            token = candidate["token"].strip()
+            if token in probs:
+                probs[token] += math.exp(candidate["logprob"])
+        total = sum(probs.values())
+        if total <= 0:
+            raise LogprobsUnavailable("Neither '0' nor '1' in the top logprobs")
+        return probs["1"] / total
+
+    def _array_payload(self, prompt: str, n: int) -> dict:
+        return dict(
+            model=self.model,
+            messages=[{"role": "user", "content": prompt}],
+            temperature=self.temperature,
+            n=1,
+            response_format=_array_schema(CHOICES, n),
+        )
+
+    @staticmethod
+    def _parse(response: dict) -> float:
+        content = response["choices"][0]["message"]["content"]
+        result = json.loads(content)["result"]
+        if result not in CHOICES:
+            raise ValueError(f"Invalid judgement {result!r}")
+        return float(result)
+
+    @staticmethod
+    def _parse_array(response: dict, n: int) -> List[float]:
+        content = response["choices"][0]["message"]["content"]
+        results = json.loads(content)["results"]
+        if not isinstance(results, list) or len(results) != n:
+            raise ValueError(f"Expected {n} judgements, got {results!r}")
+        for result in results:
+            if result not in CHOICES:
+                raise ValueError(f"Invalid judgement {result!r}")
+        return [float(result) for result in results]
+
+    async def _check(self, endpoint: Endpoint) -> None:
+        """
+        Health check of an endpoint: up if `GET /models` gets any
+        non 5xx response (eg: 404 for servers without the route).
+        """
+        import httpx
+
+        endpoint.checking = True
+        try:
+            response = await self._client.get(
+                f"{endpoint.url}/models",
+                timeout=min(self.timeout, 5.0),
+            )
+            healthy = response.status_code < 500
+        except httpx.TransportError:
+            healthy = False
+        finally:
+            endpoint.checking = False
+        endpoint.healthy = healthy
+        if not healthy:
+            endpoint.check_at = time.monotonic() + self.health_check_interval
+            logger.warning(f"Judge endpoint {endpoint.url} is unhealthy")
+
+    def _select(self) -> Endpoint:
+        """
+        Healthy endpoint with the least outstanding requests
+        (then the least requests). If none is healthy, any endpoint.
+        """
+        now = time.monotonic()
+        for endpoint in self.endpoints:
+            if (
+                not endpoint.healthy
+                and not endpoint.checking
+                and now >= endpoint.check_at
+            ):
+                task = asyncio.ensure_future(self._check(endpoint))
+                self._health_checks.add(task)
+                task.add_done_callback(self._health_checks.discard)
+        candidates = [endpoint for endpoint in self.endpoints if endpoint.healthy]
+        return min(
+            candidates or self.endpoints,
+            key=lambda endpoint: (endpoint.outstanding, endpoint.requests),
+        )
+
+    def _mark_down(self, endpoint: Endpoint) -> bool:
+        """
+        Takes a failing endpoint out of a pool.
+        Returns whether another endpoint can take the retry.
+        """
+        if len(self.endpoints) == 1:
+            return False
+        if endpoint.healthy:
+            logger.warning(f"Judge endpoint {endpoint.url} failed. Failing over.")
+        endpoint.healthy = False
+        endpoint.check_at = time.monotonic() + self.health_check_interval
+        return any(other.healthy for other in self.endpoints)
+
+    async def _post(self, payload: dict) -> dict:
+        import httpx
+
+        endpoint = self._select()
+        endpoint.outstanding += 1
+        endpoint.requests += 1
+        start = time.monotonic()
+        try:
+            response = await self._client.post(
+                f"{endpoint.url}/chat/completions",
+                json=payload,
+            )
+        except httpx.TransportError as e:
+            endpoint.errors += 1
+            raise JudgeRequestError(
+                f"{endpoint.url}: {type(e).__name__}: {e}",
+                failover=self._mark_down(endpoint),
+            )
+        finally:
+            endpoint.outstanding -= 1
+        latency = time.monotonic() - start
+        endpoint.responses += 1
+        endpoint.latency += latency
+        endpoint.max_latency = max(endpoint.max_latency, latency)
+        if response.status_code in _RETRY_STATUS:
+            endpoint.errors += 1
+            retry_after = response.headers.get("retry-after")
+            raise JudgeRequestError(
+                f"{endpoint.url}: HTTP {response.status_code}",
+                retry_after=float(retry_after) if retry_after else None,
+                # 429: rate limited (the endpoint is healthy)
+                failover=response.status_code >= 500 and self._mark_down(endpoint),
+            )
+        response.raise_for_status()
+        return response.json()
+
+    def _delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        # "full jitter" exponential backoff
+        delay = random.uniform(0, min(self.max_backoff, self.backoff * 2**attempt))
+        return max(delay, retry_after or 0.0)
+
+    def cached(self, prompt: str, try_index: int) -> Optional[float]:
+        """
+        Cached judgement of a prompt (try), if any.
+        `try_index` tells apart the independent tries of a prompt.
+        """
+        if self.cache is None:
+            return None
+        value = self.cache.get(
+            cache_key(self.model, self.api_base, self.temperature, prompt, try_index),
+        )
+        if value is None:
+            self.stats.cache_misses += 1
+        else:
+            self.stats.cache_hits += 1
+        return value
+
+    def store(self, prompt: str, try_index: int, value: float) -> None:
+        """
+        Caches a judgement (failed ones, NaN, aren't cached).
+        """
+        if self.cache is not None and not math.isnan(value):
+            self.cache.put(
+                cache_key(
+                    self.model,
+                    self.api_base,
+                    self.temperature,
+                    prompt,
+                    try_index,
+                ),
+                value,
+            )
+
+    async def choice(self, prompt: str, try_index: int = 0) -> float:
+        """
+        Judgement (0 or 1) of a prompt, or NaN if all the retries failed.
+        `try_index` tells apart the independent tries of a prompt (in the cache).
+        """
+        value = self.cached(prompt, try_index)
+        if value is not None:
+            return value
+        value = await self._request(self._payload(prompt), self._parse)
+        self.store(prompt, try_index, value)
+        return value
+
+    async def choice_array(self, prompt: str, n: int) -> Optional[List[float]]:
+        """
+        Judgements (0 or 1) of the `n` pairs of a prompt, from one request.
+        NaNs if all the retries (of connection errors and 429/5xx) failed,
+        or None if the response isn't a valid array of `n` judgements
+        or the request is rejected (4xx, eg: a 400 for a prompt longer
+        than the context of the model).
+        Invalid arrays aren't retried: at a low temperature, the same
+        prompt would likely get the same response.
+        """
+        import httpx
+
+        try:
+            return await self._request(
+                self._array_payload(prompt, n),
+                lambda response: self._parse_array(response, n),
+                default=[math.nan] * n,
+                retry_invalid=False,
+                raise_rejected=True,
+            )
+        except httpx.HTTPStatusError as e:
+            self.stats.rejected_arrays += 1
+            logger.debug(f"Rejected judge request: {e}")
+            return None
+
+    async def logprob(self, prompt: str) -> Optional[float]:
+        """
+        P("1") of a prompt from a single request, NaN if all the retries
+        failed, or None if the endpoint doesn't return logprobs
+        (then, logprobs aren't requested anymore in this run).
+        """
+        value = self.cached(prompt, LOGPROB_TRY_INDEX)
+        if value is not None:
+            self.stats.logprob_judgements += 1
+            return value
+        if self._logprobs_available is None:
+            # a single request probes the support of logprobs,
+            # so that an endpoint without it gets only one of them
+            async with self._logprobs_probe:
+                if self._logprobs_available is None:
+                    return await self._logprob_request(prompt)
+        return await self._logprob_request(prompt)
+
+    async def _logprob_request(self, prompt: str) -> Optional[float]:
+        import httpx
+
+        if self._logprobs_available is False:
+            self.stats.logprob_fallbacks += 1
+            return None
+        # only the probe's 4xx tells that logprobs aren't supported
+        # (afterwards, eg: a 400 for a too long prompt only fails its item)
+        probe = self._logprobs_available is None
+        try:
+            value = await self._request(
+                self._logprob_payload(prompt),
+                self._parse_logprobs,
+                raise_rejected=probe,
+            )
+        # eg: 400 for endpoints that don't support the logprobs parameters
+        except (LogprobsUnavailable, httpx.HTTPStatusError) as e:
+            logger.warning(f"{e}. Falling back to sampling.")
+            self._logprobs_available = False
+            self.stats.logprob_fallbacks += 1
+            return None
+        if not math.isnan(value):
+            self._logprobs_available = True
+        self.stats.logprob_judgements += 1
+        self.store(prompt, LOGPROB_TRY_INDEX, value)
+        return value
+
+    async def _request(
+        self,
+        payload: dict,
+        parse: Callable[[dict], Any],
+        default: Any = math.nan,
+        retry_invalid: bool = True,
+        raise_rejected: bool = False,
+    ) -> Any:
+        """
+        Parsed response of a request, or `default` if all the retries failed
+        or the request was rejected (other 4xx, not retried).
+        With `retry_invalid=False`, None for an invalid response.
+        With `raise_rejected=True`, a rejected request (4xx) raises
+        `httpx.HTTPStatusError`.
+        """
+        import httpx
+
+        for attempt in range(self.max_retries + 1):
+            retry_after, failover = None, False
+            async with self._semaphore:
+                if self._bucket is not None:
+                    await self._bucket.acquire()
+                self.stats.requests += 1
+                try:
+                    return parse(await self._post(payload))
+                except JudgeRequestError as e:
+                    error, retry_after, failover = e, e.retry_after, e.failover
+                except httpx.HTTPStatusError as e:
+                    # eg: 400, the same request would be rejected again
+                    if raise_rejected and e.response.status_code < 500:
+                        raise
+                    error = e
+                    break
+                except (KeyError, IndexError, TypeError, ValueError) as e:
+                    # malformed/invalid output (json.JSONDecodeError is a ValueError)
+                    if not retry_invalid:
+                        self.stats.invalid_arrays += 1
+                        logger.debug(f"Invalid judge response: {e}")
+                        return None
+                    error = e
+            if attempt < self.max_retries:
+                self.stats.retries += 1
+                if not failover:
+                    await asyncio.sleep(self._delay(attempt, retry_after))
+        self.stats.failures += 1
+        logger.warning(
+            f"Judge request failed after {attempt} retries: {error}",
+        )
+        return default
+
+    async def choices(self, prompt: str, n_tries: int) -> List[float]:
+        """
+        `n_tries` independent judgements of a prompt (requested concurrently).
+        """
+        return list(
+            await asyncio.gather(*(self.choice(prompt, idx) for idx in range(n_tries))),
+        )
+
+
+def main():
+    pass
+
+
+if __name__ == "__main__":
+    main()
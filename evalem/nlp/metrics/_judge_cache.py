@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+    Persistent (SQLite) cache of LLM judge responses.
+
+    An entry is keyed by (model, api_base, temperature, prompt, try index),
+    so that re-running an evaluation (eg: after a crash or a small dataset
+    change) only requests the new judgements, while the `n_tries` samples
+    of a prompt stay independent judgements.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Optional, Union
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    value REAL NOT NULL,
+    created REAL NOT NULL,
+    accessed REAL NOT NULL
+)
+"""
+
+
+def cache_key(
+    model: str,
+    api_base: str,
+    temperature: float,
+    prompt: str,
+    try_index: int,
+) -> str:
+    payload = json.dumps([model, api_base, temperature, prompt, try_index])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class JudgeCache:
+    """
+    SQLite cache of judge responses.
+    Safe to share between threads and processes.
+
+    Args:
+        ```path```: ```Union[str, Path]```
+            SQLite database file
+        ```ttl```: ```Optional[float]```
+            Time-to-live (seconds) of an entry. Expired entries are misses.
+            If None, entries don't expire.
+        ```max_entries```: ```Optional[int]```
+            Max number of entries kept by `evict()`.
+            Least recently used entries are evicted first.
+            If None, no size limit.
+
+    Usage:
+        .. code-block: python
+
+            from evalem.nlp.metrics._judge_cache import JudgeCache
+
+            cache = JudgeCache("~/.cache/evalem/judge.sqlite", ttl=7 * 86400, max_entries=10**6)
+            metric = LLMAsJudgeMetric(model=..., api_base=..., cache=cache)
+    """
+
+    def __init__(
+        self,
+        path: Union[str, Path],
+        ttl: Optional[float] = None,
+        max_entries: Optional[int] = None,
+    ) -> None:
+        self.path = Path(path).expanduser()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            str(self.path),
+            timeout=30,
+            check_same_thread=False,
+        )
+        with self._lock, self._conn:
+            # concurrent readers along with a writer
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(_SCHEMA)
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)",
+            )
+
+    def get(self, key: str) -> Optional[float]:
+        now = time.time()
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT value, created FROM responses WHERE key = ?",
+                (key,),
+            ).fetchone()
+            if row is None or (self.ttl is not None and now - row[1] > self.ttl):
+                return None
+            self._conn.execute(
+                "UPDATE responses SET accessed = ? WHERE key = ?",
+                (now, key),
+            )
+        return row[0]
+
+    def put(self, key: str, value: float) -> None:
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?)",
+                (key, float(value), now, now),
+            )
+
+    def evict(self) -> int:
+        """
+        Removes expired entries, then least recently used entries
+        beyond `max_entries`. Returns the number of removed entries.
+        """
+        removed = 0
+        with self._lock, self._conn:
+            if self.ttl is not None:
+                removed += self._conn.execute(
+                    "DELETE FROM responses WHERE created < ?",
+                    (time.time() - self.ttl,),
+                ).rowcount
+            if self.max_entries is not None:
+                removed += self._conn.execute(
+                    "DELETE FROM responses WHERE key NOT IN"
+                    + " (SELECT key FROM responses ORDER BY accessed DESC LIMIT ?)",
+                    (self.max_entries,),
+                ).rowcount
+        return removed
+
+    def clear(self) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM responses")
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def __getstate__(self) -> dict:
+        # connections can't be pickled (eg: process executors)
+        return dict(path=self.path, ttl=self.ttl, max_entries=self.max_entries)
+
+    def __setstate__(self, state: dict) -> None:
+        self.__init__(**state)
+
+
+def main():
+    pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+    ONNX Runtime execution of the models used by semantic metrics
+    (`BertScore`, `BartScore`), through `optimum`.
+
+    Models are exported on first use into a cache directory (one per model
+    config) and loaded from it afterwards. Optionally, the exported weights
+    are dynamically quantized to int8 (`onnxruntime.quantization`), which is
+    faster on CPU at the cost of some precision.
+
+    This module imports optimum/onnxruntime, so it's only imported when needed.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Callable, Optional, Union
+
+from loguru import logger
+
+RUNTIMES = ("torch", "onnx")
+
+_QUANTIZED_DIR = "int8"
+
+
+def check_runtime(runtime: str) -> str:
+    if runtime not in RUNTIMES:
+        raise ValueError(f"Invalid runtime={runtime}. Expected one of {RUNTIMES}")
+    return runtime
+
+
+def default_onnx_dir() -> Path:
+    """
+    Root directory of exported models.
+    Can be set through the `EVALEM_ONNX_CACHE` environment variable.
+    """
+    return Path(
+        os.environ.get("EVALEM_ONNX_CACHE", "~/.cache/evalem/onnx"),
+    ).expanduser()
+
+
+def export_dir(onnx_dir: Optional[Union[str, Path]], *config) -> Path:
+    """
+    Export directory of a model config (eg: model name + layers) under `onnx_dir`.
+    """
+    root = default_onnx_dir() if onnx_dir is None else Path(onnx_dir).expanduser()
+    key = hashlib.blake2b(repr(config).encode("utf-8"), digest_size=8).hexdigest()
+    return root / key
+
+
+def execution_provider(device: str) -> str:
+    return (
+        "CUDAExecutionProvider" if device.startswith("cuda") else "CPUExecutionProvider"
+    )
+
+
+def load_ort_model(
+    ort_class: str,
+    directory: Union[str, Path],
+    save_source: Callable[[Path], None],
+    quantize: bool = False,
+    device: str = "cpu",
+    **kwargs,
+):
+    """
+    Loads an `optimum.onnxruntime` model from `directory`,
+    exporting (and quantizing) it first if it isn't there yet.
+
+    Args:
+        ```ort_class```: ```str```
+            `ORTModel` class name in `optimum.onnxruntime`
+            (eg: "ORTModelForFeatureExtraction")
+        ```directory```: ```Union[str, Path]```
+            Where the exported model lives
+        ```save_source```: ```Callable[[Path], None]```
+            Saves the (transformers) model and tokenizer to export into a
+            directory. Only called when the model has to be exported.
+        ```quantize```: ```bool```
+            Load the dynamically int8-quantized model?
+        ```device```: ```str```
+            Which device to run the model on?
+        ```kwargs```:
+            Extra arguments to `ORTModel.from_pretrained(...)`
+    """
+    from importlib import import_module
+
+    cls = getattr(import_module("optimum.onnxruntime"), ort_class)
+    directory = Path(directory)
+    if not (directory / "config.json").exists():
+        logger.info(f"Exporting {ort_class} to {directory}")
+        with tempfile.TemporaryDirectory() as tmp:
+            source, exported = Path(tmp, "source"), Path(tmp, "exported")
+            save_source(source)
+            cls.from_pretrained(source, export=True, **kwargs).save_pretrained(exported)
+            _move_into(exported, directory)
+
+    if quantize:
+        quantized = directory / _QUANTIZED_DIR
+        if not (quantized / "config.json").exists():
+            with tempfile.TemporaryDirectory(dir=directory) as tmp:
+                _quantize_dir(directory, Path(tmp, "out"))
+                _move_into(Path(tmp, "out"), quantized)
+        directory = quantized
+
+    return cls.from_pretrained(directory, provider=execution_provider(device), **kwargs)
+
+
+def _quantize_dir(source: Path, target: Path) -> None:
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    target.mkdir(parents=True)
+    for path in source.iterdir():
+        if path.is_dir():
+            continue
+        if path.suffix == ".onnx":
+            quantize_dynamic(path, target / path.name, weight_type=QuantType.QInt8)
+        else:
+            shutil.copy(path, target / path.name)
+
+
+def _move_into(source: Path, target: Path) -> None:
+    # exports of the same model by concurrent processes: first one wins
+    target.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        os.rename(source, target)
+    except OSError:
+        if not (target / "config.json").exists():
+            raise
+
+
+def main():
+    pass
+
+
+if __name__ == "__main__":
+    main()
@@ -1,50 +1,93 @@
 #!/usr/bin/env python3
 
 import dataclasses
-from typing import Tuple
+from typing import Optional
 
 from ..._base.metrics import JuryBasedMetric
+from ..._base.states import MeanState
 from ..._base.structures import (
+    EvaluationInputs,
+    EvaluationMode,
     EvaluationPredictionInstance,
     EvaluationReferenceInstance,
     MetricResult,
-    SinglePredictionInstance,
 )
 from ._base import NLPMetric
 
 
 class ExactMatchMetric(JuryBasedMetric, NLPMetric):
-    def __init__(self) -> None:
-        super().__init__(metrics="exact_match")
+    """
+    Exact match between predictions and references.
 
-    def _flatten_multi_prediction_multi_reference(
+    For multiple references (or predictions) per item, every
+    (prediction, reference) pair of an item is matched over the index-based
+    ragged layout of the inputs and reduced per item with `reduce_fn`
+    (max by default), then averaged over items.
+    Nothing is flattened/duplicated.
+
+    Args:
+        ```backend```: ```Optional[str]```
+            Either "jury" or "native".
+            Only used for single-prediction, single-reference inputs.
+        ```reduce_fn```: ```str```
+            One of "max", "min" or "mean" for per-item reduction.
+    """
+
+    def __init__(
         self,
-        predictions: EvaluationPredictionInstance,
-        references: EvaluationReferenceInstance,
-    ) -> Tuple[EvaluationPredictionInstance, EvaluationReferenceInstance]:
-        raise NotImplementedError()
+        backend: Optional[str] = None,
+        reduce_fn: str = "max",
+    ) -> None:
+        super().__init__(metrics="exact_match", backend=backend)
+        self.reduce_fn = reduce_fn
 
     def compute(
         self,
-        predictions: SinglePredictionInstance,
+        predictions: EvaluationPredictionInstance,
         references: EvaluationReferenceInstance,
         **kwargs,
     ) -> MetricResult:
-        # This metric doesn't support multi-reference format.
-        # So, we flatten everything:
-        # Single Prediction, Multi-Ref -> Single Prediction, Single-Ref
-        predictions, references = self._flatten_instances(predictions, references)
-        result = super().compute(
-            predictions=predictions,
-            references=references,
-            **kwargs,
+        inputs = self._normalize_inputs(predictions, references)
+        if inputs.mode == EvaluationMode.SRSP:
+            return super().compute(
+                predictions=inputs.predictions,
+                references=inputs.references,
+                **kwargs,
+            )
+
+        reduce_fn = kwargs.get("reduce_fn", None) or self.reduce_fn
+        stats = self._token_stats(inputs)
+        score = None
+        if stats.empty_items < len(inputs):
+            score = stats.exact_match(reduce_fn)
+        return MetricResult.from_dict(
+            dict(
+                metric_name=self.__classname__,
+                score=score,
+                total_items=len(inputs),
+                empty_items=stats.empty_items,
+                exact_match=score,
+                reduce_fn=reduce_fn,
+            ),
         )
 
-        extra = result.extra
-        extra["flattened"] = True
-        result = dataclasses.replace(
+    def update(
+        self,
+        state: MeanState,
+        predictions: EvaluationPredictionInstance,
+        references: EvaluationReferenceInstance,
+        **kwargs,
+    ) -> MeanState:
+        kwargs["reduce_fn"] = kwargs.get("reduce_fn", None) or self.reduce_fn
+        return super().update(state, predictions, references, **kwargs)
+
+    def fusable(self, inputs: EvaluationInputs, **kwargs) -> bool:
+        # other modes don't go through jury
+        return inputs.mode == EvaluationMode.SRSP and super().fusable(inputs, **kwargs)
+
+    def _to_result(self, results: dict) -> MetricResult:
+        result = super()._to_result(results)
+        return dataclasses.replace(
             result,
             score=result.extra.get("exact_match", None),
-            extra=extra,
         )
-        return result
@@ -1,13 +1,13 @@
 #!/usr/bin/env python3
 
+import asyncio
 from enum import Enum
-from typing import List, Optional, Tuple
+from pathlib import Path
+from typing import List, Optional, Sequence, Tuple, Union
 from urllib.parse import urljoin
 
 import numpy as np
-import outlines
 from loguru import logger
-from outlines.models.openai import OpenAIConfig
 
 from ..._base.structures import (
     EvaluationPredictionInstance,
@@ -15,7 +15,10 @@ from ..._base.structures import (
     MetricResult,
     SequenceType,
 )
+from ..models.defaults import HFJudgeWrapper
 from ._base import NLPMetric
+from ._judge import AsyncJudgeEngine
+from ._judge_cache import JudgeCache
 
 
 class AggregationType(Enum):
@@ -32,17 +35,43 @@ class LLMAsJudgeMetric(NLPMetric):
 
     The prompt can be changed using `prompt` attribute.
 
+    Requests are made concurrently by an asyncio engine
+    (see `_judge.AsyncJudgeEngine`) with rate limiting, retries and
+    HTTP connection reuse. Scores are returned in input order.
+
+    Identical prompts (eg: repeated short answers) are judged once
+    (`n_tries` times) and their scores are shared by every occurrence.
+    The fraction of prompts saved is reported in `extra["dedup_ratio"]`.
+
+    With `pairs_per_prompt > 1`, several pairs are judged by one request
+    (see `batch_prompt`), which saves the prompt overhead and latency of
+    one request per pair for short answers.
+
+    The judge can also be a local model run in-process
+    (`model=HFJudgeWrapper(...)`): every prompt is scored with the
+    next-token probability of "1" from batched forward passes (as with
+    `scoring="logprobs"`), so the request options don't apply.
+    Batching stats are reported in `extra["local"]`.
+
+    Judges can be cascaded from cheap to expensive (`cascade`): an item
+    is escalated to the next judge only if its score is uncertain.
+
     Args:
-        ```model```: ```str```
-            OpenaAI-api compatible model name.
+        ```model```: ```Union[str, HFJudgeWrapper]```
+            OpenaAI-api compatible model name, or a local judge model.
             Could be:
                 - open ai models
                 - ollama models
-        ```api_base```: ```str```
-            Base URL for api requests.
+                - `evalem.nlp.models.HFJudgeWrapper`
+        ```api_base```: ```Optional[Union[str, Sequence[str]]]```
+            Base URL for api requests (required for endpoint models).
             - openai: https://api.openai.com/v1
             - ollama: https://localhost:11434/v1
             If `/v1` is not present, it will be appended
+            A list of URLs is a pool of replicas (serving the same model):
+            requests go to the healthy endpoint with the least outstanding
+            requests, and fail over to another one on errors.
+            Per-endpoint counters are reported in `extra["endpoints"]`.
         ```api_key```: ```Optional[str]```
             API key to make request for compleition
         ```n_tries```: ```int```
@@ -54,6 +83,78 @@ class LLMAsJudgeMetric(NLPMetric):
         ```aggregation_type```: ```Optional[AggregationType]```
             Decides how to aggregate scores from the multiple judgement tries.
             Defaults to `AggregationType.MEAN` if not provided.
+        ```scoring```: ```str```
+            How a prompt is judged:
+                - "sampling" (default): `n_tries` sampled judgements,
+                aggregated with `aggregation_type`
+                - "logprobs": a single request for the top logprobs of
+                the first answer token; the score is P("1") (normalized
+                over "0" and "1"). Falls back to sampling if the endpoint
+                doesn't return logprobs. Counts are in `extra["logprobs"]`.
+        ```pairs_per_prompt```: ```int```
+            Number of (prediction, reference) pairs judged by one request.
+            The response is constrained to a JSON array of one verdict per
+            pair. A batch whose response isn't a valid array (eg: wrong length),
+            or whose request is rejected (4xx, eg: longer than the context),
+            is split in halves which are re-issued, down to single pairs.
+            Only with `scoring="sampling"` and without `early_stopping`.
+            Splits are reported in `extra["batching"]`. Defaults to 1.
+        ```batch_prompt```: ```Optional[str]```
+            Prompt of a batch of pairs, with `{n}` (number of pairs) and
+            `{items}` placeholders. Pairs are formatted with
+            `LLMAsJudgeMetric._batch_item`.
+            If not provided, defaults to `LLMAsJudgeMetric._batch_prompt`
+        ```early_stopping```: ```bool```
+            If enabled, the tries of a prompt are made sequentially and
+            stop as soon as the aggregate is decided:
+                - `AggregationType.MAX`: at the first "1" (same results
+                as making all the tries)
+                - `AggregationType.MEAN`: once the tries so far (at least 2)
+                are unanimous and the (Laplace) probability of the remaining
+                tries agreeing, `(k + 1) / (n_tries + 1)` after `k` tries,
+                is at least `early_stopping_confidence`.
+            Calls saved are reported in `extra["early_stopping"]`.
+            Defaults to False (all the tries are made concurrently).
+        ```early_stopping_confidence```: ```float```
+            Confidence bound for stopping `AggregationType.MEAN` sampling.
+            Defaults to 0.6. 1.0 never stops early.
+        ```max_concurrency```: ```int```
+            Max number of judge requests in flight. Defaults to 16.
+        ```requests_per_second```: ```Optional[float]```
+            Rate limit of the requests (token bucket).
+            If None, requests aren't rate limited.
+        ```max_retries```: ```int```
+            Max retries of a failed request (connection errors, 429/5xx,
+            invalid responses), with jittered exponential backoff.
+            Tries failing all the retries, or rejected (other 4xx, eg: 400,
+            not retried), are ignored in the aggregation
+            (and counted in `extra["requests"]["failures"]`).
+        ```timeout```: ```float```
+            Timeout (seconds) of a request.
+        ```health_check_interval```: ```float```
+            Delay (seconds) between health checks of an unhealthy
+            endpoint of a pool. Defaults to 10.
+        ```cache```: ```Optional[Union[str, Path, JudgeCache]]```
+            Opt-in persistent (SQLite) cache of the judgements, or its path.
+            Keyed by model, api_base, temperature, prompt and try index,
+            so re-running an evaluation only requests new judgements.
+            Hits/misses are reported in `extra["cache"]`.
+        ```cache_ttl```: ```Optional[float]```
+            Time-to-live (seconds) of the cached judgements.
+        ```cache_max_entries```: ```Optional[int]```
+            Max number of cached judgements (least recently used are evicted).
+        ```cascade```: ```Optional[Sequence[LLMAsJudgeMetric]]```
+            Judges (eg: stronger models) that items are escalated to, in order,
+            after this metric's judge. An item is escalated when its aggregated
+            score is in `uncertainty_band` (or NaN), and its final score is the
+            one of the last judge it reached. Each judge uses its own settings
+            (prompt, n_tries, scoring, ...). Per-stage item/call counts and the
+            agreement of each judge with the previous one on the escalated items
+            are reported in `extra["cascade"]`.
+        ```uncertainty_band```: ```Tuple[float, float]```
+            (low, high) bounds (inclusive) of the uncertain scores.
+            Defaults to (0.2, 0.8). Binary scores (`n_tries=1` sampling) are
+            never uncertain: use several tries or `scoring="logprobs"`.
         ```max_n```: ```Optional[int]```
             If set, the total number of references or predictions per item.
             This is to reduce LLM calls and thus minimizing scoring time.
@@ -103,33 +204,117 @@ class LLMAsJudgeMetric(NLPMetric):
         + "Reference: {reference}"
     )
 
+    _batch_prompt = (
+        "You are a very good binary classifier."
+        + " Classify the quality of each prediction based on its reference.\n"
+        + 'Answer with the {n} verdicts ("1" for a match, "0" otherwise)'
+        + " in the order of the items.\n\n"
+        + "{items}"
+    )
+
+    _batch_item = "Item {index}:\nPrediction: {prediction}\nReference: {reference}"
+
     def __init__(
         self,
-        model: str,
-        api_base: str,
+        model: Union[str, HFJudgeWrapper],
+        api_base: Optional[Union[str, Sequence[str]]] = None,
         api_key: Optional[str] = None,
         n_tries: int = 1,
         temperature: float = 0.0,
         prompt: Optional[str] = None,
         aggregation_type: Optional[List[AggregationType]] = None,
+        scoring: str = "sampling",
+        pairs_per_prompt: int = 1,
+        batch_prompt: Optional[str] = None,
+        early_stopping: bool = False,
+        early_stopping_confidence: float = 0.6,
+        max_concurrency: int = 16,
+        requests_per_second: Optional[float] = None,
+        max_retries: int = 5,
+        timeout: float = 60.0,
+        health_check_interval: float = 10.0,
+        cache: Optional[Union[str, Path, JudgeCache]] = None,
+        cache_ttl: Optional[float] = None,
+        cache_max_entries: Optional[int] = None,
+        cascade: Optional[Sequence["LLMAsJudgeMetric"]] = None,
+        uncertainty_band: Tuple[float, float] = (0.2, 0.8),
         max_n: Optional[int] = None,
         debug: bool = False,
     ) -> None:
         super().__init__(debug=debug)
 
-        model = self.__clean_model(model)
-        api_base = self.__clean_url(api_base)
-        self.model = outlines.models.openai(
-            model,
-            base_url=api_base,
-            api_key=api_key,
-            config=OpenAIConfig(temperature=temperature),
-        )
+        # in-process judge
+        self.local_model = None
+        self.engine = None
+        if isinstance(model, HFJudgeWrapper):
+            if pairs_per_prompt > 1 or early_stopping:
+                raise ValueError(
+                    "pairs_per_prompt and early_stopping don't apply to a local judge model",
+                )
+            self.local_model = model
+            model = model.name
+        elif api_base is None:
+            raise ValueError("Missing api_base for the judge endpoint")
+        else:
+            model = self.__clean_model(model)
+            api_base = (
+                self.__clean_url(api_base)
+                if isinstance(api_base, str)
+                else list(map(self.__clean_url, api_base))
+            )
+            if cache is not None and not isinstance(cache, JudgeCache):
+                cache = JudgeCache(cache, ttl=cache_ttl, max_entries=cache_max_entries)
+            self.engine = AsyncJudgeEngine(
+                model,
+                api_base=api_base,
+                api_key=api_key,
+                temperature=temperature,
+                max_concurrency=max_concurrency,
+                requests_per_second=requests_per_second,
+                max_retries=max_retries,
+                timeout=timeout,
+                cache=cache,
+                health_check_interval=health_check_interval,
+            )
+        self.model = model
         self.api_base = api_base
         self.n_tries = n_tries or 1
         self.prompt = prompt or LLMAsJudgeMetric._prompt
         self.aggregation_type = aggregation_type or AggregationType.MEAN
+        if scoring not in ("sampling", "logprobs"):
+            raise ValueError(
+                f"Invalid scoring={scoring}. Expected 'sampling' or 'logprobs'",
+            )
+        self.scoring = scoring
+        self.early_stopping = early_stopping
+        self.early_stopping_confidence = early_stopping_confidence
         self._sanity_check_prmopt(self.prompt)
+        if pairs_per_prompt < 1:
+            raise ValueError(
+                f"Invalid pairs_per_prompt={pairs_per_prompt}. Expected >= 1",
+            )
+        if pairs_per_prompt > 1 and (scoring != "sampling" or early_stopping):
+            raise ValueError(
+                "pairs_per_prompt > 1 requires scoring='sampling' without early_stopping",
+            )
+        self.pairs_per_prompt = pairs_per_prompt
+        self.batch_prompt = batch_prompt or LLMAsJudgeMetric._batch_prompt
+        if "{n}" not in self.batch_prompt or "{items}" not in self.batch_prompt:
+            raise ValueError(
+                "Missing '{n}' and '{items}' placeholders in the batch prompt.",
+            )
+        self.cascade = list(cascade or [])
+        for judge in self.cascade:
+            if not isinstance(judge, LLMAsJudgeMetric):
+                raise TypeError(
+                    f"Invalid cascade judge {judge}. Expected LLMAsJudgeMetric",
+                )
+        low, high = uncertainty_band
+        if not 0.0 <= low <= high <= 1.0:
+            raise ValueError(
+                f"Invalid uncertainty_band={uncertainty_band}. Expected 0 <= low <= high <= 1",
+            )
+        self.uncertainty_band = (low, high)
         self.max_n = max_n or None
         if self.max_n:
             logger.warning(
@@ -183,6 +368,10 @@ class LLMAsJudgeMetric(NLPMetric):
         **kwargs,
     ) -> MetricResult:
         # make sure to flatten
+        predictions, references = self._normalize_inputs(
+            predictions,
+            references,
+        ).to_jury()
         predictions, references = self._flatten_instances(
             predictions,
             references,
@@ -190,37 +379,270 @@ class LLMAsJudgeMetric(NLPMetric):
         )
         if self.debug:
             logger.debug(f"Evaluating for {len(predictions)} predictions.")
-        generator = outlines.generate.choice(self.model, ["0", "1"])
+        individual_scores, res, extra = self._judge_pairs(predictions, references)
+        if self.cascade:
+            extra["cascade"] = self._escalate(
+                predictions,
+                references,
+                individual_scores,
+                res,
+                extra,
+            )
+        return MetricResult(
+            score=float(np.nanmean(res)) if not np.isnan(res).all() else None,
+            total_items=len(predictions),
+            metric_name=self.__classname__,
+            extra=extra,
+        )
+
+    def _judge_pairs(
+        self,
+        predictions: Sequence[str],
+        references: Sequence[str],
+    ) -> Tuple[List[List[float]], List[float], dict]:
+        """
+        Judgements, aggregated scores and extras of (flattened) pairs.
+        """
+        prompts = [
+            self.prompt.format(prediction=pred, reference=ref)
+            for pred, ref in zip(predictions, references)
+        ]
+        # judge every unique prompt once, then scatter back to all occurrences
+        unique = {}
+        index = [unique.setdefault(prompt, len(unique)) for prompt in prompts]
+        if self.local_model is not None:
+            output = self.local_model.judge(list(unique))
+            unique_scores = [[score] for score in output.scores.tolist()]
+        elif self.pairs_per_prompt > 1:
+            pairs = {}
+            for prompt, pair in zip(prompts, zip(predictions, references)):
+                pairs.setdefault(prompt, pair)
+            unique_scores = self.engine.run(
+                self._compute_batched(list(unique), list(pairs.values())),
+            )
+        else:
+            unique_scores = self.engine.run(self._compute_all(list(unique)))
+        individual_scores = [list(unique_scores[idx]) for idx in index]
+
         res = []
-        individual_scores = []
-        for pred, ref in zip(predictions, references):
-            prompt = self.prompt.format(prediction=pred, reference=ref)
-            if self.debug:
-                logger.debug(f"Prompt :: {prompt}")
-            scores = []
-            score = np.nan
-            with outlines.caching.cache_disabled():
-                scores = self._compute_single(generator, prompt, self.n_tries)
+        for prompt, scores in zip(prompts, individual_scores):
             score = self._aggregate_scores(scores, self.aggregation_type)
-            individual_scores.append(scores)
             res.append(score)
             if self.debug:
+                logger.debug(f"Prompt :: {prompt}")
                 logger.debug(f"Scores :: {scores}")
                 logger.debug(f"Aggregated score :: {score}")
-        return MetricResult(
-            score=float(np.mean(res)),
-            total_items=len(predictions),
-            metric_name=self.__classname__,
-            extra=dict(scores=individual_scores, model=self.model),
+        extra = dict(
+            scores=individual_scores,
+            model=self.model,
+            dedup_ratio=1 - len(unique) / len(prompts) if prompts else 0.0,
+        )
+        if self.local_model is not None:
+            extra["local"] = dict(
+                prompts=len(unique),
+                batch_size=self.local_model.batch_size,
+                n_batches=output.n_batches,
+                padding_ratio=output.padding_ratio,
+            )
+        else:
+            extra.update(self._engine_extras(len(unique), unique_scores))
+        return individual_scores, res, extra
+
+    def _is_uncertain(self, score: float) -> bool:
+        low, high = self.uncertainty_band
+        return bool(np.isnan(score)) or low <= score <= high
+
+    def _escalate(
+        self,
+        predictions: Sequence[str],
+        references: Sequence[str],
+        scores: List[List[float]],
+        res: List[float],
+        extra: dict,
+    ) -> dict:
+        """
+        Re-judges the uncertain items with the `cascade` judges, in place
+        (`scores` and `res`). Returns the per-stage stats.
+        """
+        stages = [
+            dict(
+                model=self.model,
+                items=len(res),
+                calls=self._calls(extra),
+                agreement=None,
+            ),
+        ]
+        items = list(range(len(res)))
+        for judge in self.cascade:
+            items = [idx for idx in items if self._is_uncertain(res[idx])]
+            stages[-1]["escalated"] = len(items)
+            stage = dict(model=judge.model, items=len(items), calls=0, agreement=None)
+            stages.append(stage)
+            if not items:
+                continue
+            stage_scores, stage_res, stage_extra = judge._judge_pairs(
+                [predictions[idx] for idx in items],
+                [references[idx] for idx in items],
+            )
+            stage["calls"] = self._calls(stage_extra)
+            stage["agreement"] = self._agreement(
+                np.array([res[idx] for idx in items]),
+                np.array(stage_res),
+            )
+            for pos, idx in enumerate(items):
+                scores[idx] = stage_scores[pos]
+                res[idx] = stage_res[pos]
+        stages[-1]["escalated"] = 0
+        # items whose final score is from the stage
+        for stage in stages:
+            stage["final"] = stage["items"] - stage["escalated"]
+        return dict(uncertainty_band=self.uncertainty_band, stages=stages)
+
+    @staticmethod
+    def _calls(extra: dict) -> int:
+        # requests to the endpoint, or prompts run through the local model
+        if "requests" in extra:
+            return extra["requests"]["requests"]
+        return extra["local"]["prompts"]
+
+    @staticmethod
+    def _agreement(previous: np.ndarray, current: np.ndarray) -> dict:
+        """
+        Agreement of two judges' scores of the same items:
+        the fraction of same verdicts (score >= 0.5) and the mean absolute
+        score difference, over the items scored by both.
+        """
+        valid = ~(np.isnan(previous) | np.isnan(current))
+        if not valid.any():
+            return dict(items=0, verdicts=None, mean_abs_diff=None)
+        previous, current = previous[valid], current[valid]
+        return dict(
+            items=int(valid.sum()),
+            verdicts=float(np.mean((previous >= 0.5) == (current >= 0.5))),
+            mean_abs_diff=float(np.mean(np.abs(previous - current))),
+        )
+
+    def _engine_extras(self, n_unique: int, unique_scores: List[List[float]]) -> dict:
+        stats = self.engine.stats
+        extra = dict(requests=stats.as_dict())
+        if len(self.engine.endpoints) > 1:
+            extra["endpoints"] = [
+                endpoint.as_dict() for endpoint in self.engine.endpoints
+            ]
+        if self.pairs_per_prompt > 1:
+            extra["batching"] = dict(
+                pairs_per_prompt=self.pairs_per_prompt,
+                invalid=stats.invalid_arrays,
+                rejected=stats.rejected_arrays,
+            )
+        if self.scoring == "logprobs":
+            extra["logprobs"] = dict(
+                judgements=stats.logprob_judgements,
+                fallbacks=stats.logprob_fallbacks,
+            )
+        if self.early_stopping:
+            calls = sum(map(len, unique_scores))
+            extra["early_stopping"] = dict(
+                calls=calls,
+                saved_calls=self.n_tries * n_unique - calls,
+            )
+        if self.engine.cache is not None:
+            extra["cache"] = dict(hits=stats.cache_hits, misses=stats.cache_misses)
+        return extra
+
+    async def _compute_all(self, prompts: List[str]) -> List[List[float]]:
+        # gather keeps the input order
+        return list(
+            await asyncio.gather(
+                *(self._compute_single(prompt, self.n_tries) for prompt in prompts),
+            ),
         )
 
+    async def _compute_batched(
+        self,
+        prompts: List[str],
+        pairs: List[Tuple[str, str]],
+    ) -> List[List[float]]:
+        """
+        `n_tries` judgements of every prompt, with `pairs_per_prompt` pairs
+        per request. Judgements are cached per (single pair) prompt and try,
+        so only the pairs missing from the cache are batched.
+        """
+        scores = [[np.nan] * self.n_tries for _ in prompts]
+        batches = []
+        for try_index in range(self.n_tries):
+            pending = []
+            for idx, prompt in enumerate(prompts):
+                value = self.engine.cached(prompt, try_index)
+                if value is None:
+                    pending.append(idx)
+                else:
+                    scores[idx][try_index] = value
+            batches.extend(
+                (pending[start : start + self.pairs_per_prompt], try_index)
+                for start in range(0, len(pending), self.pairs_per_prompt)
+            )
+        await asyncio.gather(
+            *(
+                self._judge_batch(indices, try_index, prompts, pairs, scores)
+                for indices, try_index in batches
+            ),
+        )
+        return scores
+
+    async def _judge_batch(
+        self,
+        indices: List[int],
+        try_index: int,
+        prompts: List[str],
+        pairs: List[Tuple[str, str]],
+        scores: List[List[float]],
+    ) -> None:
+        items = "\n\n".join(
+            self._batch_item.format(index=pos + 1, prediction=pred, reference=ref)
+            for pos, (pred, ref) in enumerate(pairs[idx] for idx in indices)
+        )
+        verdicts = await self.engine.choice_array(
+            self.batch_prompt.format(n=len(indices), items=items),
+            len(indices),
+        )
+        if verdicts is None:
+            if len(indices) == 1:
+                self.engine.stats.failures += 1
+                verdicts = [np.nan]
+            else:
+                # re-issue the halves of the invalid (or rejected) batch
+                half = len(indices) // 2
+                await asyncio.gather(
+                    self._judge_batch(
+                        indices[:half],
+                        try_index,
+                        prompts,
+                        pairs,
+                        scores,
+                    ),
+                    self._judge_batch(
+                        indices[half:],
+                        try_index,
+                        prompts,
+                        pairs,
+                        scores,
+                    ),
+                )
+                return
+        for idx, verdict in zip(indices, verdicts):
+            scores[idx][try_index] = verdict
+            self.engine.store(prompts[idx], try_index, verdict)
+
     @staticmethod
     def _aggregate_scores(
         scores: List[int],
         aggregation_type: AggregationType = AggregationType.MEAN,
     ) -> float:
+        # failed tries are NaN
+        scores = [score for score in scores if not np.isnan(score)]
         if not scores:
-            return 0.0
+            return np.nan
         res = 0.0
         if aggregation_type in [AggregationType.MEAN, AggregationType.AVERAGE]:
             res = round(sum(scores) / len(scores), 4)
@@ -228,8 +650,31 @@ class LLMAsJudgeMetric(NLPMetric):
             res = float(max(scores))
         return res
 
-    def _compute_single(self, generator, prompt, n_tries) -> List[float]:
-        return [int(generator(prompt)) for n in range(n_tries)]
+    async def _compute_single(self, prompt: str, n_tries: int) -> List[float]:
+        if self.scoring == "logprobs":
+            score = await self.engine.logprob(prompt)
+            if score is not None:
+                return [score]
+        if not self.early_stopping:
+            return await self.engine.choices(prompt, n_tries)
+        # sequential sampling
+        scores = []
+        for idx in range(n_tries):
+            scores.append(await self.engine.choice(prompt, idx))
+            if self._is_decided(scores, n_tries):
+                break
+        return scores
+
+    def _is_decided(self, scores: List[float], n_tries: int) -> bool:
+        """
+        Whether the remaining tries can be skipped (see `early_stopping`).
+        """
+        scores = [score for score in scores if not np.isnan(score)]
+        if self.aggregation_type == AggregationType.MAX:
+            return 1.0 in scores
+        if len(scores) < 2 or len(set(scores)) > 1:
+            return False
+        return (len(scores) + 1) / (n_tries + 1) >= self.early_stopping_confidence
 
 
 def main():
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+    Native SQuAD-style QA metrics (token F1 and exact match) following the
+    official SQuAD v2 evaluation script:
+        - answers are normalized by lower-casing and stripping punctuation,
+          articles and extra whitespace
+        - scores are computed against every reference and max-aggregated per item
+"""
+
+from __future__ import annotations
+
+import re
+import string
+from functools import lru_cache
+from typing import Optional, Tuple
+
+import numpy as np
+
+from ..._base.kernels import TokenOverlap, factorize, token_overlap
+from ..._base.states import MeanState
+from ..._base.structures import (
+    EvaluationInputs,
+    EvaluationPredictionInstance,
+    EvaluationReferenceInstance,
+    MetricResult,
+)
+from ._base import NLPMetric
+
+_ARTICLES = re.compile(r"\b(a|an|the)\b", re.UNICODE)
+_PUNCTUATION_TABLE = str.maketrans("", "", string.punctuation)
+
+
+@lru_cache(maxsize=2**18)
+def normalize_answer(text: str) -> str:
+    """
+    SQuAD answer normalization: lower-case, remove punctuation,
+    articles and extra whitespace.
+    Memoized, so repeated answers/references are normalized only once.
+    """
+    text = text.lower().translate(_PUNCTUATION_TABLE)
+    return " ".join(_ARTICLES.sub(" ", text).split())
+
+
+@lru_cache(maxsize=2**18)
+def answer_tokens(text: str) -> Tuple[str, ...]:
+    return tuple(normalize_answer(text).split())
+
+
+def _as_text(value) -> str:
+    if value is None:
+        return ""
+    return value if isinstance(value, str) else str(value)
+
+
+class SquadStats:
+    """
+    Pair-wise SQuAD scores for all the (prediction, reference) pairs of each item.
+
+    Pairs are built with index-based ragged pairing (no flattened copies of
+    the inputs). Each unique text is tokenized once into shared token ids and
+    each unique pair is scored once. The stats are memoized on the
+    `EvaluationInputs`, so F1 and EM share the same tokens.
+    """
+
+    def __init__(self, inputs: EvaluationInputs) -> None:
+        self.pairs = inputs.pairs
+        self.pools = tuple(list(map(_as_text, pool)) for pool in inputs.pools)
+        self._overlap: Optional[TokenOverlap] = None
+
+    @property
+    def overlap(self) -> TokenOverlap:
+        if self._overlap is None:
+            self._overlap = token_overlap(
+                *self.pools,
+                tokenize=answer_tokens,
+                pred_index=self.pairs.pred_index,
+                ref_index=self.pairs.ref_index,
+            )
+        return self._overlap
+
+    @property
+    def empty_items(self) -> int:
+        """Items without any prediction or reference"""
+        return int((np.diff(self.pairs.pair_offsets) == 0).sum())
+
+    def f1(self) -> np.ndarray:
+        """
+        Pair-wise token F1. If either side has no tokens,
+        F1 is 1 only when both are empty (SQuAD v2 no-answer).
+        """
+        overlap = self.overlap
+        common = overlap.common.astype(np.float64)
+        lp, lr = overlap.pred_length, overlap.ref_length
+        res = np.zeros(len(common))
+        valid = common > 0
+        precision = common[valid] / lp[valid]
+        recall = common[valid] / lr[valid]
+        res[valid] = (2 * precision * recall) / (precision + recall)
+        empty = (lp == 0) | (lr == 0)
+        res[empty] = (lp[empty] == lr[empty]).astype(np.float64)
+        return res
+
+    def exact_match(self) -> np.ndarray:
+        # normalized texts are equal iff their token sequences are equal
+        preds, refs = self.pools
+        codes, _ = factorize(map(answer_tokens, preds + refs))
+        pcodes, rcodes = codes[: len(preds)], codes[len(preds) :]
+        return (pcodes[self.pairs.pred_index] == rcodes[self.pairs.ref_index]).astype(
+            np.float64,
+        )
+
+    def item_scores(self, name: str, reduce_fn: str = "max") -> np.ndarray:
+        """
+        Per-item scores (NaN for items without any pair).
+        """
+        return self.pairs.reduce(getattr(self, name)(), reduce_fn)
+
+
+class _SquadMetric(NLPMetric):
+    _name = None
+
+    def __init__(
+        self,
+        reduce_fn: str = "max",
+        device: str = "cpu",
+        debug: bool = False,
+    ) -> None:
+        """
+        Args:
+            ```reduce_fn```: ```str```
+                How to aggregate scores over multiple references/predictions
+                of an item. One of "max" (SQuAD default), "min" or "mean".
+        """
+        super().__init__(device=device, debug=debug)
+        self.reduce_fn = reduce_fn
+
+    def compute(
+        self,
+        predictions: EvaluationPredictionInstance,
+        references: EvaluationReferenceInstance,
+        **kwargs,
+    ) -> MetricResult:
+        return self.finalize(self.update(self.init_state(), predictions, references))
+
+    def init_state(self) -> MeanState:
+        return MeanState()
+
+    def update(
+        self,
+        state: MeanState,
+        predictions: EvaluationPredictionInstance,
+        references: EvaluationReferenceInstance,
+        **kwargs,
+    ) -> MeanState:
+        inputs = self._normalize_inputs(predictions, references)
+        stats = inputs.memoize("squad.stats", lambda: SquadStats(inputs))
+        chunk = MeanState.from_scores(
+            {self._name: stats.item_scores(self._name, self.reduce_fn)},
+            total_items=len(inputs),
+            empty_items=stats.empty_items,
+        )
+        return state.merge(chunk)
+
+    def finalize(self, state: MeanState) -> MetricResult:
+        return MetricResult.from_dict(
+            dict(
+                metric_name=self.__classname__,
+                score=state.mean(self._name) or 0.0,
+                total_items=state.total_items,
+                empty_items=state.empty_items,
+                reduce_fn=self.reduce_fn,
+            ),
+        )
+
+
+class SquadF1Metric(_SquadMetric):
+    """
+    SQuAD token-level F1 over normalized answers.
+    Multiple references (and predictions) per item are max-aggregated.
+    """
+
+    _name = "f1"
+
+
+class SquadExactMatchMetric(_SquadMetric):
+    """
+    SQuAD exact match over normalized answers.
+    Multiple references (and predictions) per item are max-aggregated.
+    """
+
+    _name = "exact_match"
+
+
+def main():
+    pass
+
+
+if __name__ == "__main__":
+    main()
@@ -1,20 +1,158 @@
 #!/usr/bin/env python3
 
+from __future__ import annotations
 
 import dataclasses
-from typing import Optional
+import math
+from collections import Counter
+from typing import List, Optional, Tuple
 
 import numpy as np
-from jury.metrics import Bartscore
 
+from ..._base.kernels import jury_tokenize
 from ..._base.metrics import JuryBasedMetric
+from ..._base.registry import get_backend_registry
+from ..._base.states import MeanState
 from ..._base.structures import (
+    EvaluationInputs,
     EvaluationPredictionInstance,
     EvaluationReferenceInstance,
     MetricResult,
 )
-from ...misc.utils import format_to_jury
 from ._base import NLPMetric
+from ._onnx import check_runtime
+
+
+def _non_empty_items(inputs: EvaluationInputs) -> Tuple[List[list], List[list]]:
+    """
+    Predictions and references (as list of values per item) of the items
+    that jury doesn't skip as empty.
+    """
+    items = np.flatnonzero(inputs.non_empty)
+    predictions = inputs.predictions.take(items).to_list()
+    references = inputs.references.take(items).to_list()
+    return (
+        [p if isinstance(p, list) else [p] for p in predictions],
+        [r if isinstance(r, list) else [r] for r in references],
+    )
+
+
+def _ngram_counts(tokens: List[str], max_order: int) -> Counter:
+    counts = Counter()
+    for order in range(1, max_order + 1):
+        for i in range(len(tokens) - order + 1):
+            counts[tuple(tokens[i : i + order])] += 1
+    return counts
+
+
+@dataclasses.dataclass(frozen=True)
+class BleuState:
+    """
+    Sufficient statistics of corpus BLEU: n-gram matches and possible
+    matches per order, plus the corpus lengths. Computation is the same
+    as jury's (tensorflow/nmt BLEU over jury's tokenization), including
+    the adjusted lengths used for multiple predictions per item.
+    """
+
+    matches: Tuple[int, ...] = (0, 0, 0, 0)
+    possible: Tuple[int, ...] = (0, 0, 0, 0)
+    translation_length: int = 0
+    reference_length: int = 0
+    adjusted_translation_length: int = 0
+    adjusted_reference_length: int = 0
+    multi_prediction: bool = False
+    total_items: int = 0
+    empty_items: int = 0
+
+    @classmethod
+    def from_tokens(
+        cls,
+        predictions: List[List[List[str]]],
+        references: List[List[List[str]]],
+        max_order: int = 4,
+        **kwargs,
+    ) -> BleuState:
+        matches, possible = [0] * max_order, [0] * max_order
+        tlen = rlen = adjusted_tlen = adjusted_rlen = 0
+        multi_prediction = False
+        for preds, refs in zip(predictions, references):
+            merged = Counter()
+            for ref in refs:
+                merged |= _ngram_counts(ref, max_order)
+            ref_length = min(map(len, refs))
+            for pred in preds:
+                tlen += len(pred)
+                rlen += ref_length
+                overlap = _ngram_counts(pred, max_order) & merged
+                for ngram, count in overlap.items():
+                    matches[len(ngram) - 1] += count
+                for order in range(1, max_order + 1):
+                    possible[order - 1] += max(len(pred) - order + 1, 0)
+            adjusted_tlen += max(map(len, preds))
+            adjusted_rlen += ref_length
+            multi_prediction = multi_prediction or len(preds) > 1
+        return cls(
+            matches=tuple(matches),
+            possible=tuple(possible),
+            translation_length=tlen,
+            reference_length=rlen,
+            adjusted_translation_length=adjusted_tlen,
+            adjusted_reference_length=adjusted_rlen,
+            multi_prediction=multi_prediction,
+            **kwargs,
+        )
+
+    def merge(self, other: BleuState) -> BleuState:
+        return BleuState(
+            matches=tuple(a + b for a, b in zip(self.matches, other.matches)),
+            possible=tuple(a + b for a, b in zip(self.possible, other.possible)),
+            **{
+                f.name: getattr(self, f.name) + getattr(other, f.name)
+                for f in dataclasses.fields(self)
+                if f.name not in ("matches", "possible", "multi_prediction")
+            },
+            multi_prediction=self.multi_prediction or other.multi_prediction,
+        )
+
+    def compute(self, smooth: bool = False) -> dict:
+        max_order = len(self.matches)
+        precisions = []
+        for m, p in zip(self.matches, self.possible):
+            if smooth:
+                precisions.append((m + 1.0) / (p + 1.0))
+            else:
+                precisions.append(m / p if p > 0 else 0.0)
+        geo_mean = 0.0
+        if min(precisions) > 0:
+            geo_mean = math.exp(sum(map(math.log, precisions)) / max_order)
+
+        tlen, rlen = self.translation_length, self.reference_length
+        ratio = tlen / rlen if rlen else 0.0
+        bp = 1.0 if ratio > 1.0 else (math.exp(1 - 1.0 / ratio) if ratio else 0.0)
+        score = dict(
+            score=geo_mean * bp,
+            precisions=precisions,
+            brevity_penalty=bp,
+            length_ratio=ratio,
+            translation_length=tlen,
+            reference_length=rlen,
+        )
+        if not self.multi_prediction:
+            return score
+
+        tlen, rlen = self.adjusted_translation_length, self.adjusted_reference_length
+        adjusted_ratio = tlen / rlen if rlen else 0.0
+        adjusted_bp = 1.0
+        if ratio <= 1.0 and bp > 0:
+            adjusted_bp = math.exp(1 - 1.0 / adjusted_ratio) if adjusted_ratio else 0.0
+            score["score"] = score["score"] * (adjusted_bp / bp)
+        score.update(
+            brevity_penalty=adjusted_bp,
+            length_ratio=adjusted_ratio,
+            translation_length=tlen,
+            reference_length=rlen,
+        )
+        return score
 
 
 class SemanticMetric(NLPMetric):
@@ -44,9 +182,48 @@ class BertScore(JuryBasedMetric, SemanticMetric):
             If enabled, precision, recall and f1 score per instance is also
             returned in the computation result.
             Else: mean precision, recall and f1 is computed by default.
+        ```backend```: ```Optional[str]```
+            Either "jury" or "native".
+            "native" scores the pairs with length-bucketed batching
+            (see `_bertscore.BertScoreEngine`): unique texts are encoded once,
+            sorted by token length, in `max_tokens` budget batches.
+            The padding ratio is reported in `extra["padding_ratio"]`.
+            If None, `get_default_backend()` is used at compute time.
+        ```num_layers```: ```Optional[int]```
+            Which layer's embeddings to use?
+            If None, `bert_score`'s default for the model is used.
+        ```max_tokens```: ```int```
+            Token budget (including padding) per batch for the native backend.
+        ```cache_dir```: ```Optional[str]```
+            Directory of a persistent embedding cache for the native backend
+            (see `evalem._base.embeddings.EmbeddingStore`).
+            Embeddings are looked up before encoding, and the reference
+            embeddings are stored after, so re-evaluating against the same
+            references only encodes the new predictions.
+            If None, nothing is cached.
+        ```cache_max_bytes```: ```Optional[int]```
+            Size limit of the cache (per model/layer) on disk.
+            Least recently used entries are evicted beyond it.
+        ```cache_predictions```: ```bool```
+            Also cache the prediction embeddings? Defaults to False.
+        ```runtime```: ```str```
+            "torch" (default) or "onnx".
+            With "onnx", the model is exported with `optimum` on first use
+            (cached in `onnx_dir`) and run with ONNX Runtime by the native
+            engine (whatever the `backend`).
+        ```quantize```: ```bool```
+            Use dynamic int8 quantization with the "onnx" runtime?
+            Faster on CPU, but scores are approximate.
+        ```onnx_dir```: ```Optional[str]```
+            Where exported models are cached.
+            Defaults to `$EVALEM_ONNX_CACHE` or `~/.cache/evalem/onnx`.
         ```debug```: ```bool```
             Enable debugging log? Defaults to False.
 
+    Note:
+        For multiple references/predictions per item, precision, recall and
+        f1 are max-reduced over the pairs (same as `bert_score`).
+
     Usage:
         .. code-block: python
 
@@ -71,18 +248,113 @@ class BertScore(JuryBasedMetric, SemanticMetric):
                 device="cuda:0"
             )
             result = scorer(predictions=predictions, references=references)
+
+            # length-bucketed batching
+            scorer = BertScore(backend="native", max_tokens=4096)
+
+            # cache the reference embeddings on disk across runs
+            scorer = BertScore(backend="native", cache_dir="~/.cache/evalem/bertscore")
+
+            # ONNX Runtime on CPU
+            scorer = BertScore(runtime="onnx", quantize=True)
     """
 
+    _native_metrics = ("bertscore",)
+
+    @property
+    def execution_hint(self) -> str:
+        # model forward passes release the GIL; models shouldn't be copied to processes
+        return "thread"
+
     def __init__(
         self,
         model_type: str = "bert-base-uncased",
         device: str = "cpu",
         per_instance_score: bool = False,
+        backend: Optional[str] = None,
+        num_layers: Optional[int] = None,
+        max_tokens: int = 8192,
+        cache_dir: Optional[str] = None,
+        cache_max_bytes: Optional[int] = None,
+        cache_predictions: bool = False,
+        runtime: str = "torch",
+        quantize: bool = False,
+        onnx_dir: Optional[str] = None,
         debug: bool = False,
     ) -> None:
-        super().__init__(metrics="bertscore", device=device, debug=debug)
+        super().__init__(
+            metrics="bertscore",
+            device=device,
+            backend=backend,
+            debug=debug,
+        )
         self.model_type = model_type
         self.per_instance_score = per_instance_score
+        self.num_layers = num_layers
+        self.max_tokens = max_tokens
+        self.cache_dir = cache_dir
+        self.cache_max_bytes = cache_max_bytes
+        self.cache_predictions = cache_predictions
+        self.runtime = check_runtime(runtime)
+        self.quantize = quantize
+        self.onnx_dir = onnx_dir
+
+    @property
+    def backend_key(self) -> tuple:
+        # jury caches one bert model per scorer, so every model/device
+        # gets its own scorer to avoid reloading models
+        return ("jury", ("bertscore",), self.model_type, self.device)
+
+    def warm_up(self) -> BertScore:
+        if self._use_native():
+            self._engine(self.model_type, self.device)
+        else:
+            # jury only loads the model on the first computation
+            self.compute(predictions=["warm up"], references=["warm up"])
+        return self
+
+    def _use_native(self, **kwargs) -> bool:
+        # only the native engine runs on ONNX Runtime
+        return self.runtime == "onnx" or super()._use_native(**kwargs)
+
+    def _engine(self, model_type: str, device: str):
+        from ._bertscore import BertScoreEngine
+
+        return get_backend_registry().get(
+            (
+                "bert_score",
+                model_type,
+                self.num_layers,
+                device,
+                self.runtime,
+                self.quantize,
+                self.onnx_dir,
+            ),
+            lambda: BertScoreEngine(
+                model_type=model_type,
+                num_layers=self.num_layers,
+                device=device,
+                runtime=self.runtime,
+                quantize=self.quantize,
+                onnx_dir=self.onnx_dir,
+            ),
+        )
+
+    def _embedding_store(self, engine):
+        if self.cache_dir is None:
+            return None
+        from ..._base.embeddings import EmbeddingStore
+
+        # bert_score's hashcode covers the model, layer and library version
+        return EmbeddingStore(
+            self.cache_dir,
+            namespace=engine.hashcode,
+            max_bytes=self.cache_max_bytes,
+        )
+
+    def fusable(self, inputs: EvaluationInputs, **kwargs) -> bool:
+        # needs its own model/device arguments
+        return False
 
     def compute(
         self,
@@ -92,22 +364,71 @@ class BertScore(JuryBasedMetric, SemanticMetric):
     ) -> MetricResult:
         device = kwargs.pop("device", self.device)
         model_type = kwargs.pop("model_type", self.model_type)
-        result = super().compute(
-            predictions=predictions,
-            references=references,
-            model_type=model_type,
-            device=device,
-            **kwargs,
-        )
+        if self._use_native(**kwargs):
+            inputs = self._normalize_inputs(predictions, references)
+            result = self._to_result(self._compute_bucketed(inputs, model_type, device))
+        else:
+            if self.num_layers is not None:
+                kwargs["num_layers"] = self.num_layers
+            result = super().compute(
+                predictions=predictions,
+                references=references,
+                model_type=model_type,
+                device=device,
+                **kwargs,
+            )
         # if you want to supress a list of all these metrics
         # and want to just have mean/average.
-        if not self.per_instance_score:
+        if not self.per_instance_score and "bertscore" in result.extra:
             for _key in ["precision", "recall", "f1"]:
                 result.extra["bertscore"][_key] = np.mean(
                     result.extra["bertscore"][_key],
                 )
         return result
 
+    def _compute_bucketed(
+        self,
+        inputs: EvaluationInputs,
+        model_type: str,
+        device: str,
+    ) -> dict:
+        """
+        Scores all the (prediction, reference) pairs of the non-empty items
+        with the length-bucketed engine and max-reduces them per item.
+        Output has the same format as jury's.
+        """
+        pairs, valid = inputs.pairs, inputs.non_empty
+        results = dict(total_items=len(inputs), empty_items=int((~valid).sum()))
+        if not valid.any():
+            return results
+        keep = valid[pairs.item_index]
+        predictions, references = (list(map(str, pool)) for pool in inputs.pools)
+        engine = self._engine(model_type, device)
+        output = engine.score(
+            [predictions[idx] for idx in pairs.pred_index[keep]],
+            [references[idx] for idx in pairs.ref_index[keep]],
+            max_tokens=self.max_tokens,
+            store=self._embedding_store(engine),
+            store_predictions=self.cache_predictions,
+        )
+        scores = {}
+        for name in ("precision", "recall", "f1"):
+            pair_scores = np.full(len(keep), np.nan)
+            pair_scores[keep] = getattr(output, name)
+            scores[name] = pairs.reduce(pair_scores, "max")[valid].tolist()
+        results["bertscore"] = dict(
+            score=float(np.mean(scores["f1"])),
+            **scores,
+            hashcode=engine.hashcode,
+        )
+        results["padding_ratio"] = output.padding_ratio
+        if self.cache_dir is not None:
+            results["embedding_cache"] = dict(
+                encoded=output.n_encoded,
+                cached=output.n_cached,
+            )
+        return results
+
 
 class BartScore(JuryBasedMetric, SemanticMetric):
     """
@@ -126,25 +447,113 @@ class BartScore(JuryBasedMetric, SemanticMetric):
             Which device to run the model on? Defaults to "cpu".
         ```max_length```: ```int```
             Max number of tokens in a text. Defaults to 1024.
+        ```batch_size```: ```int```
+            Max number of (prediction, reference) pairs per batch.
+            Pairs are sorted by length before batching. Defaults to 4.
+        ```max_tokens```: ```Optional[int]```
+            Max padded (prediction + reference) tokens per batch.
+            Caps the memory of batches of long texts: the decoder logits
+            alone take `batch x target length x vocab size` floats.
+            Defaults to 4096 (eg: 2 pairs of 1024-token texts per batch).
+            If None, only `batch_size` applies.
+        ```reduce_fn```: ```str```
+            How the scores of the pairs of an item
+            (multiple references/predictions) are reduced:
+            "max" (default), "min" or "mean".
+        ```per_instance_score```: ```bool```
+            If enabled, the score of each item is also returned
+            in `extra["bartscore"]["scores"]`.
+        ```runtime```: ```str```
+            "torch" (default) or "onnx".
+            With "onnx", the model is exported with `optimum` on first use
+            (cached in `onnx_dir`) and run with ONNX Runtime.
+        ```quantize```: ```bool```
+            Use dynamic int8 quantization with the "onnx" runtime?
+            Faster on CPU, but scores are approximate.
+        ```onnx_dir```: ```Optional[str]```
+            Where exported models are cached.
+            Defaults to `$EVALEM_ONNX_CACHE` or `~/.cache/evalem/onnx`.
         ```debug```: ```bool```
             Enable debugging log? Defaults to False.
+
+    Note:
+        The score of a pair is the mean log-likelihood of the reference
+        tokens given the prediction (so it's <= 0, higher is better).
+
+    Usage:
+        .. code-block: python
+
+            from evalem.nlp import BartScore
+
+            scorer = BartScore(device="cpu")
+
+            # multiple references per item, averaged per item
+            scorer = BartScore(reduce_fn="mean", per_instance_score=True)
+
+            # ONNX Runtime on CPU
+            scorer = BartScore(runtime="onnx", quantize=True)
+            result = scorer(predictions=predictions, references=references)
     """
 
+    @property
+    def execution_hint(self) -> str:
+        # model forward passes release the GIL; models shouldn't be copied to processes
+        return "thread"
+
     def __init__(
         self,
         model_checkpoint: str = "bartscore-large-cnn",
         model_weights: Optional[str] = None,
         device: str = "cpu",
         max_length: int = 1024,
+        batch_size: int = 4,
+        max_tokens: Optional[int] = 4096,
+        reduce_fn: str = "max",
+        per_instance_score: bool = False,
+        runtime: str = "torch",
+        quantize: bool = False,
+        onnx_dir: Optional[str] = None,
         debug: bool = False,
     ) -> None:
         super().__init__(metrics=None, device=device, debug=debug)
-        # we use this method to have more flexibility in creating the object
-        self.scorer = Bartscore.construct(
-            device=device,
-            model_checkpoint=model_checkpoint,
-            model_weights=model_weights,
-            max_length=max_length,
+        # the model is loaded on first use (see `backend_key`)
+        self.model_checkpoint = model_checkpoint
+        self.model_weights = model_weights
+        self.max_length = max_length
+        self.batch_size = batch_size
+        self.max_tokens = max_tokens
+        self.reduce_fn = reduce_fn
+        self.per_instance_score = per_instance_score
+        self.runtime = check_runtime(runtime)
+        self.quantize = quantize
+        self.onnx_dir = onnx_dir
+
+    @property
+    def backend_key(self) -> tuple:
+        return (
+            "bartscore",
+            self.model_checkpoint,
+            self.model_weights,
+            self.device,
+            self.max_length,
+            self.runtime,
+            self.quantize,
+            self.onnx_dir,
+        )
+
+    def _build_scorer(self):
+        from ._bartscore import BartScoreEngine
+
+        # jury's bartscore downloads the BARTScore code at runtime and
+        # can't run on ONNX Runtime, so we use our own (same) scoring
+        return BartScoreEngine(
+            model_checkpoint=self.model_checkpoint,
+            model_weights=self.model_weights,
+            device=self.device,
+            max_length=self.max_length,
+            runtime=self.runtime,
+            quantize=self.quantize,
+            onnx_dir=self.onnx_dir,
         )
 
     def compute(
@@ -153,21 +562,35 @@ class BartScore(JuryBasedMetric, SemanticMetric):
         references: EvaluationReferenceInstance,
         **kwargs,
     ) -> MetricResult:
-        predictions = format_to_jury(predictions)
-        references = format_to_jury(references)
-
-        predictions, references = self._flatten_references(predictions, references)
+        inputs = self._normalize_inputs(predictions, references)
+        reduce_fn = kwargs.get("reduce_fn") or self.reduce_fn
+        # every (prediction, reference) pair of an item is scored once
+        pairs = inputs.pairs
+        predictions, references = (list(map(str, pool)) for pool in inputs.pools)
+        output = self.scorer.score(
+            [predictions[idx] for idx in pairs.pred_index],
+            [references[idx] for idx in pairs.ref_index],
+            batch_size=kwargs.get("batch_size", self.batch_size),
+            max_tokens=kwargs.get("max_tokens", self.max_tokens),
+        )
+        scores = pairs.reduce(output.scores, reduce_fn)
+        # items without any prediction/reference
+        valid = ~np.isnan(scores)
 
-        # Low-level access to Bartscorer directly
-        # See: https://github.com/neulab/BARTScore
-        score = np.mean(self.scorer.scorer.score(predictions, references, **kwargs))
+        bartscore = dict(reduce_fn=reduce_fn)
+        if self.per_instance_score:
+            bartscore["scores"] = scores.tolist()
         return MetricResult(
-            score=score,
-            total_items=len(predictions),
+            score=float(scores[valid].mean()) if valid.any() else None,
+            total_items=len(inputs),
+            empty_items=int((~valid).sum()),
             metric_name="BartScore",
             extra=dict(
-                flattened=True,
-                model_checkpoint=self.scorer.model_checkpoint,
+                bartscore=bartscore,
+                model_checkpoint=self.model_checkpoint,
+                runtime=self.runtime,
+                quantized=self.quantize and self.runtime == "onnx",
+                padding_ratio=output.padding_ratio,
             ),
         )
 
@@ -191,8 +614,58 @@ class BleuMetric(JuryBasedMetric, SemanticMetric):
             results = metric(predictions=predictions, references=references)
     """
 
-    def __init__(self) -> None:
-        super().__init__(metrics="bleu")
+    _native_metrics = ("bleu",)
+
+    def __init__(self, backend: Optional[str] = None) -> None:
+        """
+        Args:
+            ```backend```: ```Optional[str]```
+                Either "jury" or "native" (n-gram statistics of `BleuState`).
+                If None, `get_default_backend()` is used at compute time.
+        """
+        super().__init__(metrics="bleu", backend=backend)
+
+    def compute(
+        self,
+        predictions: EvaluationPredictionInstance,
+        references: EvaluationReferenceInstance,
+        **kwargs,
+    ) -> MetricResult:
+        if self._use_native(**kwargs):
+            return self.finalize(
+                self.update(self.init_state(), predictions, references),
+            )
+        return super().compute(predictions=predictions, references=references, **kwargs)
+
+    def init_state(self) -> BleuState:
+        return BleuState()
+
+    def update(
+        self,
+        state: BleuState,
+        predictions: EvaluationPredictionInstance,
+        references: EvaluationReferenceInstance,
+        **kwargs,
+    ) -> BleuState:
+        inputs = self._normalize_inputs(predictions, references)
+        predictions, references = _non_empty_items(inputs)
+        chunk = BleuState.from_tokens(
+            [list(map(jury_tokenize, preds)) for preds in predictions],
+            [list(map(jury_tokenize, refs)) for refs in references],
+            max_order=kwargs.get("max_order", 4),
+            total_items=len(inputs),
+            empty_items=len(inputs) - len(predictions),
+        )
+        return state.merge(chunk)
+
+    def finalize(self, state: BleuState, smooth: bool = False) -> MetricResult:
+        return self._to_result(
+            dict(
+                bleu=state.compute(smooth=smooth),
+                total_items=state.total_items,
+                empty_items=state.empty_items,
+            ),
+        )
 
 
 class SacreBleuMetric(JuryBasedMetric, SemanticMetric):
@@ -243,8 +716,28 @@ class RougeMetric(JuryBasedMetric, SemanticMetric):
 
     """
 
-    def __init__(self) -> None:
-        super().__init__(metrics="rouge")
+    _rouge_types = ("rouge1", "rouge2", "rougeL", "rougeLsum")
+
+    _native_metrics = ("rouge",)
+    # native scores are a plain mean, not jury's bootstrap mid
+    _exact_native = False
+
+    @property
+    def execution_hint(self) -> str:
+        # rouge_score is pure python for both backends
+        return "process"
+
+    def __init__(self, backend: Optional[str] = None) -> None:
+        """
+        Args:
+            ```backend```: ```Optional[str]```
+                Either "jury" or "native" (plain mean of per-item scores
+                instead of jury's bootstrap aggregation).
+                If None, "jury" (the global default backend doesn't apply,
+                since the native scores differ slightly).
+        """
+        super().__init__(metrics="rouge", backend=backend)
+        self._rouge_scorer = None
 
     def compute(
         self,
@@ -252,13 +745,76 @@ class RougeMetric(JuryBasedMetric, SemanticMetric):
         references: EvaluationReferenceInstance,
         **kwargs,
     ) -> MetricResult:
-        result = super().compute(
+        if self._use_native(**kwargs):
+            return self.finalize(
+                self.update(self.init_state(), predictions, references),
+            )
+        return super().compute(
             predictions=predictions,
             references=references,
             **kwargs,
         )
-        score = float(np.mean(list((result.extra or {}).get("rouge", {}).values())))
-        return dataclasses.replace(result, score=score)
+
+    def _to_result(self, results: dict) -> MetricResult:
+        # score is the mean over all the rouge types
+        result = super()._to_result(results)
+        rouge = list((result.extra or {}).get("rouge", {}).values())
+        if not rouge or any(v is None for v in rouge):
+            return result
+        return dataclasses.replace(result, score=float(np.mean(rouge)))
+
+    def init_state(self) -> MeanState:
+        """
+        Streaming state: sums of per-item F-measure for each rouge type.
+        Note:
+            Jury reports the mid of a bootstrap over per-item scores,
+            streaming reports the plain mean (bootstrap's point estimate).
+        """
+        return MeanState()
+
+    def update(
+        self,
+        state: MeanState,
+        predictions: EvaluationPredictionInstance,
+        references: EvaluationReferenceInstance,
+        **kwargs,
+    ) -> MeanState:
+        if self._rouge_scorer is None:
+            from rouge_score.rouge_scorer import RougeScorer
+
+            self._rouge_scorer = RougeScorer(rouge_types=list(self._rouge_types))
+        inputs = self._normalize_inputs(predictions, references)
+        predictions, references = _non_empty_items(inputs)
+
+        scores = np.zeros((len(predictions), len(self._rouge_types)))
+        for idx, (preds, refs) in enumerate(zip(predictions, references)):
+            # max over references, mean over predictions
+            pred_scores = [
+                [
+                    [s[t].fmeasure for t in self._rouge_types]
+                    for s in (
+                        self._rouge_scorer.score(target=ref, prediction=pred)
+                        for ref in refs
+                    )
+                ]
+                for pred in preds
+            ]
+            scores[idx] = np.max(pred_scores, axis=1).mean(axis=0)
+        chunk = MeanState.from_scores(
+            dict(zip(self._rouge_types, scores.T)),
+            total_items=len(inputs),
+            empty_items=len(inputs) - len(predictions),
+        )
+        return state.merge(chunk)
+
+    def finalize(self, state: MeanState) -> MetricResult:
+        return self._to_result(
+            dict(
+                rouge={t: state.mean(t) for t in self._rouge_types},
+                total_items=state.total_items,
+                empty_items=state.empty_items,
+            ),
+        )
 
 
 def main():
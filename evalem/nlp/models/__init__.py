@@ -2,6 +2,7 @@
 from ._base import HFLMWrapper, HFPipelineWrapper
 from .defaults import (
     DefaultQAModelWrapper,
+    HFJudgeWrapper,
     QuestionAnsweringHFPipelineWrapper,
     TextClassificationHFPipelineWrapper,
 )
@@ -4,15 +4,20 @@
 """
 
 
+from __future__ import annotations
+
+from importlib import import_module
 from pathlib import Path
-from typing import Optional, Type, Union
+from typing import TYPE_CHECKING, Optional, Type, Union
 
 from loguru import logger
-from transformers import Pipeline as HF_Pipeline  # noqa
-from transformers import PreTrainedModel, PreTrainedTokenizerBase
 
 from ..._base.models import HFWrapper
 
+if TYPE_CHECKING:
+    from transformers import Pipeline as HF_Pipeline  # noqa
+    from transformers import PreTrainedModel, PreTrainedTokenizerBase
+
 
 class HFLMWrapper(HFWrapper):
     """
@@ -87,14 +92,11 @@ class HFPipelineWrapper(HFWrapper):
 
 
 class HFORTMixin:
-    from optimum.onnxruntime import (
-        ORTModelForQuestionAnswering,
-        ORTModelForSequenceClassification,
-    )
-
+    # task -> ORTModel class name in `optimum.onnxruntime`
+    # (resolved only when a model is loaded, as optimum is a heavy import)
     _mapping = {
-        "question-answering": ORTModelForQuestionAnswering,
-        "text-classification": ORTModelForSequenceClassification,
+        "question-answering": "ORTModelForQuestionAnswering",
+        "text-classification": "ORTModelForSequenceClassification",
     }
 
     @classmethod
@@ -156,7 +158,7 @@ class HFORTMixin:
         if hasattr(cls, "_task"):
             task = cls._task
 
-        model_cls = cls._mapping[task]
+        model_cls = getattr(import_module("optimum.onnxruntime"), cls._mapping[task])
 
         logger.warning(f"ONNX runtime-based model[{model_cls}]")
 
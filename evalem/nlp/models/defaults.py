@@ -1,19 +1,22 @@
 #!/usr/bin/env python3
 
-from typing import Iterable, List, Optional, Union
+from __future__ import annotations
 
-from transformers import pipeline as hf_pipeline
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, List, Optional, Sequence, Union
 
-from ..._base.structures import ClassificationDTO
+import numpy as np
+
+from ..._base.kernels import padding_ratio, token_budget_batches
+from ..._base.structures import ClassificationDTO, EvaluationBatch
 
 # load nlp specific structure dto
 from ..structures import QuestionAnsweringDTO
-from ._base import (
-    HFORTMixin,
-    HFPipelineWrapper,
-    PreTrainedModel,
-    PreTrainedTokenizerBase,
-)
+from ._base import HFLMWrapper, HFORTMixin, HFPipelineWrapper
+
+if TYPE_CHECKING:
+    from transformers import PreTrainedModel, PreTrainedTokenizerBase
 
 
 class QuestionAnsweringHFPipelineWrapper(HFPipelineWrapper, HFORTMixin):
@@ -61,6 +64,8 @@ class QuestionAnsweringHFPipelineWrapper(HFPipelineWrapper, HFORTMixin):
         hf_params: Optional[dict] = None,
         **kwargs,
     ) -> None:
+        from transformers import pipeline as hf_pipeline
+
         self.hf_params = hf_params or {}
         super().__init__(
             pipeline=hf_pipeline(
@@ -77,34 +82,33 @@ class QuestionAnsweringHFPipelineWrapper(HFPipelineWrapper, HFORTMixin):
         self,
         predictions: Union[dict, List[dict]],
         **kwargs,
-    ) -> Iterable[QuestionAnsweringDTO]:
+    ) -> EvaluationBatch:
         """
         This method converts the pipeline's default output format
-        to the iterable of QuestionAnsweringDTO.
+        to a columnar `EvaluationBatch` of QuestionAnsweringDTO.
 
         Args:
             ```predictions```: ```Union[dict, List[dict]]```
                 Predictions provided by the QA pipeline.
 
         Returns:
-            Converted format: ```Iterable[QuestionAnsweringDTO]```
+            Converted format: ```EvaluationBatch```
+            Indexing/iterating over it gives `QuestionAnsweringDTO` objects.
         """
         if isinstance(predictions, dict):
             predictions = [predictions]
 
         # Note: Default model here is guaranteed to have these keys.
-        return list(
-            map(
-                lambda p: QuestionAnsweringDTO(
-                    value=p.get("value", p["answer"]),
-                    score=p["score"],
-                    start=p.get("start"),
-                    end=p.get("end"),
-                    context=p.get("context"),
-                    question=p.get("question"),
-                ),
-                predictions,
+        return EvaluationBatch.from_columns(
+            values=[p.get("value", p["answer"]) for p in predictions],
+            scores=[p["score"] for p in predictions],
+            starts=[p.get("start") for p in predictions],
+            ends=[p.get("end") for p in predictions],
+            columns=dict(
+                context=[p.get("context") for p in predictions],
+                question=[p.get("question") for p in predictions],
             ),
+            dto_cls=QuestionAnsweringDTO,
         )
 
 
@@ -163,6 +167,8 @@ class TextClassificationHFPipelineWrapper(HFPipelineWrapper, HFORTMixin):
         hf_params: Optional[dict] = None,
         **kwargs,
     ) -> None:
+        from transformers import pipeline as hf_pipeline
+
         self.hf_params = hf_params or {}
         super().__init__(
             pipeline=hf_pipeline(
@@ -180,31 +186,203 @@ class TextClassificationHFPipelineWrapper(HFPipelineWrapper, HFORTMixin):
     def _postprocess_predictions(
         self,
         predictions: Union[dict, List[dict]],
-    ) -> Iterable[ClassificationDTO]:
+        **kwargs,
+    ) -> EvaluationBatch:
         """
         This method converts the pipeline's default output format
-        to the iterable of ClassificationDTO.
+        to a columnar `EvaluationBatch` of ClassificationDTO.
 
         Args:
             ```predictions```: ```Union[dict, List[dict]]```
                 Predictions provided by the the classificaton pipeline.
 
         Returns:
-            Converted format: ```Iterable[ClassificationDTO]```
+            Converted format: ```EvaluationBatch```
+            Indexing/iterating over it gives `ClassificationDTO` objects.
         """
         if isinstance(predictions, dict):
             predictions = [predictions]
 
         # Note: Default model here is guaranteed to have these keys.
         # Use label mapping. If mapping doesn't exist, just use the prediction.
-        predictions = map(
-            lambda p: ClassificationDTO(
-                value=self.label_map.get(p["label"], p["label"]),
-                score=p.get("score"),
-            ),
-            predictions,
+        return EvaluationBatch.from_columns(
+            values=[self.label_map.get(p["label"], p["label"]) for p in predictions],
+            scores=[p.get("score") for p in predictions],
+            dto_cls=ClassificationDTO,
         )
-        return list(predictions)
+
+
+@dataclass(frozen=True)
+class HFJudgeOutput:
+    """
+    P("1") of each prompt (in input order) and batching stats.
+    """
+
+    scores: np.ndarray
+    padding_ratio: float
+    n_batches: int
+
+
+class HFJudgeWrapper(HFLMWrapper):
+    """
+    A HFLMWrapper that judges prompts in-process with a causal language model:
+    the score of a prompt is the probability of "1" as the next token,
+    normalized over the "0" and "1" tokens (same as the logprob judgements of
+    `LLMAsJudgeMetric` with an endpoint). Prompts are rendered with the chat
+    template of the tokenizer (if any), sorted by length and run through
+    padded batched forward passes.
+
+    Args:
+        ```model```: ```Union[str, Path, PreTrainedModel]```
+            Causal language model (or its name/path)
+        ```tokenizer```: ```Optional[Union[str, PreTrainedTokenizerBase]]```
+            Which tokenizer to use? Defaults to the one of `model`.
+        ```device```:```str```
+            Which device to run the model on? cpu? gpu? mps?
+        ```batch_size```: ```int```
+            Max number of prompts per forward pass
+        ```num_threads```: ```Optional[int]```
+            Number of CPU threads used by torch during the forward passes.
+            If None, torch's setting is kept.
+        ```max_length```: ```Optional[int]```
+            Max number of tokens of a rendered prompt.
+            Longer prompts are truncated from the left (the answer cue is kept).
+
+    Usage:
+        .. code-block: python
+
+                from evalem.nlp import LLMAsJudgeMetric
+                from evalem.nlp.models import HFJudgeWrapper
+
+                judge = HFJudgeWrapper("Qwen/Qwen2.5-0.5B-Instruct", batch_size=16, num_threads=4)
+                metric = LLMAsJudgeMetric(model=judge)
+                result = metric(predictions=predictions, references=references)
+    """
+
+    _instruction = 'Answer with a single character: "1" or "0".'
+
+    def __init__(
+        self,
+        model: Union[str, Path, PreTrainedModel],
+        tokenizer: Optional[Union[str, PreTrainedTokenizerBase]] = None,
+        device: str = "cpu",
+        batch_size: int = 8,
+        num_threads: Optional[int] = None,
+        max_length: Optional[int] = None,
+        **kwargs,
+    ) -> None:
+        from transformers import AutoModelForCausalLM, AutoTokenizer
+
+        if isinstance(model, (str, Path)):
+            tokenizer = tokenizer or str(model)
+            model = AutoModelForCausalLM.from_pretrained(model)
+        if tokenizer is None:
+            tokenizer = model.config.name_or_path
+        if isinstance(tokenizer, (str, Path)):
+            tokenizer = AutoTokenizer.from_pretrained(tokenizer)
+        super().__init__(model=model.to(device).eval(), tokenizer=tokenizer, **kwargs)
+        if batch_size < 1:
+            raise ValueError(f"Invalid batch_size={batch_size}. Expected >= 1")
+        self.device = device
+        self.batch_size = batch_size
+        self.num_threads = num_threads
+        self.max_length = max_length
+        self.choice_ids = {choice: self._choice_ids(choice) for choice in ("0", "1")}
+
+    @property
+    def name(self) -> str:
+        return self.model.config.name_or_path
+
+    def _choice_ids(self, choice: str) -> List[int]:
+        # eg: "1" and " 1" are different tokens for BPE tokenizers
+        ids = set()
+        for text in (choice, f" {choice}"):
+            token_ids = self.tokenizer.encode(text, add_special_tokens=False)
+            if len(token_ids) == 1:
+                ids.add(token_ids[0])
+        if not ids:
+            raise ValueError(f"{choice!r} isn't a single token of the tokenizer")
+        return sorted(ids)
+
+    def render(self, prompt: str) -> str:
+        if getattr(self.tokenizer, "chat_template", None):
+            return self.tokenizer.apply_chat_template(
+                [
+                    {"role": "system", "content": self._instruction},
+                    {"role": "user", "content": prompt},
+                ],
+                tokenize=False,
+                add_generation_prompt=True,
+            )
+        return f"{self._instruction}\n\n{prompt}\nAnswer:"
+
+    def encode(self, prompts: Sequence[str]) -> List[List[int]]:
+        if not prompts:
+            return []
+        token_ids = self.tokenizer(
+            [self.render(prompt) for prompt in prompts],
+            # the chat template has the special tokens
+            add_special_tokens=not getattr(self.tokenizer, "chat_template", None),
+        )["input_ids"]
+        if self.max_length is not None:
+            token_ids = [ids[-self.max_length :] for ids in token_ids]
+        return token_ids
+
+    def judge_batch(self, token_ids: Sequence[List[int]]) -> np.ndarray:
+        """
+        P("1") of the next token of each (token ids) prompt.
+        """
+        import torch
+
+        # right padding: the next token is read at the last real position
+        lengths = torch.tensor([len(ids) for ids in token_ids])
+        pad_token_id = self.tokenizer.pad_token_id or 0
+        input_ids = torch.full((len(token_ids), int(lengths.max())), pad_token_id)
+        attention_mask = torch.zeros_like(input_ids)
+        for row, ids in enumerate(token_ids):
+            input_ids[row, : len(ids)] = torch.tensor(ids)
+            attention_mask[row, : len(ids)] = 1
+        with torch.no_grad():
+            logits = self.model(
+                input_ids=input_ids.to(self.device),
+                attention_mask=attention_mask.to(self.device),
+            ).logits
+        logits = logits[torch.arange(len(token_ids)), lengths.to(logits.device) - 1]
+        probs = torch.softmax(logits.float(), dim=-1)
+        p0 = probs[:, self.choice_ids["0"]].sum(dim=-1)
+        p1 = probs[:, self.choice_ids["1"]].sum(dim=-1)
+        return (p1 / (p0 + p1)).cpu().numpy()
+
+    def judge(self, prompts: Sequence[str]) -> HFJudgeOutput:
+        """
+        Judges prompts in length-sorted batches of `batch_size`.
+        """
+        import torch
+
+        token_ids = self.encode(prompts)
+        lengths = np.array([len(ids) for ids in token_ids], dtype=np.int64)
+        batches = token_budget_batches(
+            lengths,
+            max_tokens=max(int(lengths.max(initial=0)) * self.batch_size, 1),
+            max_batch_size=self.batch_size,
+        )
+        scores = np.zeros(len(token_ids))
+        num_threads = torch.get_num_threads()
+        if self.num_threads is not None:
+            torch.set_num_threads(self.num_threads)
+        try:
+            for batch in batches:
+                scores[batch] = self.judge_batch([token_ids[idx] for idx in batch])
+        finally:
+            torch.set_num_threads(num_threads)
+        return HFJudgeOutput(
+            scores=scores,
+            padding_ratio=padding_ratio(lengths, batches),
+            n_batches=len(batches),
+        )
+
+    def _predict(self, inputs: Sequence[str], **kwargs) -> np.ndarray:
+        return self.judge(inputs).scores
 
 
 def main():
@@ -0,0 +1,112 @@
+# flake8: noqa
+#!/usr/bin/env python3
+
+import random
+
+import pytest
+
+from evalem._base.evaluators import Evaluator
+from evalem._base.metrics import (
+    AccuracyMetric,
+    F1Metric,
+    JuryBasedMetric,
+    PrecisionMetric,
+    RecallMetric,
+    compute_fused,
+)
+from evalem._base.structures import EvaluationInputs
+from evalem.nlp.metrics import ExactMatchMetric, RougeMetric
+
+_WORDS = "the a cat dog sat on mat hello world paris tower".split()
+
+
+def _text(rng):
+    return " ".join(rng.choices(_WORDS, k=rng.randint(0, 6)))
+
+
+@pytest.fixture(scope="module")
+def single():
+    rng = random.Random(0)
+    return [_text(rng) for _ in range(100)], [_text(rng) for _ in range(100)]
+
+
+@pytest.fixture(scope="module")
+def multi():
+    rng = random.Random(1)
+    predictions = [_text(rng) for _ in range(100)]
+    references = [[_text(rng) for _ in range(rng.randint(1, 3))] for _ in range(100)]
+    return predictions, references
+
+
+def _metrics():
+    return [
+        AccuracyMetric(backend="jury"),
+        F1Metric(backend="jury"),
+        PrecisionMetric(backend="jury"),
+        RecallMetric(backend="jury"),
+        RougeMetric(backend="jury"),
+    ]
+
+
+@pytest.mark.parametrize("data", ["single", "multi"])
+def test_fused_matches_individual(data, request):
+    predictions, references = request.getfixturevalue(data)
+    fused = Evaluator(metrics=_metrics())(predictions, references)
+    individual = Evaluator(metrics=_metrics(), fuse_jury=False)(predictions, references)
+    assert [r.metric_name for r in fused] == [r.metric_name for r in individual]
+    for res, exp in zip(fused, individual):
+        assert res.score == pytest.approx(exp.score)
+        assert res.total_items == exp.total_items
+        assert res.empty_items == exp.empty_items
+        assert res.extra.keys() == exp.extra.keys()
+
+
+def test_compute_fused_splits_results(single):
+    f1, rouge = compute_fused([F1Metric(), RougeMetric(backend="jury")], *single)
+    assert f1.metric_name == "F1Metric" and set(f1.extra) == {"f1"}
+    assert rouge.metric_name == "RougeMetric" and set(rouge.extra) == {"rouge"}
+
+
+def test_fused_metrics_dont_load_scorers(single):
+    metrics = _metrics()
+    Evaluator(metrics=metrics)(*single)
+    assert all(metric._scorer is None for metric in metrics)
+
+
+def test_fusable(single, multi):
+    assert F1Metric(backend="jury").fusable(EvaluationInputs.from_instances(*single))
+    assert not F1Metric(backend="native").fusable(
+        EvaluationInputs.from_instances(*single),
+    )
+    exact_match = ExactMatchMetric(backend="jury")
+    assert exact_match.fusable(EvaluationInputs.from_instances(*single))
+    assert not exact_match.fusable(EvaluationInputs.from_instances(*multi))
+
+    metric = F1Metric(backend="jury")
+    metric.scorer = metric.scorer
+    assert not metric.fusable(EvaluationInputs.from_instances(*single))
+
+
+def test_mixed_fused_and_native_order(single):
+    metrics = [
+        AccuracyMetric(backend="native"),
+        F1Metric(backend="jury"),
+        RecallMetric(backend="native"),
+        PrecisionMetric(backend="jury"),
+    ]
+    results = Evaluator(metrics=metrics)(*single)
+    assert [r.metric_name for r in results] == [
+        "AccuracyMetric",
+        "F1Metric",
+        "RecallMetric",
+        "PrecisionMetric",
+    ]
+
+
+def test_fusion_failure_falls_back(single):
+    metrics = [F1Metric(backend="jury"), JuryBasedMetric(metrics="not_a_metric")]
+    with pytest.raises(Exception):
+        Evaluator(metrics=metrics)(*single)
+    results = Evaluator(metrics=metrics, executor="thread")(*single)
+    assert results[0].score is not None
+    assert results[1].score is None and "error" in results[1].extra
@@ -0,0 +1,62 @@
+# flake8: noqa
+#!/usr/bin/env python3
+
+import pytest
+
+from evalem._base.evaluators import Evaluator
+from evalem._base.metrics import (
+    AccuracyMetric,
+    ConfusionMatrix,
+    F1Metric,
+    PrecisionMetric,
+    RecallMetric,
+)
+from evalem._base.structures import EvaluationInputs, EvaluationMode
+
+from ..metrics.fixtures import predictions, references
+
+
+@pytest.fixture(autouse=True, scope="module")
+def evaluator():
+    return Evaluator(
+        metrics=[
+            AccuracyMetric(),
+            F1Metric(),
+            PrecisionMetric(),
+            RecallMetric(),
+            ConfusionMatrix(),
+        ],
+    )
+
+
+def test_normalization_runs_once_per_call(evaluator, predictions, references):
+    before = EvaluationInputs.normalization_count
+    results = evaluator(predictions=predictions, references=references)
+    assert len(results) == len(evaluator.metrics)
+    assert EvaluationInputs.normalization_count - before == 1
+
+
+def test_results_match_standalone_metrics(evaluator, predictions, references):
+    results = evaluator(predictions=predictions, references=references)
+    for metric, result in zip(evaluator.metrics[:-1], results):
+        expected = metric(predictions=predictions, references=references)
+        assert result.score == expected.score
+
+
+@pytest.mark.parametrize(
+    "preds, refs, mode",
+    [
+        (["a", "b"], ["a", "b"], EvaluationMode.SRSP),
+        (["a", "b"], [["a", "c"], ["b"]], EvaluationMode.MRSP),
+        ([["a", "c"], ["b"]], ["a", "b"], EvaluationMode.SRMP),
+        ([["a", "c"], ["b"]], [["a"], ["b", "d"]], EvaluationMode.MRMP),
+    ],
+)
+def test_mode_detection(preds, refs, mode):
+    inputs = EvaluationInputs.from_instances(preds, refs)
+    assert inputs.mode == mode
+    assert inputs.flattened.mode in (EvaluationMode.SRSP, EvaluationMode.MRMP)
+    # resolving the normalized batches again hits the cache
+    assert (
+        EvaluationInputs.from_instances(inputs.predictions, inputs.references) is inputs
+    )
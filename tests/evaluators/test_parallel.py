@@ -0,0 +1,135 @@
+# flake8: noqa
+#!/usr/bin/env python3
+
+import random
+
+import pytest
+
+from evalem._base.evaluators import Evaluator
+from evalem._base.metrics import (
+    AccuracyMetric,
+    ConfusionMatrix,
+    F1Metric,
+    Metric,
+    PrecisionMetric,
+)
+from evalem.nlp.metrics import BleuMetric, ExactMatchMetric, RougeMetric, SquadF1Metric
+
+_WORDS = "the a cat dog sat on mat hello world paris tower".split()
+
+
+class FailingMetric(Metric):
+    def compute(self, predictions, references, **kwargs):
+        raise RuntimeError("boom")
+
+
+class TypeErrorMetric(Metric):
+    """
+    Raises TypeError, and records every call in a file.
+    """
+
+    def __init__(self, path):
+        super().__init__()
+        self.path = path
+
+    def compute(self, predictions, references, **kwargs):
+        with open(self.path, "a") as f:
+            f.write("call\n")
+        raise TypeError("genuine error")
+
+
+class UnpicklableMetric(AccuracyMetric):
+    def __init__(self):
+        super().__init__(backend="native")
+        self.callback = lambda x: x
+
+
+def _metrics():
+    return [
+        AccuracyMetric(backend="native"),
+        F1Metric(backend="native"),
+        PrecisionMetric(backend="native"),
+        ExactMatchMetric(backend="native"),
+        SquadF1Metric(),
+        BleuMetric(backend="native"),
+        RougeMetric(backend="native"),
+        ConfusionMatrix(),
+    ]
+
+
+@pytest.fixture(scope="module")
+def data():
+    rng = random.Random(0)
+
+    def text():
+        return " ".join(rng.choices(_WORDS, k=rng.randint(1, 6)))
+
+    return [text() for _ in range(200)], [text() for _ in range(200)]
+
+
+@pytest.fixture(scope="module")
+def serial_results(data):
+    return Evaluator(metrics=_metrics())(*data)
+
+
+def _assert_same(results, expected):
+    assert [r.metric_name for r in results] == [r.metric_name for r in expected]
+    for result, exp in zip(results, expected):
+        assert result.score == pytest.approx(exp.score)
+
+
+def test_serial_is_default():
+    assert Evaluator(metrics=_metrics()).executor == "serial"
+
+
+def test_invalid_executor():
+    with pytest.raises(ValueError):
+        Evaluator(metrics=_metrics(), executor="gpu")
+
+
+@pytest.mark.parametrize("executor", ["thread", "process", "auto"])
+def test_concurrent_matches_serial(executor, data, serial_results):
+    results = Evaluator(metrics=_metrics(), executor=executor, max_workers=3)(*data)
+    _assert_same(results, serial_results)
+
+
+def test_execution_hint():
+    assert AccuracyMetric(backend="native").execution_hint == "thread"
+    assert RougeMetric(backend="native").execution_hint == "process"
+
+
+@pytest.mark.parametrize("executor", ["thread", "process"])
+def test_errors_are_captured_per_metric(executor, data):
+    metrics = [AccuracyMetric(backend="native"), FailingMetric(), SquadF1Metric()]
+    results = Evaluator(metrics=metrics, executor=executor)(*data)
+    assert [r.metric_name for r in results][::2] == [
+        "AccuracyMetric",
+        "SquadF1Metric",
+    ]
+    assert results[1].score is None
+    assert "boom" in results[1].extra["error"]
+    assert results[0].score is not None and results[2].score is not None
+
+
+def test_serial_raises(data):
+    with pytest.raises(RuntimeError):
+        Evaluator(metrics=[FailingMetric()])(*data)
+
+
+def test_unpicklable_metric_falls_back(data, serial_results):
+    results = Evaluator(metrics=[UnpicklableMetric()], executor="process")(*data)
+    assert results[0].score == pytest.approx(serial_results[0].score)
+    assert "error" not in results[0].extra
+
+
+@pytest.mark.parametrize("executor", ["thread", "process"])
+def test_metric_errors_are_not_retried(executor, data, tmp_path):
+    path = tmp_path / "calls.txt"
+    results = Evaluator(metrics=[TypeErrorMetric(str(path))], executor=executor)(*data)
+    assert path.read_text().count("call") == 1
+    assert "genuine error" in results[0].extra["error"]
+
+
+def test_positional_debug():
+    evaluator = Evaluator(_metrics(), True)
+    assert evaluator.debug and evaluator.executor == "serial"
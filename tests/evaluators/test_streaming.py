@@ -0,0 +1,187 @@
+# flake8: noqa
+#!/usr/bin/env python3
+
+import collections
+import math
+import random
+
+import numpy as np
+import pytest
+
+from evalem._base.evaluators import Evaluator, iter_chunks
+from evalem._base.metrics import (
+    AccuracyMetric,
+    ConfusionMatrix,
+    F1Metric,
+    Metric,
+    PrecisionMetric,
+    RecallMetric,
+)
+from evalem._base.structures import MetricResult
+from evalem.nlp.metrics import (
+    BleuMetric,
+    ExactMatchMetric,
+    RougeMetric,
+    SquadExactMatchMetric,
+    SquadF1Metric,
+)
+
+_WORDS = "the a cat dog sat on mat hello world paris tower".split()
+
+
+def _text(rng, max_words=6):
+    return " ".join(rng.choices(_WORDS, k=rng.randint(0, max_words)))
+
+
+@pytest.fixture(scope="module")
+def single():
+    rng = random.Random(0)
+    return [_text(rng) for _ in range(300)], [_text(rng) for _ in range(300)]
+
+
+@pytest.fixture(scope="module")
+def multi():
+    rng = random.Random(1)
+    predictions = [_text(rng) for _ in range(300)]
+    references = [[_text(rng) for _ in range(rng.randint(1, 4))] for _ in range(300)]
+    return predictions, references
+
+
+STREAMING_METRICS = [
+    lambda: AccuracyMetric(backend="native"),
+    lambda: PrecisionMetric(backend="native"),
+    lambda: RecallMetric(backend="native"),
+    lambda: F1Metric(backend="native"),
+    lambda: ExactMatchMetric(backend="native"),
+    lambda: SquadF1Metric(),
+    lambda: SquadExactMatchMetric(),
+    lambda: BleuMetric(backend="native"),
+    lambda: RougeMetric(backend="native"),
+]
+
+
+def _assert_same(result, expected):
+    assert result.metric_name == expected.metric_name
+    assert result.total_items == expected.total_items
+    assert result.empty_items == expected.empty_items
+    assert result.score == pytest.approx(expected.score)
+
+
+@pytest.mark.parametrize("data", ["single", "multi"])
+@pytest.mark.parametrize("metric_fn", STREAMING_METRICS)
+def test_chunked_matches_full(metric_fn, data, request):
+    predictions, references = request.getfixturevalue(data)
+    metric = metric_fn()
+    assert metric.supports_streaming
+    expected = metric(predictions, references)
+
+    state = metric.init_state()
+    for preds, refs in iter_chunks(predictions, references, chunk_size=64):
+        state = metric.update(state, preds, refs)
+    _assert_same(metric.finalize(state), expected)
+
+
+@pytest.mark.parametrize("metric_fn", STREAMING_METRICS)
+def test_merge_shards(metric_fn, multi):
+    predictions, references = multi
+    metric = metric_fn()
+    a = metric.update(metric.init_state(), predictions[:100], references[:100])
+    b = metric.update(metric.init_state(), predictions[100:], references[100:])
+    _assert_same(metric.finalize(metric.merge(a, b)), metric(predictions, references))
+
+
+def test_streaming_confusion_matrix():
+    rng = np.random.default_rng(0)
+    labels = ["neg", "neu", "pos"]
+    references = rng.choice(labels, 500).tolist()
+    predictions = rng.choice(labels, 500).tolist()
+    metric = ConfusionMatrix()
+    state = metric.init_state()
+    for preds, refs in iter_chunks(predictions, references, chunk_size=70):
+        state = metric.update(state, preds, refs)
+    result = metric.finalize(state)
+    expected = metric(predictions, references)
+    np.testing.assert_array_equal(
+        result.extra["confusion_matrix"],
+        expected.extra["confusion_matrix"],
+    )
+    assert result.extra["report"] == expected.extra["report"]
+
+
+def _nmt_bleu(references, translations, max_order=4):
+    # reference implementation from tensorflow/nmt (used by jury)
+    def ngrams(segment):
+        counts = collections.Counter()
+        for order in range(1, max_order + 1):
+            for i in range(0, len(segment) - order + 1):
+                counts[tuple(segment[i : i + order])] += 1
+        return counts
+
+    matches, possible = [0] * max_order, [0] * max_order
+    reference_length = translation_length = 0
+    for refs, translation in zip(references, translations):
+        reference_length += min(len(r) for r in refs)
+        translation_length += len(translation)
+        merged = collections.Counter()
+        for ref in refs:
+            merged |= ngrams(ref)
+        overlap = ngrams(translation) & merged
+        for ngram in overlap:
+            matches[len(ngram) - 1] += overlap[ngram]
+        for order in range(1, max_order + 1):
+            if len(translation) - order + 1 > 0:
+                possible[order - 1] += len(translation) - order + 1
+    precisions = [m / p if p > 0 else 0.0 for m, p in zip(matches, possible)]
+    geo_mean = 0
+    if min(precisions) > 0:
+        geo_mean = math.exp(sum(math.log(p) for p in precisions) / max_order)
+    ratio = translation_length / reference_length
+    bp = 1.0 if ratio > 1.0 else math.exp(1 - 1.0 / ratio)
+    return geo_mean * bp
+
+
+def test_native_bleu_matches_nmt():
+    predictions = ["the cat sat on the mat", "hello world , again", "a b c d e f"]
+    references = [
+        ["the cat is on the mat", "a cat sat"],
+        ["hello world"],
+        ["a b c d e"],
+    ]
+    result = BleuMetric(backend="native")(predictions, references)
+    tokenize = lambda text: text.replace(",", " ").lower().split()
+    expected = _nmt_bleu(
+        [list(map(tokenize, refs)) for refs in references],
+        list(map(tokenize, predictions)),
+    )
+    assert result.score == pytest.approx(expected)
+    assert set(result.extra["bleu"]) >= {"precisions", "brevity_penalty"}
+
+
+class _CountingMetric(Metric):
+    """Non-streaming metric: number of items"""
+
+    def compute(self, predictions, references, **kwargs):
+        inputs = self._normalize_inputs(predictions, references)
+        return MetricResult(
+            score=float(len(inputs)),
+            total_items=len(inputs),
+            metric_name="CountingMetric",
+        )
+
+
+def test_evaluate_stream(multi):
+    predictions, references = multi
+    evaluator = Evaluator(
+        metrics=[SquadF1Metric(), F1Metric(backend="native"), _CountingMetric()],
+    )
+    assert not evaluator.metrics[-1].supports_streaming
+    results = evaluator.evaluate_stream(iter_chunks(predictions, references, 50))
+    expected = evaluator(predictions, references)
+    assert len(results) == len(expected)
+    for result, exp in zip(results, expected):
+        _assert_same(result, exp)
+
+
+def test_iter_chunks_mismatched_length():
+    with pytest.raises(ValueError):
+        list(iter_chunks([1, 2], [1], 1))
@@ -1,6 +1,7 @@
 # flake8: noqa
 #!/usr/bin/env python3
 
+import json
 from typing import List
 
 import pytest
@@ -16,6 +17,109 @@ def predictions() -> List[str]:
     return ["A", "B", "C", "D", "B"]
 
 
+_WORDS = "the a cat dog sat on mat hello world paris tower is in of and".split()
+
+
+@pytest.fixture(scope="session")
+def tiny_bert(tmp_path_factory) -> str:
+    """
+    Path to a tiny randomly initialized BERT model (and its tokenizer),
+    so that model-based metrics can be tested offline.
+    """
+    torch = pytest.importorskip("torch")
+    transformers = pytest.importorskip("transformers")
+
+    path = tmp_path_factory.mktemp("tiny-bert")
+    vocab = path / "vocab.txt"
+    vocab.write_text(
+        "\n".join(["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]"] + _WORDS),
+    )
+    torch.manual_seed(0)
+    config = transformers.BertConfig(
+        vocab_size=5 + len(_WORDS),
+        hidden_size=32,
+        num_hidden_layers=2,
+        num_attention_heads=2,
+        intermediate_size=37,
+        max_position_embeddings=512,
+    )
+    transformers.BertModel(config).save_pretrained(path)
+    transformers.BertTokenizer(
+        str(vocab),
+        model_max_length=512,
+    ).save_pretrained(path)
+    return str(path)
+
+
+@pytest.fixture(scope="session")
+def tiny_bart(tmp_path_factory) -> str:
+    """
+    Path to a tiny randomly initialized BART model with a byte-level
+    tokenizer (no merges), so that BartScore can be tested offline.
+    """
+    torch = pytest.importorskip("torch")
+    transformers = pytest.importorskip("transformers")
+    from transformers.models.gpt2.tokenization_gpt2 import bytes_to_unicode
+
+    path = tmp_path_factory.mktemp("tiny-bart")
+    tokens = ["<s>", "<pad>", "</s>", "<unk>"] + list(bytes_to_unicode().values())
+    tokens.append("<mask>")
+    (path / "vocab.json").write_text(
+        json.dumps({token: idx for idx, token in enumerate(tokens)}),
+    )
+    (path / "merges.txt").write_text("#version: 0.2\n")
+    torch.manual_seed(0)
+    config = transformers.BartConfig(
+        vocab_size=len(tokens),
+        d_model=32,
+        encoder_layers=2,
+        decoder_layers=2,
+        encoder_attention_heads=2,
+        decoder_attention_heads=2,
+        encoder_ffn_dim=37,
+        decoder_ffn_dim=37,
+        max_position_embeddings=1024,
+    )
+    transformers.BartForConditionalGeneration(config).save_pretrained(path)
+    transformers.BartTokenizer(
+        str(path / "vocab.json"),
+        str(path / "merges.txt"),
+    ).save_pretrained(path)
+    return str(path)
+
+
+@pytest.fixture(scope="session")
+def tiny_gpt2(tmp_path_factory) -> str:
+    """
+    Path to a tiny randomly initialized GPT-2 model with a byte-level
+    tokenizer (no merges), so that local judges can be tested offline.
+    """
+    torch = pytest.importorskip("torch")
+    transformers = pytest.importorskip("transformers")
+    from transformers.models.gpt2.tokenization_gpt2 import bytes_to_unicode
+
+    path = tmp_path_factory.mktemp("tiny-gpt2")
+    tokens = list(bytes_to_unicode().values()) + ["<|endoftext|>"]
+    (path / "vocab.json").write_text(
+        json.dumps({token: idx for idx, token in enumerate(tokens)}),
+    )
+    (path / "merges.txt").write_text("#version: 0.2\n")
+    torch.manual_seed(0)
+    config = transformers.GPT2Config(
+        vocab_size=len(tokens),
+        n_embd=32,
+        n_layer=2,
+        n_head=2,
+        n_positions=1024,
+    )
+    transformers.GPT2LMHeadModel(config).save_pretrained(path)
+    transformers.GPT2Tokenizer(
+        str(path / "vocab.json"),
+        str(path / "merges.txt"),
+    ).save_pretrained(path)
+    return str(path)
+
+
 def main():
     pass
 
@@ -0,0 +1,219 @@
+# flake8: noqa
+#!/usr/bin/env python3
+"""
+    Local stub of an OpenAI-compatible chat completions endpoint,
+    to test/benchmark LLM judges without a real model.
+"""
+
+import json
+import math
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Union
+
+
+def exact_match_judge(prompt: str) -> str:
+    """
+    "1" if the prediction and reference of a (default) judge prompt match.
+    """
+    prediction = re.search(r"Prediction: (.*)", prompt).group(1)
+    reference = re.search(r"Reference: (.*)", prompt).group(1)
+    return "1" if prediction.strip().lower() == reference.strip().lower() else "0"
+
+
+def batch_items(prompt: str) -> List[str]:
+    """
+    Single pair prompts ("Prediction: ...\nReference: ...") of a batch prompt.
+    """
+    return [
+        f"Prediction: {prediction}\nReference: {reference}"
+        for prediction, reference in re.findall(
+            r"Prediction: (.*)\nReference: (.*)",
+            prompt,
+        )
+    ]
+
+
+class StubOpenAIServer:
+    """
+    Args:
+        ```judge```: ```Callable[[str], str]```
+            Verdict ("0"/"1") of a prompt
+        ```delay```: ```Union[float, Callable[[str], float]]```
+            Latency (seconds) of every request (or of a prompt)
+        ```fail_first```: ```int```
+            Number of first requests answered with `fail_status`
+        ```fail_status```: ```int```
+            HTTP status of the failed requests
+        ```reject```: ```Optional[Callable[[str], bool]]```
+            Prompts answered with a 400 (eg: longer than the context)
+        ```batch_judge```: ```Optional[Callable[[List[str]], List[str]]]```
+            Verdicts of the pairs of a batch prompt (requests of a "results"
+            array). If None, `judge` is applied to each pair.
+        ```logprobs```: ```Optional[Callable[[str], Dict[str, float]]]```
+            Probabilities of the first answer tokens (eg: {"1": 0.9, "0": 0.1})
+            of a prompt, returned as top logprobs when requested.
+            If None, logprobs aren't supported (`"logprobs": null`).
+
+    Usage:
+        .. code-block: python
+
+            with StubOpenAIServer() as server:
+                metric = LLMAsJudgeMetric(model="stub", api_base=server.api_base)
+    """
+
+    def __init__(
+        self,
+        judge: Callable[[str], str] = exact_match_judge,
+        delay: Union[float, Callable[[str], float]] = 0.0,
+        fail_first: int = 0,
+        fail_status: int = 500,
+        reject: Optional[Callable[[str], bool]] = None,
+        batch_judge: Optional[Callable[[List[str]], List[str]]] = None,
+        logprobs: Optional[Callable[[str], Dict[str, float]]] = None,
+    ) -> None:
+        self.judge = judge
+        self.delay = delay
+        self.fail_first = fail_first
+        self.fail_status = fail_status
+        self.reject = reject
+        self.batch_judge = batch_judge
+        self.logprobs = logprobs
+        self.requests = 0
+        self.health_checks = 0
+        self.connections = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.prompts: List[str] = []
+        self.request_times: List[float] = []
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    @property
+    def api_base(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def completion(self, payload: dict) -> dict:
+        prompt = payload["messages"][-1]["content"]
+        schema = (
+            payload.get("response_format", {}).get("json_schema", {}).get("schema", {})
+        )
+        if "results" in schema.get("properties", {}):
+            items = batch_items(prompt)
+            verdicts = (
+                self.batch_judge(items)
+                if self.batch_judge is not None
+                else [self.judge(item) for item in items]
+            )
+            content = json.dumps({"results": verdicts})
+        else:
+            content = json.dumps({"result": self.judge(prompt)})
+        logprobs = None
+        if payload.get("logprobs") and self.logprobs is not None:
+            probs = sorted(self.logprobs(prompt).items(), key=lambda kv: -kv[1])
+            top = [
+                {"token": token, "logprob": math.log(p)}
+                for token, p in probs[: payload.get("top_logprobs", 1)]
+            ]
+            content = top[0]["token"]
+            logprobs = {"content": [dict(top[0], top_logprobs=top)]}
+        return {
+            "id": "stub",
+            "object": "chat.completion",
+            "model": payload.get("model"),
+            "choices": [
+                {
+                    "index": 0,
+                    "message": {"role": "assistant", "content": content},
+                    "logprobs": logprobs,
+                    "finish_reason": "stop",
+                },
+            ],
+            "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+        }
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            # keep-alive connections
+            protocol_version = "HTTP/1.1"
+
+            def setup(self):
+                super().setup()
+                with stub._lock:
+                    stub.connections += 1
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status: int, body: dict) -> None:
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                # health checks (`/v1/models`)
+                with stub._lock:
+                    stub.health_checks += 1
+                self._send(
+                    200,
+                    {"object": "list", "data": [{"id": "stub", "object": "model"}]},
+                )
+
+            def do_POST(self):
+                payload = json.loads(
+                    self.rfile.read(int(self.headers["Content-Length"])),
+                )
+                with stub._lock:
+                    stub.requests += 1
+                    fail = stub.requests <= stub.fail_first
+                    stub.in_flight += 1
+                    stub.max_in_flight = max(stub.max_in_flight, stub.in_flight)
+                    stub.request_times.append(time.monotonic())
+                prompt = payload["messages"][-1]["content"]
+                try:
+                    time.sleep(
+                        stub.delay(prompt) if callable(stub.delay) else stub.delay,
+                    )
+                    if fail:
+                        self._send(
+                            stub.fail_status,
+                            {"error": {"message": "stub failure"}},
+                        )
+                        return
+                    if stub.reject is not None and stub.reject(prompt):
+                        self._send(400, {"error": {"message": "stub rejection"}})
+                        return
+                    with stub._lock:
+                        stub.prompts.append(prompt)
+                    self._send(200, stub.completion(payload))
+                finally:
+                    with stub._lock:
+                        stub.in_flight -= 1
+
+        return Handler
+
+    def __enter__(self) -> "StubOpenAIServer":
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *args) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def main():
+    pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+# flake8: noqa
+#!/usr/bin/env python3
+
+import random
+
+import numpy as np
+import pytest
+
+from evalem.nlp.metrics import BartScore
+
+from .fixtures import _WORDS, tiny_bart
+
+torch = pytest.importorskip("torch")
+
+
+def _text(rng, max_words):
+    return " ".join(rng.choices(_WORDS, k=rng.randint(1, max_words)))
+
+
+@pytest.fixture(scope="module")
+def mixed():
+    rng = random.Random(0)
+    predictions = [_text(rng, rng.choice([3, 60])) for _ in range(12)]
+    references = [_text(rng, rng.choice([3, 60])) for _ in range(12)]
+    return predictions, references
+
+
+def _reference_scores(path, predictions, references, max_length=1024):
+    # one pair at a time, as BARTScore's loss with `labels=...`
+    from transformers import AutoModelForSeq2SeqLM, AutoTokenizer
+
+    tokenizer = AutoTokenizer.from_pretrained(path)
+    model = AutoModelForSeq2SeqLM.from_pretrained(path).eval()
+    scores = []
+    for pred, ref in zip(predictions, references):
+        src = tokenizer(
+            pred,
+            max_length=max_length,
+            truncation=True,
+            return_tensors="pt",
+        )
+        tgt = tokenizer(
+            ref,
+            max_length=max_length,
+            truncation=True,
+            return_tensors="pt",
+        )
+        with torch.no_grad():
+            scores.append(-float(model(**src, labels=tgt["input_ids"]).loss))
+    return np.array(scores)
+
+
+@pytest.mark.parametrize("batch_size,max_tokens", [(1, None), (4, 4096), (16, 64)])
+def test_matches_reference(tiny_bart, mixed, batch_size, max_tokens):
+    metric = BartScore(
+        model_checkpoint=tiny_bart,
+        batch_size=batch_size,
+        max_tokens=max_tokens,
+        per_instance_score=True,
+    )
+    result = metric(*mixed)
+    expected = _reference_scores(tiny_bart, *mixed)
+    np.testing.assert_allclose(result.extra["bartscore"]["scores"], expected, atol=1e-5)
+    assert result.score == pytest.approx(expected.mean(), abs=1e-5)
+    assert result.total_items == len(expected)
+
+
+@pytest.mark.parametrize("reduce_fn", ["max", "mean"])
+def test_multi_reference(tiny_bart, mixed, reduce_fn):
+    predictions, references = mixed
+    multi = [[ref, pred[::-1]] for pred, ref in zip(predictions, references)]
+    metric = BartScore(
+        model_checkpoint=tiny_bart,
+        reduce_fn=reduce_fn,
+        per_instance_score=True,
+    )
+    result = metric(predictions, multi)
+    pair_scores = np.stack(
+        [
+            _reference_scores(tiny_bart, predictions, [refs[idx] for refs in multi])
+            for idx in range(2)
+        ],
+        axis=1,
+    )
+    expected = getattr(np, reduce_fn)(pair_scores, axis=1)
+    np.testing.assert_allclose(result.extra["bartscore"]["scores"], expected, atol=1e-5)
+    assert result.extra["bartscore"]["reduce_fn"] == reduce_fn
+
+
+def test_memory_cap(tiny_bart):
+    from evalem.nlp.metrics._bartscore import BartScoreEngine
+
+    engine = BartScoreEngine(tiny_bart, max_length=128)
+    long_text = " ".join(["paris tower"] * 200)
+    sources, targets = [long_text, "a cat"] * 4, [long_text, "the dog"] * 4
+    output = engine.score(sources, targets, batch_size=8, max_tokens=300)
+    # long pairs (2 x 128 tokens) don't share batches
+    assert output.n_batches >= 5
+    assert len(engine.encode([long_text])[0]) == 128
+    np.testing.assert_allclose(
+        output.scores,
+        engine.score(sources, targets, batch_size=1).scores,
+        atol=1e-5,
+    )
+
+
+def test_empty_inputs(tiny_bart):
+    metric = BartScore(model_checkpoint=tiny_bart)
+    result = metric(predictions=[], references=[])
+    assert result.score is None and result.total_items == 0
@@ -2,6 +2,7 @@
 #!/usr/bin/env python3
 
 import numpy as np
+import pytest
 
 from evalem._base.metrics import (
     AccuracyMetric,
@@ -10,6 +11,8 @@ from evalem._base.metrics import (
     PrecisionMetric,
     RecallMetric,
 )
+from evalem._base.structures import ReferenceDTO
+from evalem.nlp.metrics import ExactMatchMetric, LLMAsJudgeMetric
 
 from ._base import BaseMetricTest, predictions, references
 
@@ -35,3 +38,42 @@ class TestConfusionMatrix(BaseMetricTest):
 
     def test_metric_score(self, metric_result):
         assert isinstance(metric_result.extra["confusion_matrix"], np.ndarray)
+
+
+@pytest.mark.parametrize(
+    "preds, refs",
+    [
+        # multiple predictions, multiple references
+        ([["a", "b"], ["c"]], [["a"], ["c", "d"]]),
+        # multiple predictions, ReferenceDTO references
+        ([["a", "b"], ["c"]], [ReferenceDTO("a"), ReferenceDTO("c")]),
+        # int labels
+        ([1, 0, 1], [1, 1, 0]),
+    ],
+)
+def test_flatten_instances_type_checks(preds, refs):
+    # `isinstance(..., PredictionInstance)` raised TypeError on these
+    predictions, references = ExactMatchMetric()._flatten_instances(preds, refs)
+    assert list(predictions) == preds and list(references) == refs
+    metric = LLMAsJudgeMetric(model="stub", api_base="http://localhost")
+    predictions, references = metric._flatten_instances(preds, refs)
+    assert list(predictions) == preds and list(references) == refs
+
+
+def test_flatten_single_prediction_multi_reference():
+    predictions, references = ExactMatchMetric()._flatten_instances(
+        ["a", np.zeros(2)],
+        [["a", "b"], ["c"]],
+    )
+    assert list(references) == ["a", "b", "c"]
+    assert predictions[:2] == ("a", "a")
+
+
+def test_flatten_tensor_prediction():
+    torch = pytest.importorskip("torch")
+
+    predictions, references = ExactMatchMetric()._flatten_instances(
+        [torch.zeros(2)],
+        [["a", "b"]],
+    )
+    assert list(references) == ["a", "b"]
@@ -0,0 +1,127 @@
+# flake8: noqa
+#!/usr/bin/env python3
+
+import random
+
+import numpy as np
+import pytest
+
+from evalem._base.kernels import padding_ratio, token_budget_batches
+from evalem.nlp.metrics import BertScore
+
+from .fixtures import _WORDS, tiny_bert
+
+bert_score = pytest.importorskip("bert_score")
+
+
+def _text(rng, max_words):
+    return " ".join(rng.choices(_WORDS, k=rng.randint(1, max_words)))
+
+
+@pytest.fixture(scope="module")
+def mixed():
+    # short answers mixed with long passages
+    rng = random.Random(0)
+    predictions = [_text(rng, rng.choice([3, 120])) for _ in range(40)]
+    references = [_text(rng, rng.choice([3, 120])) for _ in range(40)]
+    return predictions, references
+
+
+def test_token_budget_batches():
+    lengths = [5, 1, 3, 10, 2, 2, 7, 30]
+    batches = token_budget_batches(lengths, max_tokens=10)
+    assert sorted(np.concatenate(batches).tolist()) == list(range(len(lengths)))
+    for batch in batches:
+        assert len(batch) == 1 or len(batch) * max(lengths[i] for i in batch) <= 10
+    assert [len(b) for b in token_budget_batches(lengths, 100, max_batch_size=3)] == [
+        3,
+        3,
+        2,
+    ]
+    with pytest.raises(ValueError):
+        token_budget_batches(lengths, 0)
+
+
+def test_padding_ratio():
+    assert padding_ratio([2, 2], [np.array([0, 1])]) == 0
+    assert padding_ratio([1, 3], [np.array([0, 1])]) == pytest.approx(1 / 3)
+    assert padding_ratio([], []) == 0
+
+
+def test_native_matches_bert_score(tiny_bert, mixed):
+    predictions, references = mixed
+    metric = BertScore(
+        model_type=tiny_bert,
+        num_layers=2,
+        backend="native",
+        per_instance_score=True,
+        max_tokens=512,
+    )
+    result = metric(predictions=predictions, references=references)
+    P, R, F = bert_score.BERTScorer(model_type=tiny_bert, num_layers=2).score(
+        predictions,
+        references,
+    )
+    np.testing.assert_allclose(result.extra["bertscore"]["precision"], P, atol=1e-5)
+    np.testing.assert_allclose(result.extra["bertscore"]["recall"], R, atol=1e-5)
+    np.testing.assert_allclose(result.extra["bertscore"]["f1"], F, atol=1e-5)
+    assert result.score == pytest.approx(float(F.mean()), abs=1e-5)
+    assert 0 <= result.extra["padding_ratio"] < 0.5
+
+
+def test_native_multi_reference(tiny_bert, mixed):
+    predictions, references = mixed
+    references = [[ref, pred] for pred, ref in zip(predictions, references)]
+    metric = BertScore(model_type=tiny_bert, num_layers=2, backend="native")
+    result = metric(predictions=predictions, references=references)
+    _, _, F = bert_score.BERTScorer(model_type=tiny_bert, num_layers=2).score(
+        predictions,
+        references,
+    )
+    assert result.score == pytest.approx(float(F.mean()), abs=1e-5)
+
+
+def test_native_budget_doesnt_change_scores(tiny_bert, mixed):
+    scores = [
+        BertScore(
+            model_type=tiny_bert,
+            num_layers=2,
+            backend="native",
+            max_tokens=max_tokens,
+        )(*mixed).score
+        for max_tokens in (64, 1024, 100000)
+    ]
+    assert scores == pytest.approx([scores[0]] * 3, abs=1e-5)
+
+
+def test_native_empty_items(tiny_bert):
+    metric = BertScore(model_type=tiny_bert, num_layers=2, backend="native")
+    result = metric(predictions=["the cat", "", "a dog"], references=["cat", "x", ""])
+    assert (result.total_items, result.empty_items) == (3, 2)
+    result = metric(predictions=[""], references=["cat"])
+    assert result.score is None
+
+
+def test_native_embedding_cache(tiny_bert, mixed, tmp_path):
+    predictions, references = mixed
+    kwargs = dict(
+        model_type=tiny_bert,
+        num_layers=2,
+        backend="native",
+        per_instance_score=True,
+        cache_dir=str(tmp_path),
+    )
+    first = BertScore(**kwargs)(predictions, references)
+    assert first.extra["embedding_cache"]["cached"] == 0
+
+    # a new metric (eg: a later run) only encodes the predictions
+    second = BertScore(**kwargs)(predictions, references)
+    assert second.extra["embedding_cache"]["cached"] == len(set(references))
+    assert second.extra["embedding_cache"]["encoded"] == len(
+        set(predictions) - set(references),
+    )
+    np.testing.assert_allclose(
+        second.extra["bertscore"]["f1"],
+        first.extra["bertscore"]["f1"],
+        atol=1e-6,
+    )
@@ -0,0 +1,112 @@
+# flake8: noqa
+#!/usr/bin/env python3
+
+import numpy as np
+import pytest
+from sklearn.metrics import confusion_matrix, precision_recall_fscore_support
+
+from evalem._base.kernels import ClassificationStats, ConfusionAccumulator
+from evalem._base.metrics import ConfusionMatrix, F1Metric, PrecisionMetric
+from evalem._base.structures import EvaluationInputs
+
+LABELS = ["NEGATIVE", "NEUTRAL", "POSITIVE", "LABEL_3"]
+
+
+@pytest.fixture(scope="module")
+def labels():
+    rng = np.random.default_rng(42)
+    references = rng.choice(LABELS, size=500).tolist()
+    predictions = rng.choice(LABELS[:3], size=500).tolist()
+    return predictions, references
+
+
+@pytest.mark.metrics
+class TestClassificationStats:
+    def test_confusion_matrix(self, labels):
+        predictions, references = labels
+        stats = ClassificationStats.from_labels(references, predictions)
+        assert stats.labels == sorted(LABELS)
+        expected = confusion_matrix(references, predictions, labels=stats.labels)
+        np.testing.assert_array_equal(stats.matrix, expected)
+        assert stats.support.tolist() == [references.count(l) for l in stats.labels]
+
+    @pytest.mark.parametrize("average", ["micro", "macro", "weighted"])
+    def test_averages(self, labels, average):
+        predictions, references = labels
+        stats = ClassificationStats.from_labels(references, predictions)
+        precision, recall, f1, _ = precision_recall_fscore_support(
+            references,
+            predictions,
+            labels=stats.labels,
+            average=average,
+            zero_division=0,
+        )
+        assert stats.precision(average) == pytest.approx(precision)
+        assert stats.recall(average) == pytest.approx(recall)
+        assert stats.f1(average) == pytest.approx(f1)
+
+    def test_invalid_average(self, labels):
+        stats = ClassificationStats.from_labels(*labels)
+        with pytest.raises(ValueError):
+            stats.precision("samples")
+
+
+@pytest.mark.metrics
+def test_metrics_share_confusion(labels):
+    predictions, references = labels
+    inputs = EvaluationInputs.from_instances(predictions, references)
+
+    result = ConfusionMatrix()(inputs.predictions, inputs.references)
+    f1 = F1Metric(backend="native")(inputs.predictions, inputs.references)
+    assert "native.confusion" in inputs.cache
+    assert result.extra["report"]["accuracy"] == pytest.approx(f1.score)
+    assert set(result.extra["report"]["per_class"]) == set(LABELS)
+
+
+@pytest.mark.metrics
+@pytest.mark.parametrize("metric_cls", [PrecisionMetric, F1Metric])
+def test_label_path_matches_jury(labels, metric_cls):
+    predictions, references = labels
+    expected = metric_cls(backend="jury")(predictions, references)
+    result = metric_cls(backend="native")(predictions, references)
+    assert result.score == expected.score
+    assert result.extra == expected.extra
+
+
+@pytest.mark.metrics
+class TestSparseConfusion:
+    def test_sparse_matches_dense(self, labels):
+        predictions, references = labels
+        dense = ClassificationStats.from_labels(references, predictions)
+        sparse = ClassificationStats.from_labels(
+            references,
+            predictions,
+            sparse_threshold=2,
+        )
+        assert sparse.is_sparse and not dense.is_sparse
+        np.testing.assert_array_equal(sparse.matrix.toarray(), dense.matrix)
+        assert sparse.report() == dense.report()
+
+    def test_incremental_accumulation(self, labels):
+        predictions, references = labels
+        acc = ConfusionAccumulator(sparse_threshold=0, chunk_size=64)
+        other = ConfusionAccumulator()
+        for start in range(0, 250, 50):
+            acc.update(references[start : start + 50], predictions[start : start + 50])
+        other.update(references[250:], predictions[250:])
+        stats = acc.merge(other).finalize()
+        expected = ClassificationStats.from_labels(references, predictions)
+        assert stats.labels == expected.labels
+        np.testing.assert_array_equal(stats.matrix.toarray(), expected.matrix)
+
+    def test_metric_switches_to_sparse(self):
+        references = [f"label_{i}" for i in range(300)]
+        predictions = references[1:] + references[:1]
+        result = ConfusionMatrix(sparse_threshold=100)(predictions, references)
+        matrix = result.extra["confusion_matrix"]
+        assert not isinstance(matrix, np.ndarray)
+        assert matrix.shape == (300, 300) and matrix.nnz == 300
+        assert result.extra["report"]["accuracy"] == 0
+
+        result = ConfusionMatrix(sparse_threshold=1000)(predictions, references)
+        assert isinstance(result.extra["confusion_matrix"], np.ndarray)
@@ -0,0 +1,59 @@
+# flake8: noqa
+#!/usr/bin/env python3
+
+import numpy as np
+import pytest
+
+from evalem._base.embeddings import EmbeddingStore, text_key
+
+
+def _embedding(n, dim=4, value=1.0):
+    return np.full((n, dim), value, dtype=np.float32), np.ones(n, dtype=np.float32)
+
+
+def test_roundtrip(tmp_path):
+    store = EmbeddingStore(tmp_path, namespace="model_L2")
+    store.put_many(
+        {text_key("a"): _embedding(3), text_key("b"): _embedding(1, value=2)},
+    )
+    hits = store.get_many([text_key("a"), text_key("b"), text_key("c")])
+    assert set(hits) == {text_key("a"), text_key("b")}
+    embeddings, idf = hits[text_key("b")]
+    assert embeddings.shape == (1, 4) and idf.shape == (1,)
+    assert np.all(embeddings == 2)
+    assert len(store) == 2
+
+
+def test_persistence_and_namespaces(tmp_path):
+    EmbeddingStore(tmp_path, namespace="model_L2").put_many({"k": _embedding(2)})
+    assert "k" in EmbeddingStore(tmp_path, namespace="model_L2").get_many(["k"])
+    assert not EmbeddingStore(tmp_path, namespace="model_L3").get_many(["k"])
+
+
+def test_put_skips_existing_keys(tmp_path):
+    store = EmbeddingStore(tmp_path, namespace="m")
+    store.put_many({"k": _embedding(2)})
+    nbytes = store.nbytes
+    store.put_many({"k": _embedding(2)})
+    assert store.nbytes == nbytes
+
+
+def test_eviction(tmp_path):
+    store = EmbeddingStore(tmp_path, namespace="m")
+    store.put_many({"old": _embedding(100)})
+    store.put_many({"new": _embedding(100)})
+    store.max_bytes = store.nbytes - 1
+    store.evict()
+    assert "old" not in store.get_many(["old"]) and "new" in store.get_many(["new"])
+    assert store.nbytes <= store.max_bytes
+
+
+def test_reader_survives_eviction(tmp_path):
+    reader = EmbeddingStore(tmp_path, namespace="m")
+    writer = EmbeddingStore(tmp_path, namespace="m")
+    writer.put_many({"k": _embedding(2)})
+    embeddings, _ = reader.get_many(["k"])["k"]
+    writer.clear()
+    # mapped arrays stay readable, new lookups are misses
+    assert embeddings.shape == (2, 4)
+    assert reader.get_many(["k"]) == {}
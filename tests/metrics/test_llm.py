@@ -0,0 +1,529 @@
+# flake8: noqa
+#!/usr/bin/env python3
+
+import random
+import time
+
+import numpy as np
+import pytest
+
+from evalem.nlp.metrics import LLMAsJudgeMetric
+from evalem.nlp.metrics._judge import TokenBucket
+
+from .fixtures import tiny_gpt2
+from .stub_openai import StubOpenAIServer
+
+pytest.importorskip("httpx")
+
+
+@pytest.fixture
+def data():
+    references = [f"title {i}" for i in range(40)]
+    # every third prediction is wrong
+    predictions = [ref if i % 3 else f"wrong {i}" for i, ref in enumerate(references)]
+    return predictions, references
+
+
+def _metric(server, **kwargs):
+    metric = LLMAsJudgeMetric(model="stub", api_base=server.api_base, **kwargs)
+    # fast retries
+    metric.engine.backoff = 0.01
+    return metric
+
+
+def test_results_in_input_order(data):
+    predictions, references = data
+    # random latency, so responses come back out of order
+    with StubOpenAIServer(delay=lambda prompt: random.uniform(0, 0.02)) as server:
+        result = _metric(server, n_tries=2, max_concurrency=8)(predictions, references)
+    expected = [float(p == r) for p, r in zip(predictions, references)]
+    assert [scores[0] for scores in result.extra["scores"]] == expected
+    assert result.score == pytest.approx(np.mean(expected))
+    assert result.extra["requests"]["requests"] == 2 * len(predictions)
+    assert server.requests == 2 * len(predictions)
+
+
+def test_concurrency(data):
+    predictions, references = data
+    with StubOpenAIServer(delay=0.05) as server:
+        start = time.monotonic()
+        _metric(server, max_concurrency=10)(predictions, references)
+        elapsed = time.monotonic() - start
+    assert server.max_in_flight <= 10
+    # serially, it would take 40 x 0.05s
+    assert elapsed < 1.5
+
+
+def test_connection_reuse(data):
+    with StubOpenAIServer() as server:
+        _metric(server, max_concurrency=4)(*data)
+    assert server.requests == 40
+    assert server.connections <= 4
+
+
+@pytest.mark.parametrize("status", [429, 500, 503])
+def test_retries(data, status):
+    with StubOpenAIServer(fail_first=5, fail_status=status) as server:
+        result = _metric(server, max_concurrency=1)(*data)
+    assert result.extra["requests"]["retries"] == 5
+    assert result.extra["requests"]["failures"] == 0
+    assert not np.isnan(result.extra["scores"]).any()
+
+
+def test_failed_requests_are_ignored(data):
+    predictions, references = data
+    with StubOpenAIServer(fail_first=3) as server:
+        result = _metric(server, max_concurrency=1, max_retries=0)(
+            predictions,
+            references,
+        )
+    assert result.extra["requests"]["failures"] == 3
+    assert np.isnan(result.extra["scores"][:3]).all()
+    expected = [float(p == r) for p, r in zip(predictions, references)][3:]
+    assert result.score == pytest.approx(np.mean(expected))
+
+
+def test_rejected_requests_are_ignored(data):
+    predictions, references = data[0][:20], data[1][:20]
+    with StubOpenAIServer(fail_first=1, fail_status=400) as server:
+        result = _metric(server, max_concurrency=1)(predictions, references)
+    # not retried
+    assert server.requests == 20
+    assert result.extra["requests"]["retries"] == 0
+    assert result.extra["requests"]["failures"] == 1
+    assert np.isnan(result.extra["scores"]).sum() == 1
+    assert np.isfinite(result.score)
+
+
+def test_rate_limit(data):
+    predictions, references = data
+    with StubOpenAIServer() as server:
+        metric = _metric(server, requests_per_second=50, max_concurrency=8)
+        metric.engine.burst = 1
+        start = time.monotonic()
+        metric(predictions[:20], references[:20])
+        assert time.monotonic() - start >= 19 / 50 * 0.9
+    with pytest.raises(ValueError):
+        TokenBucket(rate=0)
+
+
+def test_persistent_cache(data, tmp_path):
+    predictions, references = data
+    path = tmp_path / "judge.sqlite"
+    with StubOpenAIServer() as server:
+        first = _metric(server, n_tries=2, cache=path)(predictions, references)
+        assert first.extra["cache"] == dict(hits=0, misses=80)
+
+        # eg: a re-run after a crash, with a few new items
+        second = _metric(server, n_tries=2, cache=path)(
+            predictions + ["new"],
+            references + ["new"],
+        )
+    assert second.extra["cache"] == dict(hits=80, misses=2)
+    assert server.requests == 82
+    assert second.extra["scores"][:-1] == first.extra["scores"]
+
+
+def test_cache_ttl_and_eviction(tmp_path):
+    from evalem.nlp.metrics._judge_cache import JudgeCache, cache_key
+
+    keys = [cache_key("m", "url", 0.0, "prompt", idx) for idx in range(3)]
+    assert len(set(keys)) == 3
+
+    cache = JudgeCache(tmp_path / "judge.sqlite", max_entries=2)
+    for key in keys:
+        cache.put(key, 1.0)
+    # last used ones are kept
+    cache.get(keys[0])
+    assert cache.evict() == 1
+    assert cache.get(keys[0]) == 1.0 and cache.get(keys[1]) is None
+
+    cache = JudgeCache(tmp_path / "judge.sqlite", ttl=0.05)
+    assert cache.get(keys[0]) == 1.0
+    time.sleep(0.1)
+    assert cache.get(keys[0]) is None
+    assert cache.evict() == 2 and len(cache) == 0
+
+
+def test_prompt_dedup():
+    references = ["yes", "no", "yes", "yes", "title"]
+    predictions = ["yes", "yes", "yes", "yes", "title"]
+    with StubOpenAIServer() as server:
+        result = _metric(server, n_tries=3)(predictions, references)
+    # ("yes", "yes"), ("yes", "no") and ("title", "title")
+    assert server.requests == 3 * 3
+    assert len(set(server.prompts)) == 3
+    assert result.extra["dedup_ratio"] == pytest.approx(1 - 3 / 5)
+    assert result.extra["scores"] == [
+        [1.0] * 3,
+        [0.0] * 3,
+        [1.0] * 3,
+        [1.0] * 3,
+        [1.0] * 3,
+    ]
+    assert result.score == pytest.approx(4 / 5)
+
+
+class _SequenceJudge:
+    """
+    Matching items get the verdicts "0", "1", "0", ... over their tries.
+    """
+
+    def __init__(self):
+        self.calls = {}
+
+    def __call__(self, prompt: str) -> str:
+        from .stub_openai import exact_match_judge
+
+        n = self.calls[prompt] = self.calls.get(prompt, -1) + 1
+        return "0" if exact_match_judge(prompt) == "0" else "01"[n % 2]
+
+
+def test_early_stopping_max(data):
+    from evalem.nlp.metrics.llm import AggregationType
+
+    kwargs = dict(n_tries=5, aggregation_type=AggregationType.MAX)
+    with StubOpenAIServer(judge=_SequenceJudge()) as server:
+        full = _metric(server, **kwargs)(*data)
+    with StubOpenAIServer(judge=_SequenceJudge()) as server:
+        early = _metric(server, early_stopping=True, **kwargs)(*data)
+    assert early.score == full.score
+    assert [max(s) for s in early.extra["scores"]] == [
+        max(s) for s in full.extra["scores"]
+    ]
+    # matching items stop at their second try
+    n_matching = sum(p == r for p, r in zip(*data))
+    assert early.extra["early_stopping"]["saved_calls"] == 3 * n_matching
+    assert server.requests == 5 * 40 - 3 * n_matching
+
+
+@pytest.mark.parametrize("confidence,tries", [(0.6, 3), (1.0, 5)])
+def test_early_stopping_mean(data, confidence, tries):
+    with StubOpenAIServer() as server:
+        result = _metric(
+            server,
+            n_tries=5,
+            early_stopping=True,
+            early_stopping_confidence=confidence,
+        )(*data)
+    # unanimous judge: (k + 1) / 6 >= 0.6 after 3 tries
+    assert all(len(scores) == tries for scores in result.extra["scores"])
+    assert result.extra["early_stopping"]["saved_calls"] == (5 - tries) * 40
+    expected = [float(p == r) for p, r in zip(*data)]
+    assert result.score == pytest.approx(np.mean(expected))
+
+
+def _match_logprobs(prompt: str) -> dict:
+    from .stub_openai import exact_match_judge
+
+    return (
+        {"1": 0.9, "0": 0.1}
+        if exact_match_judge(prompt) == "1"
+        else {"0": 0.8, "1": 0.2}
+    )
+
+
+def test_logprob_scoring(data, tmp_path):
+    predictions, references = data
+    path = tmp_path / "judge.sqlite"
+    with StubOpenAIServer(logprobs=_match_logprobs) as server:
+        result = _metric(server, n_tries=5, scoring="logprobs", cache=path)(*data)
+        # single call per prompt
+        assert server.requests == len(predictions)
+        expected = [0.9 if p == r else 0.2 for p, r in zip(predictions, references)]
+        assert [s[0] for s in result.extra["scores"]] == pytest.approx(expected)
+        assert result.score == pytest.approx(np.mean(expected))
+        assert result.extra["logprobs"] == dict(judgements=40, fallbacks=0)
+
+        cached = _metric(server, scoring="logprobs", cache=path)(*data)
+    assert server.requests == len(predictions)
+    assert cached.extra["cache"] == dict(hits=40, misses=0)
+    assert cached.extra["scores"] == result.extra["scores"]
+
+
+def test_logprob_fallback_to_sampling(data):
+    predictions, references = data
+    # no logprobs support
+    with StubOpenAIServer() as server:
+        result = _metric(server, n_tries=2, scoring="logprobs")(
+            predictions,
+            references,
+        )
+    expected = [float(p == r) for p, r in zip(predictions, references)]
+    assert [s[0] for s in result.extra["scores"]] == expected
+    # a single logprobs request, then sampling
+    assert server.requests == 1 + 2 * len(predictions)
+    assert result.extra["logprobs"] == dict(judgements=0, fallbacks=40)
+    with pytest.raises(ValueError):
+        LLMAsJudgeMetric(model="stub", api_base="http://localhost", scoring="unknown")
+
+
+def test_logprob_rejected_request(data):
+    predictions, references = data
+    with StubOpenAIServer(
+        logprobs=_match_logprobs,
+        reject=lambda prompt: "title 5\n" in prompt,
+    ) as server:
+        result = _metric(server, scoring="logprobs", max_concurrency=1)(*data)
+    # only the rejected item fails, logprobs are still used for the others
+    assert server.requests == len(predictions)
+    assert result.extra["requests"]["failures"] == 1
+    scores = [s[0] for s in result.extra["scores"]]
+    assert np.isnan(scores[5])
+    expected = [0.9 if p == r else 0.2 for p, r in zip(predictions, references)]
+    assert scores[:5] + scores[6:] == pytest.approx(expected[:5] + expected[6:])
+    assert result.extra["logprobs"] == dict(judgements=40, fallbacks=0)
+
+
+def test_logprob_rejected_probe(data):
+    predictions, references = data
+    # eg: 400 for endpoints that don't support the logprobs parameters
+    with StubOpenAIServer(fail_first=1, fail_status=400) as server:
+        result = _metric(server, scoring="logprobs")(*data)
+    assert server.requests == 1 + len(predictions)
+    assert result.extra["logprobs"] == dict(judgements=0, fallbacks=40)
+    assert not np.isnan(result.extra["scores"]).any()
+
+
+@pytest.mark.parametrize("pairs_per_prompt", [4, 7])
+def test_batched_prompts(data, pairs_per_prompt):
+    predictions, references = data
+    with StubOpenAIServer() as server:
+        batched = _metric(server, n_tries=2, pairs_per_prompt=pairs_per_prompt)(*data)
+    # ceil(40 / K) requests per try
+    assert server.requests == 2 * -(-40 // pairs_per_prompt)
+    expected = [[float(p == r)] * 2 for p, r in zip(predictions, references)]
+    assert batched.extra["scores"] == expected
+    assert batched.extra["batching"] == dict(
+        pairs_per_prompt=pairs_per_prompt,
+        invalid=0,
+        rejected=0,
+    )
+
+
+def test_batched_prompts_reissue_invalid_batches(data, tmp_path):
+    from .stub_openai import exact_match_judge
+
+    def drop_last(items):
+        # invalid array (wrong length) for batches with "title 5"
+        verdicts = [exact_match_judge(item) for item in items]
+        if len(items) > 1 and any("title 5\n" in item for item in items):
+            verdicts.pop()
+        return verdicts
+
+    predictions, references = data
+    path = tmp_path / "judge.sqlite"
+    with StubOpenAIServer(batch_judge=drop_last) as server:
+        result = _metric(server, pairs_per_prompt=8, cache=path)(*data)
+        # 5 batches, then 8 -> 4 -> 2 -> 1 for the invalid one
+        assert server.requests == 5 + 2 + 2 + 2
+        assert result.extra["batching"]["invalid"] == 3
+        expected = [float(p == r) for p, r in zip(predictions, references)]
+        assert [s[0] for s in result.extra["scores"]] == expected
+
+        # single pair judgements are cached: only the new pair is requested
+        cached = _metric(server, pairs_per_prompt=8, cache=path)(
+            predictions + ["new"],
+            references + ["new"],
+        )
+    assert server.requests == 11 + 1
+    assert cached.extra["cache"] == dict(hits=40, misses=1)
+    with pytest.raises(ValueError):
+        LLMAsJudgeMetric(
+            model="stub",
+            api_base="http://localhost",
+            pairs_per_prompt=4,
+            scoring="logprobs",
+        )
+
+
+def test_batched_prompts_split_rejected_batches(data):
+    from .stub_openai import batch_items
+
+    predictions, references = data
+    # 400 for prompts with more than 2 pairs (eg: longer than the context)
+    with StubOpenAIServer(reject=lambda prompt: len(batch_items(prompt)) > 2) as server:
+        result = _metric(server, pairs_per_prompt=8)(*data)
+    # 5 batches of 8 -> 10 of 4 -> 20 of 2
+    assert server.requests == 5 + 10 + 20
+    assert result.extra["batching"]["rejected"] == 5 + 10
+    assert result.extra["requests"]["failures"] == 0
+    expected = [float(p == r) for p, r in zip(predictions, references)]
+    assert [s[0] for s in result.extra["scores"]] == expected
+
+
+def _unbatched_p1(judge, prompts):
+    import torch
+
+    scores = []
+    for ids in judge.encode(prompts):
+        with torch.no_grad():
+            logits = judge.model(input_ids=torch.tensor([ids])).logits[0, -1]
+        probs = torch.softmax(logits, dim=-1)
+        p0, p1 = probs[judge.choice_ids["0"]].sum(), probs[judge.choice_ids["1"]].sum()
+        scores.append(float(p1 / (p0 + p1)))
+    return np.array(scores)
+
+
+@pytest.mark.parametrize("batch_size", [1, 3, 16])
+def test_local_judge_batches(tiny_gpt2, data, batch_size):
+    torch = pytest.importorskip("torch")
+    from evalem.nlp.models import HFJudgeWrapper
+
+    predictions, references = data
+    judge = HFJudgeWrapper(tiny_gpt2, batch_size=batch_size, num_threads=1)
+    num_threads = torch.get_num_threads()
+    result = LLMAsJudgeMetric(model=judge)(predictions, references)
+    assert torch.get_num_threads() == num_threads
+
+    prompts = [
+        LLMAsJudgeMetric._prompt.format(prediction=p, reference=r)
+        for p, r in zip(predictions, references)
+    ]
+    expected = _unbatched_p1(judge, prompts)
+    scores = np.array([s[0] for s in result.extra["scores"]])
+    np.testing.assert_allclose(scores, expected, atol=1e-5)
+    assert ((scores > 0) & (scores < 1)).all()
+    assert result.score == pytest.approx(expected.mean(), abs=1e-5)
+    assert result.extra["local"]["n_batches"] == -(-40 // batch_size)
+    assert result.extra["model"] == tiny_gpt2
+
+
+def test_local_judge_rendering(tiny_gpt2):
+    pytest.importorskip("torch")
+    from evalem.nlp.models import HFJudgeWrapper
+
+    judge = HFJudgeWrapper(tiny_gpt2, max_length=16)
+    assert judge.render("prompt").endswith("prompt\nAnswer:")
+    # truncated from the left
+    assert all(len(ids) == 16 for ids in judge.encode(["a long prompt", "another"]))
+    assert judge.tokenizer.decode(judge.encode(["prompt"])[0]).endswith("Answer:")
+
+    judge.tokenizer.chat_template = (
+        "{% for m in messages %}<{{ m.role }}>{{ m.content }}{% endfor %}<assistant>"
+    )
+    assert judge.render("prompt") == (
+        f"<system>{HFJudgeWrapper._instruction}<user>prompt<assistant>"
+    )
+    with pytest.raises(ValueError):
+        LLMAsJudgeMetric(model=judge, pairs_per_prompt=4)
+    with pytest.raises(ValueError):
+        LLMAsJudgeMetric(model="stub")
+
+
+def _unsure_logprobs(prompt: str) -> dict:
+    # unsure about every 5th item, confident (and right) otherwise
+    if int(prompt.split("Reference: title ")[1]) % 5 == 0:
+        return {"1": 0.5, "0": 0.5}
+    return _match_logprobs(prompt)
+
+
+def test_cascade(data):
+    predictions, references = data
+    cheap = StubOpenAIServer(logprobs=_unsure_logprobs)
+    with cheap, StubOpenAIServer() as strong, StubOpenAIServer() as strongest:
+        metric = _metric(
+            cheap,
+            scoring="logprobs",
+            cascade=[_metric(strong), _metric(strongest)],
+            uncertainty_band=(0.3, 0.7),
+        )
+        result = metric(predictions, references)
+    unsure = [i for i in range(40) if i % 5 == 0]
+    assert cheap.requests == 40
+    assert strong.requests == len(unsure)
+    # the binary verdicts of the second judge are never uncertain
+    assert strongest.requests == 0
+
+    expected = [0.9 if p == r else 0.2 for p, r in zip(predictions, references)]
+    for i in unsure:
+        expected[i] = float(predictions[i] == references[i])
+    assert [s[0] for s in result.extra["scores"]] == pytest.approx(expected)
+    assert result.score == pytest.approx(np.mean(expected))
+
+    stages = result.extra["cascade"]["stages"]
+    assert [(s["items"], s["calls"], s["escalated"], s["final"]) for s in stages] == [
+        (40, 40, 8, 32),
+        (8, 8, 0, 8),
+        (0, 0, 0, 0),
+    ]
+    # 0.5 is a "1" verdict: agreement on the matching escalated items
+    matching = sum(predictions[i] == references[i] for i in unsure)
+    agreement = stages[1]["agreement"]
+    assert agreement["items"] == 8
+    assert agreement["verdicts"] == pytest.approx(matching / 8)
+    assert agreement["mean_abs_diff"] == pytest.approx(0.5)
+    assert stages[0]["agreement"] is None
+
+    with pytest.raises(ValueError):
+        _metric(cheap, cascade=[_metric(strong)], uncertainty_band=(0.8, 0.2))
+    with pytest.raises(TypeError):
+        _metric(cheap, cascade=["gpt-4o"])
+
+
+def _closed_api_base():
+    # nothing listens there anymore
+    with StubOpenAIServer() as server:
+        api_base = server.api_base
+    return api_base
+
+
+def test_endpoint_pool(data):
+    predictions, references = data
+    fast = StubOpenAIServer()
+    slow = StubOpenAIServer(delay=0.2)
+    dead = _closed_api_base()
+    with fast, slow:
+        metric = LLMAsJudgeMetric(
+            model="stub",
+            api_base=[fast.api_base, slow.api_base, dead],
+            n_tries=2,
+            max_concurrency=4,
+        )
+        result = metric(predictions, references)
+    expected = [float(p == r) for p, r in zip(predictions, references)]
+    assert [s[0] for s in result.extra["scores"]] == expected
+    assert result.extra["requests"]["failures"] == 0
+
+    endpoints = {e["url"]: e for e in result.extra["endpoints"]}
+    # the dead endpoint fails its health check, so it's never used
+    assert endpoints[dead]["healthy"] is False
+    assert endpoints[dead]["requests"] == 0
+    assert fast.health_checks == slow.health_checks == 1
+    # least outstanding requests: the fast endpoint takes most of the load
+    assert endpoints[fast.api_base]["requests"] == fast.requests
+    assert endpoints[slow.api_base]["requests"] == slow.requests
+    assert fast.requests + slow.requests == 80
+    assert fast.requests > 3 * slow.requests
+    assert (
+        endpoints[fast.api_base]["mean_latency"]
+        < endpoints[slow.api_base]["mean_latency"]
+    )
+    assert endpoints[slow.api_base]["mean_latency"] >= 0.2
+
+
+def test_endpoint_pool_failover(data):
+    predictions, references = data
+    broken = StubOpenAIServer(fail_first=10**6, fail_status=503)
+    with broken, StubOpenAIServer(delay=0.01) as healthy:
+        # the broken endpoint passes its health checks, but fails the requests
+        metric = LLMAsJudgeMetric(
+            model="stub",
+            api_base=[broken.api_base, healthy.api_base],
+            max_concurrency=4,
+            health_check_interval=0.05,
+        )
+        metric.engine.backoff = 10.0
+        start = time.monotonic()
+        result = metric(predictions, references)
+        elapsed = time.monotonic() - start
+    expected = [float(p == r) for p, r in zip(predictions, references)]
+    assert [s[0] for s in result.extra["scores"]] == expected
+    assert result.extra["requests"]["failures"] == 0
+    # failovers don't back off
+    assert elapsed < 5.0
+    endpoints = {e["url"]: e for e in result.extra["endpoints"]}
+    assert endpoints[broken.api_base]["errors"] == broken.requests > 0
+    assert endpoints[healthy.api_base]["errors"] == 0
+    assert endpoints[healthy.api_base]["requests"] == 40
+    assert result.extra["requests"]["retries"] == broken.requests
@@ -0,0 +1,121 @@
+# flake8: noqa
+#!/usr/bin/env python3
+
+import pytest
+
+from evalem._base.metrics import (
+    AccuracyMetric,
+    F1Metric,
+    PrecisionMetric,
+    RecallMetric,
+    get_default_backend,
+    set_default_backend,
+)
+from evalem.nlp.metrics import ExactMatchMetric, RougeMetric
+
+from .fixtures import predictions, references
+
+MULTI_REFERENCE_CASES = [
+    (
+        ["the cat sat", "a dog", "Hello, World!"],
+        [["the cat sat on the mat", "cat"], ["dog"], ["hello world", "bye"]],
+    ),
+    (
+        [["the cat", "cat sat"], ["a dog"]],
+        ["the cat sat", "dog"],
+    ),
+    (
+        [["the cat", "cat sat"], ["a dog", ""]],
+        [["the cat sat", "mat"], ["dog", "a dog"]],
+    ),
+    (
+        ["POSITIVE", "LABEL_1", "", "NEGATIVE"],
+        ["POSITIVE", "LABEL_0", "NEGATIVE", "positive"],
+    ),
+]
+
+
+@pytest.mark.metrics
+@pytest.mark.parametrize(
+    "metric_cls",
+    [AccuracyMetric, PrecisionMetric, RecallMetric, F1Metric],
+)
+class TestNativeBackend:
+    def test_matches_jury(self, metric_cls, predictions, references):
+        expected = metric_cls(backend="jury")(
+            predictions=predictions,
+            references=references,
+        )
+        result = metric_cls(backend="native")(
+            predictions=predictions,
+            references=references,
+        )
+        assert result == expected
+        assert result.extra == expected.extra
+
+    @pytest.mark.parametrize("preds, refs", MULTI_REFERENCE_CASES)
+    def test_matches_jury_multi(self, metric_cls, preds, refs):
+        expected = metric_cls(backend="jury")(predictions=preds, references=refs)
+        result = metric_cls(backend="native")(predictions=preds, references=refs)
+        assert result.score == expected.score
+        assert result.empty_items == expected.empty_items
+
+    def test_global_backend(self, metric_cls, predictions, references):
+        previous = get_default_backend()
+        set_default_backend("native")
+        try:
+            metric = metric_cls()
+            assert metric._use_native()
+            assert (
+                0 <= metric(predictions=predictions, references=references).score <= 1
+            )
+        finally:
+            set_default_backend(previous)
+
+
+def test_global_backend_inexact_metrics():
+    previous = get_default_backend()
+    set_default_backend("native")
+    try:
+        # native rouge doesn't match jury's bootstrap mid exactly
+        assert not RougeMetric()._use_native()
+        assert RougeMetric(backend="native")._use_native()
+    finally:
+        set_default_backend(previous)
+
+
+@pytest.mark.metrics
+@pytest.mark.parametrize(
+    "reduce_fn, expected",
+    [("max", [1, 0, 1, 0]), ("min", [0, 0, 1, 0]), ("mean", [0.5, 0, 1, 0])],
+)
+def test_exact_match_reduce_per_item(reduce_fn, expected):
+    preds = ["a", "b", "c", "d"]
+    refs = [["a", "x"], ["x"], "c", "D"]
+    metric = ExactMatchMetric(backend="native", reduce_fn=reduce_fn)
+    result = metric(predictions=preds, references=refs)
+    # pairs are reduced per item, not averaged over (a, a), (a, x), (b, x), ...
+    assert result.score == pytest.approx(sum(expected) / len(expected))
+    assert result.extra["reduce_fn"] == reduce_fn
+
+
+@pytest.mark.metrics
+def test_exact_match_multi_prediction_multi_reference():
+    preds = [["a", "b"], ["c"]]
+    refs = [["b", "x"], ["y", "z"]]
+    result = ExactMatchMetric(backend="native")(predictions=preds, references=refs)
+    assert result.score == pytest.approx(0.5)
+
+
+@pytest.mark.metrics
+@pytest.mark.parametrize("reduce_fn", ["min", "mean"])
+@pytest.mark.parametrize("preds, refs", MULTI_REFERENCE_CASES[:3])
+def test_native_reduce_fn_matches_jury(reduce_fn, preds, refs):
+    expected = F1Metric(backend="jury")(preds, refs, reduce_fn=reduce_fn)
+    result = F1Metric(backend="native")(preds, refs, reduce_fn=reduce_fn)
+    assert result.score == pytest.approx(expected.score)
+
+
+def test_invalid_backend():
+    with pytest.raises(ValueError):
+        AccuracyMetric(backend="invalid")
@@ -0,0 +1,82 @@
+# flake8: noqa
+#!/usr/bin/env python3
+
+import random
+
+import numpy as np
+import pytest
+
+from evalem.nlp.metrics import BartScore, BertScore
+
+from .fixtures import _WORDS, tiny_bart, tiny_bert
+
+pytest.importorskip("optimum.onnxruntime")
+
+
+@pytest.fixture(scope="module")
+def texts():
+    rng = random.Random(0)
+
+    def text():
+        return " ".join(rng.choices(_WORDS, k=rng.randint(1, 40)))
+
+    return [text() for _ in range(16)], [text() for _ in range(16)]
+
+
+@pytest.fixture(scope="module")
+def onnx_dir(tmp_path_factory):
+    return str(tmp_path_factory.mktemp("onnx"))
+
+
+def _bertscore_f1(tiny_bert, texts, **kwargs):
+    metric = BertScore(
+        model_type=tiny_bert,
+        num_layers=1,
+        backend="native",
+        per_instance_score=True,
+        **kwargs,
+    )
+    return np.array(metric(*texts).extra["bertscore"]["f1"])
+
+
+def test_bertscore_onnx_matches_torch(tiny_bert, texts, onnx_dir):
+    expected = _bertscore_f1(tiny_bert, texts)
+    np.testing.assert_allclose(
+        _bertscore_f1(tiny_bert, texts, runtime="onnx", onnx_dir=onnx_dir),
+        expected,
+        atol=1e-4,
+    )
+    quantized = _bertscore_f1(
+        tiny_bert,
+        texts,
+        runtime="onnx",
+        quantize=True,
+        onnx_dir=onnx_dir,
+    )
+    np.testing.assert_allclose(quantized, expected, atol=1e-2)
+
+
+def test_bartscore_onnx_matches_torch(tiny_bart, texts, onnx_dir):
+    kwargs = dict(model_checkpoint=tiny_bart, max_length=64)
+    expected = BartScore(**kwargs)(*texts)
+    result = BartScore(runtime="onnx", onnx_dir=onnx_dir, **kwargs)(*texts)
+    assert result.score == pytest.approx(expected.score, abs=1e-4)
+    assert result.extra["runtime"] == "onnx"
+    quantized = BartScore(runtime="onnx", quantize=True, onnx_dir=onnx_dir, **kwargs)
+    assert quantized(*texts).score == pytest.approx(expected.score, rel=0.05)
+
+
+def test_export_is_cached(tiny_bert, onnx_dir, tmp_path):
+    from evalem.nlp.metrics._bertscore import BertScoreEngine
+
+    engine = BertScoreEngine(tiny_bert, num_layers=1, runtime="onnx", onnx_dir=tmp_path)
+    exported = list(tmp_path.iterdir())
+    assert len(exported) == 1 and (exported[0] / "model.onnx").exists()
+    mtime = (exported[0] / "model.onnx").stat().st_mtime
+    BertScoreEngine(tiny_bert, num_layers=1, runtime="onnx", onnx_dir=tmp_path)
+    assert (exported[0] / "model.onnx").stat().st_mtime == mtime
+
+
+def test_invalid_runtime():
+    with pytest.raises(ValueError):
+        BertScore(runtime="tensorrt")
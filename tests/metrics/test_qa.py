@@ -0,0 +1,99 @@
+# flake8: noqa
+#!/usr/bin/env python3
+
+import collections
+import re
+import string
+
+import pytest
+
+from evalem._base.structures import EvaluationInputs
+from evalem.nlp.metrics import SquadExactMatchMetric, SquadF1Metric
+from evalem.nlp.metrics.qa import normalize_answer
+
+from ._base import BaseMetricTest, predictions, references
+
+
+def _official_normalize(s):
+    # from the official SQuAD v2 evaluation script
+    def remove_articles(text):
+        return re.sub(re.compile(r"\b(a|an|the)\b", re.UNICODE), " ", text)
+
+    def remove_punc(text):
+        exclude = set(string.punctuation)
+        return "".join(ch for ch in text if ch not in exclude)
+
+    return " ".join(remove_articles(remove_punc(s.lower())).split())
+
+
+def _official_f1(a_gold, a_pred):
+    gold_toks = _official_normalize(a_gold).split()
+    pred_toks = _official_normalize(a_pred).split()
+    common = collections.Counter(gold_toks) & collections.Counter(pred_toks)
+    num_same = sum(common.values())
+    if len(gold_toks) == 0 or len(pred_toks) == 0:
+        return int(gold_toks == pred_toks)
+    if num_same == 0:
+        return 0
+    precision = 1.0 * num_same / len(pred_toks)
+    recall = 1.0 * num_same / len(gold_toks)
+    return (2 * precision * recall) / (precision + recall)
+
+
+def _official_em(a_gold, a_pred):
+    return int(_official_normalize(a_gold) == _official_normalize(a_pred))
+
+
+PREDICTIONS = [
+    "the Eiffel Tower",
+    "Paris, France",
+    "",
+    "in 1889",
+    "an apple a day",
+    "Denver Broncos",
+]
+REFERENCES = [
+    ["Eiffel Tower", "The tower"],
+    ["Paris"],
+    ["", "nothing"],
+    ["1889", "in the year 1889"],
+    ["apple"],
+    ["Denver Broncos", "Broncos", "Denver Broncos!"],
+]
+
+
+class TestSquadF1Metric(BaseMetricTest):
+    _metric_cls = SquadF1Metric
+
+
+class TestSquadExactMatchMetric(BaseMetricTest):
+    _metric_cls = SquadExactMatchMetric
+
+
+@pytest.mark.metrics
+def test_normalize_answer():
+    for text in ["The Cat's  hat!", "an Apple, a day", "A-B-C", ""]:
+        assert normalize_answer(text) == _official_normalize(text)
+
+
+@pytest.mark.metrics
+@pytest.mark.parametrize(
+    "metric_cls, official",
+    [(SquadF1Metric, _official_f1), (SquadExactMatchMetric, _official_em)],
+)
+def test_matches_official_script(metric_cls, official):
+    expected = [
+        max(official(ref, pred) for ref in refs)
+        for pred, refs in zip(PREDICTIONS, REFERENCES)
+    ]
+    result = metric_cls()(predictions=PREDICTIONS, references=REFERENCES)
+    assert result.score == pytest.approx(sum(expected) / len(expected))
+
+
+@pytest.mark.metrics
+def test_stats_shared_across_metrics():
+    inputs = EvaluationInputs.from_instances(PREDICTIONS, REFERENCES)
+    SquadF1Metric()(inputs.predictions, inputs.references)
+    stats = inputs.cache["squad.stats"]
+    SquadExactMatchMetric()(inputs.predictions, inputs.references)
+    assert inputs.cache["squad.stats"] is stats
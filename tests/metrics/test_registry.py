@@ -0,0 +1,93 @@
+# flake8: noqa
+#!/usr/bin/env python3
+
+import threading
+import time
+
+import pytest
+
+from evalem._base.evaluators import Evaluator
+from evalem._base.metrics import F1Metric, PrecisionMetric
+from evalem._base.registry import BackendRegistry, get_backend_registry
+from evalem.nlp.metrics import BartScore, BertScore
+
+
+def test_builds_once_and_shares():
+    registry = BackendRegistry()
+    calls = []
+    factory = lambda: calls.append(1) or object()
+    first = registry.get("a", factory)
+    assert registry.get("a", factory) is first
+    assert len(calls) == 1
+    assert (registry.hits, registry.misses) == (1, 1)
+
+
+def test_lru_eviction():
+    registry = BackendRegistry(maxsize=2)
+    registry.get("a", object)
+    registry.get("b", object)
+    registry.get("a", object)
+    registry.get("c", object)
+    assert registry.keys() == ["a", "c"]
+    registry.maxsize = 1
+    assert registry.keys() == ["c"]
+    assert registry.evict("c") and not registry.evict("c")
+    with pytest.raises(ValueError):
+        registry.maxsize = -1
+
+
+def test_concurrent_get_builds_once():
+    registry = BackendRegistry()
+    calls = []
+
+    def factory():
+        calls.append(1)
+        time.sleep(0.05)
+        return object()
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(registry.get("a", factory)))
+        for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1
+    assert len(set(map(id, results))) == 1
+
+
+def test_construction_is_deferred():
+    registry = get_backend_registry()
+    registry.clear()
+    BertScore(model_type="distilbert-base-uncased")
+    BartScore()
+    F1Metric(backend="jury")
+    assert len(registry) == 0
+
+
+def test_backend_keys():
+    assert (
+        BertScore(model_type="x").backend_key == BertScore(model_type="x").backend_key
+    )
+    assert (
+        BertScore(model_type="x").backend_key != BertScore(model_type="y").backend_key
+    )
+    assert BartScore().backend_key != BartScore(device="cuda").backend_key
+
+
+def test_jury_scorers_are_shared():
+    registry = get_backend_registry()
+    registry.clear()
+    first, second = F1Metric(backend="jury"), F1Metric(backend="jury")
+    assert first.scorer is second.scorer
+    assert first.backend_key in registry
+
+
+def test_warm_up():
+    registry = get_backend_registry()
+    registry.clear()
+    metrics = [F1Metric(backend="jury"), PrecisionMetric(backend="native")]
+    Evaluator(metrics=metrics).warm_up()
+    assert registry.keys() == [metrics[0].backend_key]
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+
+import numpy as np
+
+from evalem._base.metrics import Metric
+from evalem._base.structures import (
+    EvaluationBatch,
+    EvaluationDTO,
+    PredictionDTO,
+    ReferenceDTO,
+)
+from evalem.misc.utils import format_to_jury
+from evalem.nlp.structures import QuestionAnsweringDTO
+
+
+def test_single_roundtrip():
+    refs = ["Reference 1", dict(value="Reference 2"), ReferenceDTO(value="Reference 3")]
+    batch = EvaluationBatch.from_instances(refs)
+    assert len(batch) == 3
+    assert not batch.nested
+    assert batch.to_list() == ["Reference 1", "Reference 2", "Reference 3"]
+    assert batch[2] == ReferenceDTO(value="Reference 3")
+
+
+def test_multi_roundtrip():
+    refs = [["Reference 1.1", "Reference 1.2"], ["Reference 2.1"]]
+    batch = EvaluationBatch.from_instances(refs)
+    assert batch.nested
+    assert batch.lengths.tolist() == [2, 1]
+    assert batch.to_list() == refs
+    assert batch.item_index.tolist() == [0, 0, 1]
+    assert format_to_jury(batch) == format_to_jury(refs)
+
+
+def test_scores_and_spans_view():
+    preds = [
+        QuestionAnsweringDTO(value="a", score=0.5, start=0, end=1, context="a b"),
+        QuestionAnsweringDTO(value="b", score=None),
+    ]
+    batch = EvaluationBatch.from_instances(preds)
+    assert np.isnan(batch.scores[1])
+    assert batch.starts.tolist() == [0, -1]
+    assert batch.dto_cls is QuestionAnsweringDTO
+    assert list(batch) == preds
+
+
+def test_int_stringify():
+    batch = EvaluationBatch.from_instances([1, 2, 3])
+    assert batch.to_list() == ["1", "2", "3"]
+    assert batch.to_list(stringify=False) == [1, 2, 3]
+
+
+def test_take_and_flatten():
+    batch = EvaluationBatch.from_instances([["a", "b"], ["c"], ["d", "e", "f"]])
+    assert batch.take([2, 0]).to_list() == [["d", "e", "f"], ["a", "b"]]
+    assert batch[1:].to_list() == [["c"], ["d", "e", "f"]]
+    assert batch.flatten().to_list() == ["a", "b", "c", "d", "e", "f"]
+
+
+class _FlattenOnlyMetric(Metric):
+    def compute(self, predictions, references, **kwargs):
+        return self._flatten_instances(predictions, references)
+
+
+def test_flatten_matches_list_flattening():
+    predictions = [PredictionDTO(value="a"), PredictionDTO(value="c")]
+    references = [["a", "b"], ["c"]]
+    metric = _FlattenOnlyMetric()
+    expected = metric(predictions=predictions, references=references)
+    preds, refs = metric(
+        predictions=EvaluationBatch.from_instances(predictions),
+        references=references,
+    )
+    assert format_to_jury(preds) == format_to_jury(list(expected[0]))
+    assert format_to_jury(refs) == format_to_jury(list(expected[1]))
+
+
+def test_from_columns():
+    batch = EvaluationBatch.from_columns(
+        values=["POSITIVE", "NEGATIVE"],
+        scores=[0.9, None],
+    )
+    assert isinstance(batch[0], EvaluationDTO)
+    assert batch[0].score == 0.9
+    assert batch[1].score is None
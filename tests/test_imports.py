@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+
+import json
+import subprocess
+import sys
+
+import pytest
+
+# heavy dependencies that should only be imported when they're used
+HEAVY_MODULES = (
+    "datasets",
+    "jury",
+    "optimum",
+    "outlines",
+    "pandas",
+    "scipy",
+    "sklearn",
+    "torch",
+    "transformers",
+)
+
+# generous budgets (the heavy imports take several seconds and hundreds of MB)
+IMPORT_TIME_BUDGET = 3.0  # seconds
+IMPORT_MEMORY_BUDGET = 150  # MB of peak RSS increase
+
+_SCRIPT = """
+import json, resource, sys, time
+
+start_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+start = time.perf_counter()
+import {modules}
+elapsed = time.perf_counter() - start
+rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - start_rss
+# ru_maxrss is in bytes on macOS, KB on linux
+rss = rss / 2**20 if sys.platform == "darwin" else rss / 2**10
+print(json.dumps(dict(elapsed=elapsed, rss=rss, modules=sorted(sys.modules))))
+"""
+
+
+def _import_stats(*modules):
+    out = subprocess.run(
+        [sys.executable, "-c", _SCRIPT.format(modules=", ".join(modules))],
+        capture_output=True,
+        check=True,
+        text=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+@pytest.fixture(scope="module")
+def stats():
+    return _import_stats(
+        "evalem",
+        "evalem.nlp",
+        "evalem.nlp.evaluators",
+        "evalem.nlp.metrics",
+        "evalem.nlp.models",
+        "evalem.misc.utils",
+    )
+
+
+def test_no_heavy_imports(stats):
+    loaded = {module.split(".")[0] for module in stats["modules"]}
+    assert not loaded.intersection(HEAVY_MODULES)
+
+
+def test_import_time_budget(stats):
+    assert stats["elapsed"] < IMPORT_TIME_BUDGET
+
+
+def test_import_memory_budget(stats):
+    assert stats["rss"] < IMPORT_MEMORY_BUDGET
+
+
+def test_lazy_attributes():
+    import evalem
+    import evalem.nlp
+
+    assert evalem.QuestionAnsweringHFPipelineWrapper.__name__ == (
+        "QuestionAnsweringHFPipelineWrapper"
+    )
+    assert evalem.nlp.BleuMetric.__name__ == "BleuMetric"
+    assert evalem.nlp.SquadF1Metric.__name__ == "SquadF1Metric"
+    assert evalem.nlp.SquadExactMatchMetric.__name__ == "SquadExactMatchMetric"
+    assert "HFLMWrapper" in dir(evalem.nlp)
+    with pytest.raises(AttributeError):
+        evalem.nlp.NotAMetric